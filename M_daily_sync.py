@@ -1,9 +1,9 @@
 import g_sheet_api
-import time
 from datetime import datetime, timedelta
-import traceback
 import re
-from google.api_core.exceptions import GoogleAPIError 
+import sheets_scheduler
+import sheet_records
+import app_log
 
 # --- สำหรับ UI ---
 import tkinter as tk
@@ -16,30 +16,11 @@ STAFFS_SHEET_NAME = "Staffs"
 TRANSACTION_SHEET_NAME = "Transaction"
 CONFIG_SHEET_NAME = "Config"
 
-# --- Retry settings ---
-MAX_RETRIES = 5
-INITIAL_RETRY_DELAY = 1 # seconds
+log = app_log.get_logger("manual_sync")
 
-# --- Helper function for Retry Logic ---
+# --- ทุก API call ผ่าน sheets_scheduler (โควต้าต่อนาที + retry 429/5xx รวมศูนย์) ---
 def retry_api_call(func, *args, **kwargs):
-    """Retries a Gspread API call with exponential backoff on certain errors."""
-    for attempt in range(1, MAX_RETRIES + 1):
-        try:
-            return func(*args, **kwargs)
-        except GoogleAPIError as e: 
-            error_message = str(e).lower()
-            if "quota" in error_message or "rate limit" in error_message or "unavailable" in error_message or "timeout" in error_message or "502" in error_message or "503" in error_message:
-                wait_time = INITIAL_RETRY_DELAY * (2 ** (attempt - 1))
-                print(f"    ⚠️ (ครั้งที่ {attempt}/{MAX_RETRIES}) เกิดข้อผิดพลาด API (Quota/Timeout/Unavailable): {e}. กำลังรอ {wait_time} วินาทีก่อนลองใหม่...")
-                time.sleep(wait_time)
-            else:
-                print(f"    ❌ เกิดข้อผิดพลาด API ที่ไม่สามารถลองใหม่ได้: {e}")
-                raise 
-        except Exception as e:
-            print(f"    ❌ (ครั้งที่ {attempt}/{MAX_RETRIES}) เกิดข้อผิดพลาดที่ไม่ใช่ API เฉพาะ: {e}. กำลังลองใหม่...")
-            wait_time = INITIAL_RETRY_DELAY * (2 ** (attempt - 1))
-            time.sleep(wait_time) 
-    raise Exception(f"ไม่สามารถดำเนินการ API call ได้หลังจาก {MAX_RETRIES} ครั้ง.")
+    return sheets_scheduler.call(func, *args, **kwargs)
 
 def get_sheet_data_as_objects(sheet, header_row=1, data_range=None):
     """Helper to convert sheet data to list of objects, specifying the header row and data range."""
@@ -49,22 +30,10 @@ def get_sheet_data_as_objects(sheet, header_row=1, data_range=None):
         else:
             all_values = retry_api_call(sheet.get_all_values)
     except Exception as e:
-        print(f"    [Helper Error] ไม่สามารถ get values จากชีต '{sheet.title}': {e}")
+        log.error("    [Helper Error] ไม่สามารถ get values จากชีต '%s': %s", sheet.title, e)
         return []
 
-    if len(all_values) < header_row:
-        return []
-    
-    headers = [str(h).strip() for h in all_values[header_row - 1]]
-    data_rows = all_values[header_row:]
-    
-    list_of_dicts = []
-    for row in data_rows:
-        while len(row) < len(headers):
-            row.append('')
-        list_of_dicts.append(dict(zip(headers, row)))
-        
-    return list_of_dicts
+    return sheet_records.decode_rows(all_values, header_row, unique=False)
 
 def col_letter_to_index(letter):
     """Converts a column letter (e.g., 'A', 'L') to a 0-based index."""
@@ -89,12 +58,10 @@ def append_and_format_separator(sheet, text, bg_color, text_color, num_cols_to_m
             "horizontalAlignment": "CENTER",
             "textFormat": { "bold": True, "foregroundColor": text_color }
         })
-        print(f"    👍 สร้างแถบคั่นที่แถว {next_row_num} เรียบร้อย!")
+        log.info("    👍 สร้างแถบคั่นที่แถว %s เรียบร้อย!", next_row_num)
     except Exception as e:
-        print(f"    ⚠️ ข้อผิดพลาดในการผสานหรือจัดรูปแบบเซลล์สำหรับแถบคั่น '{text}': {e}")
-        print(f"    แถวที่พยายามผสาน: {merge_range}. ตรวจสอบโครงสร้างชีทหรือสิทธิ์.")
-        traceback.print_exc()
-    time.sleep(0.5) # พักเล็กน้อยหลังจากการเขียนและจัดรูปแบบ เพื่อให้ Sheets ประมวลผล
+        log.warning("    ⚠️ ข้อผิดพลาดในการผสานหรือจัดรูปแบบเซลล์สำหรับแถบคั่น '%s': %s", text, e, exc_info=True)
+        log.warning("    แถวที่พยายามผสาน: %s. ตรวจสอบโครงสร้างชีทหรือสิทธิ์.", merge_range)
 
 # --- Main Sync Logic Function (Centralized logic for both Auto and Manual) ---
 def run_sync_logic(start_date, end_date, mode="auto"):
@@ -103,19 +70,15 @@ def run_sync_logic(start_date, end_date, mode="auto"):
     start_date and end_date are datetime objects.
     mode indicates if it's "auto" (single day) or "manual" (date range).
     """
-    client = None
     try:
-        client = g_sheet_api.get_gspread_client()
-        master_workbook = retry_api_call(client.open_by_url, MASTER_SHEET_URL)
-
-        print("📥 กำลังโหลดข้อมูล Staffs และ Config...")
-        staffs_sheet = retry_api_call(master_workbook.worksheet, STAFFS_SHEET_NAME)
-        config_sheet = retry_api_call(master_workbook.worksheet, CONFIG_SHEET_NAME)
-        transaction_sheet = retry_api_call(master_workbook.worksheet, TRANSACTION_SHEET_NAME)
+        log.info("📥 กำลังโหลดข้อมูล Staffs และ Config...")
+        staffs_sheet = g_sheet_api.get_worksheet(MASTER_SHEET_URL, STAFFS_SHEET_NAME)
+        config_sheet = g_sheet_api.get_worksheet(MASTER_SHEET_URL, CONFIG_SHEET_NAME)
+        transaction_sheet = g_sheet_api.get_worksheet(MASTER_SHEET_URL, TRANSACTION_SHEET_NAME)
 
         all_staffs = get_sheet_data_as_objects(staffs_sheet)
         project_configs = {conf.get('ConfigType','').strip(): conf for conf in get_sheet_data_as_objects(config_sheet) if conf.get('ConfigType')}
-        print(f"✅ โหลดสำเร็จ! พบ {len(all_staffs)} พนักงาน และ {len(project_configs)} รูปแบบการตั้งค่า")
+        log.info("✅ โหลดสำเร็จ! พบ %s พนักงาน และ %s รูปแบบการตั้งค่า", len(all_staffs), len(project_configs))
 
         num_cols = 12 # จำนวนคอลัมน์ทั้งหมดที่จะทำงานด้วย (A-L)
         daily_separator_bg_color = { "red": 0.95, "green": 0.95, "blue": 0.8 } # เหลืองอ่อน
@@ -126,10 +89,10 @@ def run_sync_logic(start_date, end_date, mode="auto"):
         current_processing_date = start_date
         while current_processing_date <= end_date:
             date_str_for_compare = f"{current_processing_date.day}/{current_processing_date.month}/{current_processing_date.year}"
-            print(f"\n--- 🎯 กำลังประมวลผลข้อมูลของวันที่: {date_str_for_compare} ---")
+            log.info("--- 🎯 กำลังประมวลผลข้อมูลของวันที่: %s ---", date_str_for_compare)
 
             # 1. เพิ่มแถบคั่น "เริ่มต้นการประมวลผลวันที่" (เขียนทันที)
-            print(f"\n--- 📅 สร้างแถบคั่นเริ่มต้นสำหรับวันที่ {date_str_for_compare} ---")
+            log.info("--- 📅 สร้างแถบคั่นเริ่มต้นสำหรับวันที่ %s ---", date_str_for_compare)
             append_and_format_separator(
                 transaction_sheet, 
                 f"--- เริ่มต้นการประมวลผลวันที่ {current_processing_date.strftime('%d/%m/%Y')} ---",
@@ -140,7 +103,7 @@ def run_sync_logic(start_date, end_date, mode="auto"):
 
             # --- START FIX: เพิ่มแถวว่างเปล่า 2 แถวหลังแถบคั่นเริ่มต้น (สำหรับ Manual Mode) ---
             if mode == "manual": 
-                print("    ✨ เพิ่มแถวว่างเปล่า 2 แถวเพื่อคั่นก่อนข้อมูลจริง (สำหรับโหมดแมนนวล)...")
+                log.info("    ✨ เพิ่มแถวว่างเปล่า 2 แถวเพื่อคั่นก่อนข้อมูลจริง (สำหรับโหมดแมนนวล)...")
                 for _ in range(2):
                     current_highest_row_for_blank = len(retry_api_call(transaction_sheet.get_all_values))
                     retry_api_call(transaction_sheet.append_row, [''] * num_cols, value_input_option='USER_ENTERED')
@@ -150,7 +113,6 @@ def run_sync_logic(start_date, end_date, mode="auto"):
                         "backgroundColor": blank_row_clean_color,
                         "textFormat": { "bold": False, "foregroundColor": { "red": 0, "green": 0, "blue": 0 } } # สีดำธรรมดา
                     })
-                time.sleep(0.5) 
             # --- END FIX ---
 
             transactions_to_append_data = [] 
@@ -163,28 +125,27 @@ def run_sync_logic(start_date, end_date, mode="auto"):
                 config_type = staff.get("ConfigType", "").strip()
                 project_name = staff.get("Project Name", "N/A").strip()
                 
-                print(f"\n--- ⚙️ ({i+1}/{len(all_staffs)}) กำลังประมวลผลของ: {email} ---")
+                log.info("--- ⚙️ (%s/%s) กำลังประมวลผลของ: %s ---", i+1, len(all_staffs), email)
 
                 # --- Initialize variables before try-except ---
                 mgmt_data_objects = [] 
                 # --- END FIX ---
 
                 if not all([email, sheet_url, config_type]):
-                    print(f"    ⏩ ข้าม: ข้อมูลพนักงานในชีต 'Staffs' ไม่ครบถ้วน")
+                    log.debug("    ⏩ ข้าม: ข้อมูลพนักงานในชีต 'Staffs' ไม่ครบถ้วน")
                     continue
 
                 config = project_configs.get(config_type)
                 if not config:
-                    print(f"    ⏩ ข้าม: ไม่พบการตั้งค่าสำหรับ ConfigType '{config_type}'")
+                    log.debug("    ⏩ ข้าม: ไม่พบการตั้งค่าสำหรับ ConfigType '%s'", config_type)
                     continue
 
                 try:
                     staff_transactions_for_current_staff = [] 
                     
-                    emp_workbook = retry_api_call(client.open_by_url, sheet_url)
-                    project_sheet = retry_api_call(emp_workbook.worksheet, config['EmployeeSheetTab'])
-                    mgmt_sheet = retry_api_call(emp_workbook.worksheet, config['MgmtSheetTab'])
-                    timestamps_sheet = retry_api_call(emp_workbook.worksheet, 'Timestamps')
+                    project_sheet = g_sheet_api.get_worksheet(sheet_url, config['EmployeeSheetTab'])
+                    mgmt_sheet = g_sheet_api.get_worksheet(sheet_url, config['MgmtSheetTab'])
+                    timestamps_sheet = g_sheet_api.get_worksheet(sheet_url, 'Timestamps')
 
                     emp_data_as_grid = retry_api_call(project_sheet.get_all_values)
                     timestamps_data_as_grid = retry_api_call(timestamps_sheet.get_all_values)
@@ -213,16 +174,16 @@ def run_sync_logic(start_date, end_date, mode="auto"):
                                     if f"{d}/{m}/{y}" == date_str_for_compare:
                                         submission_row = row
                                         submission_row_index = idx + 1 
-                                        print(f"    👍 พบข้อมูลส่งงานของวันที่ {date_str_for_compare} ที่แถว {submission_row_index + 1}")
+                                        log.debug("    👍 พบข้อมูลส่งงานของวันที่ %s ที่แถว %s", date_str_for_compare, submission_row_index + 1)
                                         break
                             except (ValueError, IndexError): continue
                     
                     if submission_row_index != -1 and submission_row_index < len(timestamps_data_as_grid):
                         timestamps_row = timestamps_data_as_grid[submission_row_index]
-                        print(f"    👍 พบข้อมูลเวลาที่แถว {submission_row_index + 1}")
+                        log.debug("    👍 พบข้อมูลเวลาที่แถว %s", submission_row_index + 1)
 
                     if not submission_row:
-                        print(f"    -> ไม่พบข้อมูลส่งงานของวันที่ {date_str_for_compare}")
+                        log.debug("    -> ไม่พบข้อมูลส่งงานของวันที่ %s", date_str_for_compare)
                         continue
 
                     status_header = config.get('MgmtStatusColumn')
@@ -264,9 +225,9 @@ def run_sync_logic(start_date, end_date, mode="auto"):
                         page_url = page_details.get(url_header, '') if page_details else ''
                         
                         if page_details or time_sent:
-                                print(f"    ✔️ เพจ #{page_num}: พบข้อมูล! เวลา: {time_sent}")
+                                log.debug("    ✔️ เพจ #%s: พบข้อมูล! เวลา: %s", page_num, time_sent)
                         else:
-                                print(f"    ❌ เพจ #{page_num}: ไม่พบข้อมูลที่ Active หรือไม่มีเวลาส่ง")
+                                log.debug("    ❌ เพจ #%s: ไม่พบข้อมูลที่ Active หรือไม่มีเวลาส่ง", page_num)
 
                         record_id = f"{email}_{project_name}_{current_processing_date.strftime('%d%m%Y')}_Page{page_num}" 
                         
@@ -278,7 +239,7 @@ def run_sync_logic(start_date, end_date, mode="auto"):
                         staff_transactions_for_current_staff.append(new_row)
 
                     if staff_transactions_for_current_staff:
-                        print(f"    ✍️ เตรียมข้อมูล {len(staff_transactions_for_current_staff)} แถวของ {email} เพื่อรวมใน Batch...")
+                        log.debug("    ✍️ เตรียมข้อมูล %s แถวของ %s เพื่อรวมใน Batch...", len(staff_transactions_for_current_staff), email)
                         transactions_to_append_data.extend(staff_transactions_for_current_staff)
                         
                         if i < len(all_staffs) - 1: 
@@ -286,25 +247,24 @@ def run_sync_logic(start_date, end_date, mode="auto"):
                             data_rows_for_person_separator_indices.append(len(transactions_to_append_data) - 1) 
 
                     else:
-                        print(f"    ℹ️ ไม่มีข้อมูลที่สามารถดึงมาได้สำหรับ {email} ในวันนี้")
+                        log.info("    ℹ️ ไม่มีข้อมูลที่สามารถดึงมาได้สำหรับ %s ในวันนี้", email)
                 
                 except Exception as e:
-                    print(f"    ❌ เกิดข้อผิดพลาดกับชีตของ {email}: {e}")
-                    traceback.print_exc()
+                    log.error("    ❌ เกิดข้อผิดพลาดกับชีตของ %s: %s", email, e, exc_info=True)
             
             # 3. เขียน Batch ของข้อมูลพนักงาน (พร้อมแถวคั่นบุคคล)
             if any(row[0] != '' for row in transactions_to_append_data): 
-                print(f"\n✍️ กำลังเขียนข้อมูลทั้งหมด {len(transactions_to_append_data)} แถวลงใน Transaction Sheet ใน Batch เดียวสำหรับวันที่ {date_str_for_compare}...")
+                log.info("✍️ กำลังเขียนข้อมูลทั้งหมด %s แถวลงใน Transaction Sheet ใน Batch เดียวสำหรับวันที่ %s...", len(transactions_to_append_data), date_str_for_compare)
                 
                 initial_row_count = len(retry_api_call(transaction_sheet.get_all_values)) 
                 
                 retry_api_call(transaction_sheet.append_rows, transactions_to_append_data, value_input_option='USER_ENTERED')
-                print("    ✅ เขียนข้อมูล Batch เสร็จสิ้น!")
+                log.info("    ✅ เขียนข้อมูล Batch เสร็จสิ้น!")
                 
                 # --- จัดรูปแบบแถวคั่นบุคคลด้วย sheet.format() ทีละแถว ---
                 person_separator_bg_color = { "red": 0.95, "green": 0.98, "blue": 0.95 } 
                 
-                print(f"    ⚡️ กำลังจัดรูปแบบแถวคั่นบุคคลทีละแถวสำหรับวันที่ {date_str_for_compare}...")
+                log.info("    ⚡️ กำลังจัดรูปแบบแถวคั่นบุคคลทีละแถวสำหรับวันที่ %s...", date_str_for_compare)
                 for relative_idx in data_rows_for_person_separator_indices:
                     current_absolute_row_num_1based = initial_row_count + relative_idx + 1 
                     format_range = f'A{current_absolute_row_num_1based}:{chr(ord("A") + num_cols - 1)}{current_absolute_row_num_1based}'
@@ -313,17 +273,16 @@ def run_sync_logic(start_date, end_date, mode="auto"):
                             "backgroundColor": person_separator_bg_color
                         })
                     except Exception as e:
-                        print(f"    ❌ ข้อผิดพลาดในการจัดรูปแบบแถวคั่นบุคคลที่แถว {current_absolute_row_num_1based}: {e}")
-                        traceback.print_exc()
-                print("    ✅ จัดรูปแบบแถวคั่นบุคคลเสร็จสิ้น!")
+                        log.error("    ❌ ข้อผิดพลาดในการจัดรูปแบบแถวคั่นบุคคลที่แถว %s: %s", current_absolute_row_num_1based, e, exc_info=True)
+                log.info("    ✅ จัดรูปแบบแถวคั่นบุคคลเสร็จสิ้น!")
                 # --- END: จัดรูปแบบแถวคั่นบุคคลด้วย sheet.format() ทีละแถว ---
 
             else:
-                print(f"\nℹ️ ไม่มีข้อมูลจริงจากพนักงานคนใดในวันนี้ ({date_str_for_compare}) ที่จะเขียนลงชีท")
+                log.info("ℹ️ ไม่มีข้อมูลจริงจากพนักงานคนใดในวันนี้ (%s) ที่จะเขียนลงชีท", date_str_for_compare)
 
             # 4. เพิ่มแถบคั่น "สิ้นสุดการประมวลผลวันที่"
             if any(row[0] != '' for row in transactions_to_append_data): 
-                print("\n✅ ประมวลผลข้อมูลรายบุคคลเสร็จสิ้น กำลังสร้างแถบคั่นประจำวัน...")
+                log.info("✅ ประมวลผลข้อมูลรายบุคคลเสร็จสิ้น กำลังสร้างแถบคั่นประจำวัน...")
                 append_and_format_separator(
                     transaction_sheet, 
                     f"--- สิ้นสุดการประมวลผลวันที่ {current_processing_date.strftime('%d/%m/%Y')} ---",
@@ -332,10 +291,10 @@ def run_sync_logic(start_date, end_date, mode="auto"):
                     num_cols
                 )
             else:
-                print(f"\nℹ️ ไม่มีข้อมูลใหม่สำหรับวันที่ {date_str_for_compare} ในรอบนี้ จึงไม่สร้างแถบคั่นสิ้นสุดวัน")
+                log.info("ℹ️ ไม่มีข้อมูลใหม่สำหรับวันที่ %s ในรอบนี้ จึงไม่สร้างแถบคั่นสิ้นสุดวัน", date_str_for_compare)
 
             # --- START FIX: เพิ่มแถวว่างเปล่า 1 แถวท้ายสุดและล้างการจัดรูปแบบอย่างชัดเจน ---
-            print("    ✨ เพิ่มแถวว่างเปล่าเพื่อคั่นวันถัดไปและล้างการจัดรูปแบบ...")
+            log.info("    ✨ เพิ่มแถวว่างเปล่าเพื่อคั่นวันถัดไปและล้างการจัดรูปแบบ...")
             # Append the blank row first
             current_highest_row_after_all_data = len(retry_api_call(transaction_sheet.get_all_values)) 
             retry_api_call(transaction_sheet.append_row, [''] * num_cols, value_input_option='USER_ENTERED')
@@ -346,18 +305,15 @@ def run_sync_logic(start_date, end_date, mode="auto"):
                 "backgroundColor": { "red": 1, "green": 1, "blue": 1 }, # สีขาวล้วน
                 "textFormat": { "bold": False, "foregroundColor": { "red": 0, "green": 0, "blue": 0 } } # สีดำธรรมดา
             })
-            time.sleep(0.5) 
             # --- END FIX ---
             
             
             current_processing_date += timedelta(days=1) 
 
-        print(f"\n--- 🎉 การซิงค์ข้อมูลทั้งหมดเสร็จสิ้น --- [{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}]")
-        time.sleep(1) 
+        log.info("--- 🎉 การซิงค์ข้อมูลทั้งหมดเสร็จสิ้น --- [%s]", datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
 
     except Exception as e:
-        print(f"🔥🔥🔥 เกิดข้อผิดพลาดร้ายแรงในกระบวนการซิงค์: {e}")
-        traceback.print_exc()
+        log.exception("🔥🔥🔥 เกิดข้อผิดพลาดร้ายแรงในกระบวนการซิงค์: %s", e)
 
 # --- UI for Manual Sync ---
 def run_manual_sync_from_ui_wrapper():
@@ -386,10 +342,12 @@ def run_manual_sync_from_ui_wrapper():
 # --- Main execution block ---
 if __name__ == '__main__':
     import sys
+    # log เป็นข้อความล้วนเหมือน print เดิม (ระดับตั้งได้ทาง RCP_LOG_LEVEL)
+    app_log.setup(fmt="%(message)s")
     if '--auto' in sys.argv:
         # For auto mode, call run_sync_logic with appropriate dates for yesterday
         current_date_for_auto = datetime.now() - timedelta(days=1)
-        print(f"🚀 เริ่มกระบวนการซิงค์ข้อมูลรายวันด้วย Python (โหมดอัตโนมัติ)... [{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}]")
+        log.info("🚀 เริ่มกระบวนการซิงค์ข้อมูลรายวันด้วย Python (โหมดอัตโนมัติ)... [%s]", datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
         run_sync_logic(current_date_for_auto, current_date_for_auto, mode="auto")
     else:
         # Create UI for manual sync
@@ -0,0 +1,55 @@
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+
+# ระดับ log ตั้งได้ทาง environment เช่น RCP_LOG_LEVEL=DEBUG (ค่าเริ่มต้น INFO)
+LOG_LEVEL_ENV = "RCP_LOG_LEVEL"
+DEFAULT_LEVEL = "INFO"
+LOG_FORMAT = "[%(levelname)s][%(name)s] %(message)s"
+
+ROOT_NAME = "rcp"
+_root = logging.getLogger(ROOT_NAME)
+
+
+def setup(level=None, fmt=LOG_FORMAT, stream=None):
+    """
+    ตั้งค่า handler ของ logger 'rcp' (เรียกซ้ำได้ จะเปลี่ยนแค่ระดับ/format)
+    ทุกโมดูลใช้ get_logger() แล้วส่ง argument แยก เช่น log.debug("rows=%d", n)
+    ข้อความจะถูก format ก็ต่อเมื่อระดับนั้นเปิดอยู่เท่านั้น
+    """
+    level = level or os.environ.get(LOG_LEVEL_ENV, DEFAULT_LEVEL)
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+        if not isinstance(level, int):
+            level = logging.INFO
+    _root.setLevel(level)
+    _root.propagate = False
+    if not _root.handlers:
+        _root.addHandler(logging.StreamHandler(stream or sys.stdout))
+    for handler in _root.handlers:
+        handler.setFormatter(logging.Formatter(fmt))
+
+
+def get_logger(name):
+    if not _root.handlers:
+        setup()
+    return logging.getLogger(f"{ROOT_NAME}.{name}")
+
+
+@contextmanager
+def span(log, label, *args, level=logging.DEBUG):
+    """
+    จับเวลาช่วงงานหนึ่ง (fetch / parse / cache ...) แล้ว log เป็น "<label> took N ms"
+    ถ้าระดับ log ปิดอยู่จะไม่อ่านนาฬิกาและไม่ format อะไรเลย
+    """
+    if not log.isEnabledFor(level):
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        log.log(level, label + " took %.1f ms", *args, (time.perf_counter() - start) * 1000)
@@ -0,0 +1,680 @@
+import os
+import sys
+import json
+import time
+import zlib
+import sqlite3
+import threading
+from collections import OrderedDict, Counter
+from contextlib import contextmanager, nullcontext as _no_context
+from itertools import islice
+
+import sheet_records
+import app_log
+from app_log import span
+
+log = app_log.get_logger("cache")
+
+
+DEFAULT_TTL = 60 * 60
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# ประมาณขนาดของ list / dict ใหญ่จากตัวอย่างไม่เกินเท่านี้รายการ แทนการเดินทุกแถว
+SIZE_SAMPLE = 32
+
+
+def estimate_size(value):
+    """ประมาณขนาดในหน่วยความจำ (byte) ของข้อมูลใน cache แบบเร็ว (สุ่มตัวอย่างแล้วคูณกลับ)"""
+    if isinstance(value, (list, tuple)):
+        n = len(value)
+        if not n:
+            return sys.getsizeof(value)
+        sample = value[::max(1, n // SIZE_SAMPLE)][:SIZE_SAMPLE]
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in sample) * n // len(sample)
+    if isinstance(value, dict):
+        n = len(value)
+        if not n:
+            return sys.getsizeof(value)
+        sample = list(islice(value.items(), SIZE_SAMPLE))
+        items = sum(sys.getsizeof(k) + estimate_size(v) for k, v in sample)
+        return sys.getsizeof(value) + items * n // len(sample)
+    return sys.getsizeof(value)
+
+
+class SqliteStore:
+    """
+    disk cache ทุก key อยู่ในไฟล์ SQLite เดียว (เขียนเป็น transaction จึงไม่มีไฟล์ครึ่งๆ กลางๆ ตอนโปรแกรมล่ม)
+      entries : metadata ต่อ key (fetched_at, fingerprint ของ tab ต้นทาง, ขนาด, จำนวนแถว, codec)
+      chunks  : ค่าที่บีบอัดด้วย zlib แบ่งเป็นก้อนละ CHUNK_ROWS แถว → อ่านบางช่วงแถวได้โดยไม่ต้องโหลดทั้ง key
+    list ของ record (SheetRecord / dict ที่คีย์ชุดเดียวกัน) เก็บ header ครั้งเดียว + แถวเป็น list
+    ตอนโหลดจึงไม่ต้องสร้าง dict ทุกแถว และได้ SheetRecord กลับมาเหมือนตอน fetch
+    """
+
+    CHUNK_ROWS = 2000
+    COMPRESS_LEVEL = 1
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key         TEXT PRIMARY KEY,
+                codec       TEXT,
+                header      TEXT,
+                fetched_at  REAL,
+                fingerprint TEXT,
+                size        INTEGER,
+                stored_size INTEGER,
+                rows        INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                key   TEXT NOT NULL,
+                seq   INTEGER NOT NULL,
+                value BLOB NOT NULL,
+                PRIMARY KEY (key, seq)
+            );
+        """)
+
+    # ── encode / decode ──
+    @staticmethod
+    def _record_header(value):
+        """
+        (codec, header) ถ้า value เป็น list ของ record ที่คีย์ชุดเดียวกันทุกแถว
+          "records" = SheetRecord (โหลดกลับเป็น SheetRecord) ; "dicts" = dict (โหลดกลับเป็น dict)
+        ไม่ใช่คืน (None, None)
+        """
+        if not isinstance(value, list) or not value:
+            return None, None
+        first = value[0]
+        if isinstance(first, sheet_records.SheetRecord):
+            schema = first.schema
+            if all(isinstance(r, sheet_records.SheetRecord) and r.schema is schema and not r.has_extra for r in value):
+                return "records", list(schema.names)
+        elif isinstance(first, dict):
+            header = list(first)
+            if all(isinstance(r, dict) and len(r) == len(header) and list(r) == header for r in value):
+                return "dicts", header
+        return None, None
+
+    def _pack(self, obj):
+        raw = json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=sheet_records.json_default).encode('utf-8')
+        return raw, zlib.compress(raw, self.COMPRESS_LEVEL)
+
+    def _encode(self, value):
+        """คืน (codec, header, [ก้อนที่บีบอัดแล้ว], ขนาดก่อนบีบอัด, จำนวนแถว)"""
+        codec, header = self._record_header(value)
+        if codec == "records":
+            with sheet_records.gc_paused():
+                rows = [record.row_values() for record in value]
+        elif codec == "dicts":
+            with sheet_records.gc_paused():
+                rows = [list(record.values()) for record in value]
+        elif isinstance(value, list):
+            rows, codec = value, "list"
+        else:
+            raw, packed = self._pack(value)
+            return "json", None, [packed], len(raw), None
+        chunks, size = [], 0
+        for start in range(0, max(len(rows), 1), self.CHUNK_ROWS):
+            raw, packed = self._pack(rows[start:start + self.CHUNK_ROWS])
+            chunks.append(packed)
+            size += len(raw)
+        return codec, header, chunks, size, len(rows)
+
+    @staticmethod
+    def _decode_rows(codec, header, rows):
+        if codec == "records":
+            schema = sheet_records.RecordSchema(header)
+            return [sheet_records.SheetRecord(schema, row) for row in rows]
+        if codec == "dicts":
+            return [dict(zip(header, row)) for row in rows]
+        return rows
+
+    # ── metadata ──
+    def _meta(self, key):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT codec, header, fetched_at, fingerprint, size, stored_size, rows FROM entries WHERE key = ?",
+                (key,)
+            ).fetchone()
+
+    def age(self, key):
+        """อายุของข้อมูลเป็นวินาทีนับจาก fetched_at ; ไม่มีข้อมูลคืน None"""
+        meta = self._meta(key)
+        if meta is None or meta[0] is None or meta[2] is None:
+            return None
+        return time.time() - meta[2]
+
+    def info(self, key):
+        """metadata ของ key เป็น dict (ไม่โหลดข้อมูล) ; ไม่มีคืน None"""
+        meta = self._meta(key)
+        if meta is None or meta[0] is None:
+            return None
+        codec, _, fetched_at, fingerprint, size, stored_size, rows = meta
+        return {"codec": codec, "fetched_at": fetched_at, "size": size,
+                "stored_size": stored_size, "rows": rows, "has_fingerprint": fingerprint is not None}
+
+    def fingerprint(self, key):
+        meta = self._meta(key)
+        return json.loads(meta[3]) if meta is not None and meta[3] else None
+
+    def set_fingerprint(self, key, fingerprint):
+        """ตั้ง / ลบ (None) fingerprint ของ key ; save() ครั้งถัดไปจะไม่ล้างค่านี้"""
+        text = json.dumps(fingerprint, ensure_ascii=False) if fingerprint is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO entries (key, fingerprint) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET fingerprint = excluded.fingerprint",
+                (key, text)
+            )
+
+    # ── data ──
+    def load(self, key, max_age=None):
+        """โหลดข้อมูลที่อายุไม่เกิน max_age วินาที (None = ไม่สนอายุ) ; ไม่มี / หมดอายุ / เสีย คืน None"""
+        with span(log, "load disk cache '%s'", key):
+            with self._lock:
+                meta = self._conn.execute(
+                    "SELECT codec, header, fetched_at FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if meta is None or meta[0] is None:
+                    return None
+                codec, header, fetched_at = meta
+                if max_age is not None and (fetched_at is None or time.time() - fetched_at >= max_age):
+                    return None
+                blobs = [row[0] for row in self._conn.execute(
+                    "SELECT value FROM chunks WHERE key = ? ORDER BY seq", (key,))]
+            try:
+                with sheet_records.gc_paused():
+                    if codec == "json":
+                        return json.loads(zlib.decompress(blobs[0]))
+                    rows = []
+                    for blob in blobs:
+                        rows.extend(json.loads(zlib.decompress(blob)))
+                    return self._decode_rows(codec, json.loads(header) if header else None, rows)
+            except (IndexError, ValueError, zlib.error) as e:
+                log.warning("disk cache '%s' unreadable: %s", key, e)
+                return None
+
+    def load_range(self, key, start, stop=None):
+        """
+        อ่านเฉพาะแถว start..stop-1 ของ entry ที่เป็น list (เช่น Transaction) โดยคลายเฉพาะก้อนที่เกี่ยวข้อง
+        ไม่มีข้อมูลคืน None
+        """
+        meta = self._meta(key)
+        if meta is None or meta[0] in (None, "json"):
+            return None
+        codec, header, _, _, _, _, total = meta
+        stop = total if stop is None else min(stop, total)
+        if start >= stop:
+            return []
+        first_seq, last_seq = start // self.CHUNK_ROWS, (stop - 1) // self.CHUNK_ROWS
+        with self._lock:
+            blobs = self._conn.execute(
+                "SELECT seq, value FROM chunks WHERE key = ? AND seq BETWEEN ? AND ? ORDER BY seq",
+                (key, first_seq, last_seq)
+            ).fetchall()
+        rows = []
+        for _, blob in blobs:
+            rows.extend(json.loads(zlib.decompress(blob)))
+        offset = first_seq * self.CHUNK_ROWS
+        return self._decode_rows(codec, json.loads(header) if header else None, rows[start - offset:stop - offset])
+
+    def save(self, key, data, fetched_at=None):
+        size_hint = len(data) if hasattr(data, '__len__') else 1
+        with span(log, "save disk cache '%s' (%d items)", key, size_hint):
+            codec, header, chunks, size, rows = self._encode(data)
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._conn.execute("DELETE FROM chunks WHERE key = ?", (key,))
+                    self._conn.executemany(
+                        "INSERT INTO chunks (key, seq, value) VALUES (?, ?, ?)",
+                        [(key, seq, blob) for seq, blob in enumerate(chunks)]
+                    )
+                    self._conn.execute(
+                        "INSERT INTO entries (key, codec, header, fetched_at, size, stored_size, rows) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET codec = excluded.codec, header = excluded.header, "
+                        "fetched_at = excluded.fetched_at, size = excluded.size, "
+                        "stored_size = excluded.stored_size, rows = excluded.rows",
+                        (key, codec, json.dumps(header, ensure_ascii=False) if header is not None else None,
+                         fetched_at or time.time(), size, sum(len(c) for c in chunks), rows)
+                    )
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+
+    def keys(self, prefix=""):
+        """key ทั้งหมดที่มีข้อมูล (ขึ้นต้นด้วย prefix)"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                "SELECT key FROM entries WHERE codec IS NOT NULL AND substr(key, 1, ?) = ?", (len(prefix), prefix))]
+
+    def touch(self, key):
+        """ต่ออายุข้อมูล (fetched_at = ตอนนี้) โดยไม่ต้องเขียนข้อมูลใหม่"""
+        with self._lock:
+            self._conn.execute("UPDATE entries SET fetched_at = ? WHERE key = ?", (time.time(), key))
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("DELETE FROM chunks WHERE key = ?", (key,))
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.execute("COMMIT")
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("COMMIT")
+
+    def stats(self):
+        with self._lock:
+            entries, size, stored = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM entries WHERE codec IS NOT NULL"
+            ).fetchone()
+        return {"entries": entries, "size": size, "stored_size": stored}
+
+
+class _Entry:
+    __slots__ = ("value", "fetched_at", "ttl", "size", "hydrated")
+
+    def __init__(self, value, fetched_at, ttl, size):
+        self.value = value
+        self.fetched_at = fetched_at
+        self.ttl = ttl
+        self.size = size
+        self.hydrated = False  # โหลดจาก disk ตอนเปิดแอปทั้งที่หมดอายุแล้ว: ใช้ได้ทันทีแต่ต้องรีเฟรช
+
+
+# ผลของ flight ที่จบโดยไม่มีค่า (เช่น claim แล้วไม่ได้ put) → ผู้รอไปโหลดเอง
+_RETRY = object()
+
+
+class _Flight:
+    """การโหลด key หนึ่งที่กำลังทำอยู่ ; thread อื่นที่ขอ key เดียวกันรอผลจากตัวนี้"""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = _RETRY
+        self.error = None
+
+    def finish(self, value=_RETRY, error=None):
+        self.value = value
+        self.error = error
+        self.done.set()
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class CacheManager:
+    """
+    cache กลางของ Api: RAM (LRU จำกัดด้วยขนาดรวม max_bytes) + disk store
+    budgets = { prefix ของ key: byte } งบ RAM แยกตามกลุ่ม (เช่น 'summary_' ทุกเดือน, 'sheet_' ทุกโปรเจกต์)
+      กลุ่มที่เกินงบถูกไล่ entry ที่ไม่ได้ใช้นานที่สุดของกลุ่มนั้นออกก่อน ; key ที่ pin() ไว้ไม่ถูกไล่
+      ทุก entry ถูกเขียนลง store ตอน put อยู่แล้ว การไล่ออกจาก RAM จึงเหลือข้อมูลบน disk ให้โหลดกลับได้
+      get(key, fetch, ttl, revalidate) : RAM → disk → ข้อมูลเก่าที่ revalidate ผ่าน → fetch ใหม่
+    แต่ละ key มี TTL ของตัวเอง (ค่าที่ put ไว้ หรือ ttl ที่ส่งมากับ get)
+    miss ของ key เดียวกันพร้อมกันหลาย thread จะรอผลจากการโหลดครั้งเดียว (single-flight)
+
+    stale-while-revalidate (ตั้ง max_stale เป็นวินาที): ข้อมูลที่หมดอายุแล้วแต่อายุยังไม่เกิน max_stale
+    จะถูกคืนทันที แล้วรีเฟรชใน background thread ; ถ้าได้ข้อมูลใหม่ที่ต่างจากเดิมจะเรียก on_update(key, value)
+    ข้อมูลที่เก่ากว่า max_stale ต้องรอโหลดใหม่เสมอ ยกเว้นข้อมูลที่ hydrate() โหลดไว้ตอนเปิดแอป
+    background = factory ของ context manager ที่ครอบการรีเฟรชเบื้องหลัง (เช่นลดลำดับความสำคัญของ request)
+    """
+
+    def __init__(self, store=None, max_bytes=DEFAULT_MAX_BYTES, default_ttl=DEFAULT_TTL,
+                 max_stale=None, on_update=None, background=None, budgets=None):
+        self.store = store
+        self.max_bytes = max_bytes
+        self.budgets = dict(budgets or {})
+        self.default_ttl = default_ttl
+        self.max_stale = max_stale
+        self.on_update = on_update
+        self.background = background
+        self.counters = Counter()
+        self._key_counters = {}         # { key: Counter } ตัวนับแยกตาม key (hits / misses / fetches ...)
+        self._entries = OrderedDict()   # { key: _Entry } เรียงจากใช้ล่าสุดน้อยไปมาก
+        self._bytes = 0
+        self._family_bytes = Counter()  # { prefix ใน budgets: byte รวมของกลุ่มนั้น }
+        self._pinned = set()
+        self._inflight = {}             # { key: _Flight }
+        self._lock = threading.RLock()
+
+    def family(self, key):
+        """prefix ใน budgets ที่ยาวที่สุดที่ key ขึ้นต้นด้วย ; ไม่อยู่กลุ่มไหนคืน None"""
+        best = None
+        for prefix in self.budgets:
+            if key.startswith(prefix) and (best is None or len(prefix) > len(best)):
+                best = prefix
+        return best
+
+    def pin(self, keys):
+        """ตั้งชุด key ที่ห้ามไล่ออกจาก RAM (แทนชุดเดิม) เช่นเดือนปัจจุบันและโปรเจกต์ของผู้ใช้"""
+        with self._lock:
+            self._pinned = set(keys)
+
+    def _count(self, key, name):
+        with self._lock:
+            self.counters[name] += 1
+            counts = self._key_counters.get(key)
+            if counts is None:
+                counts = self._key_counters[key] = Counter()
+            counts[name] += 1
+
+    def _ttl(self, entry, ttl):
+        if ttl is not None:
+            return ttl
+        return entry.ttl if entry is not None else self.default_ttl
+
+    def get(self, key, fetch, ttl=None, revalidate=None):
+        """
+        คืนค่าของ key ; fetch() ใช้โหลดใหม่เมื่อไม่มีข้อมูลที่ยังไม่หมดอายุ
+        revalidate(key) → True แปลว่าข้อมูลเก่ายังใช้ได้ (ต่ออายุแทนการ fetch)
+        error จาก fetch จะโยนไปถึงทุก thread ที่รอ key นี้อยู่
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                age = time.time() - entry.fetched_at if entry is not None else None
+                if entry is not None and age < self._ttl(entry, ttl):
+                    self._entries.move_to_end(key)
+                    self._count(key, "hits")
+                    return entry.value
+                flight = self._inflight.get(key)
+                if entry is not None and (entry.hydrated or (self.max_stale and age < self.max_stale)):
+                    # หมดอายุแต่ยังไม่เก่าเกินไป: คืนของเดิมทันที แล้วรีเฟรชเบื้องหลัง (ถ้ายังไม่มีใครโหลดอยู่)
+                    self._entries.move_to_end(key)
+                    self._count(key, "stale_hits")
+                    if flight is None:
+                        self._refresh_async(key, fetch, self._ttl(entry, ttl), revalidate)
+                    return entry.value
+                leader = flight is None
+                if leader:
+                    flight = self._inflight[key] = _Flight()
+                    self._count(key, "misses")
+            if leader:
+                break
+            self._count(key, "shared")
+            value = flight.wait()
+            if value is not _RETRY:
+                return value
+
+        refresh = False
+        try:
+            value, refresh = self._load(key, fetch, self._ttl(entry, ttl), revalidate, entry)
+        except BaseException as e:
+            flight.finish(error=e)
+            raise
+        else:
+            flight.finish(value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                if refresh:
+                    self._refresh_async(key, fetch, self._ttl(entry, ttl), revalidate)
+
+    def _load(self, key, fetch, ttl, revalidate, entry):
+        """โหลด key ที่ไม่มีใน RAM หรือเก่าเกิน max_stale ; คืน (value, ต้องรีเฟรชเบื้องหลังต่อหรือไม่)"""
+        if self.store is not None:
+            age = self.store.age(key)
+            stale_ok = bool(self.max_stale) and age is not None and age < self.max_stale
+            if age is not None and (age < ttl or stale_ok):
+                data = self.store.load(key)
+                if data is not None:
+                    self._count(key, "disk_hits")
+                    self.put(key, data, ttl, save=False, fetched_at=time.time() - age)
+                    return data, age >= ttl
+        return self._revalidate_or_fetch(key, fetch, ttl, revalidate, entry), False
+
+    def _revalidate_or_fetch(self, key, fetch, ttl, revalidate, entry):
+
+        if revalidate is not None:
+            stale = entry.value if entry is not None else None
+            if not stale and self.store is not None:
+                stale = self.store.load(key)
+            if stale and revalidate(key):
+                self._count(key, "revalidated")
+                self.put(key, stale, ttl, save=False)
+                if self.store is not None:
+                    self.store.touch(key)
+                return stale
+
+        self._count(key, "fetches")
+        value = fetch()
+        self.put(key, value, ttl)
+        return value
+
+    def _refresh_async(self, key, fetch, ttl, revalidate):
+        """เริ่มรีเฟรช key ใน background thread (ต้องถือ self._lock อยู่ และยังไม่มี flight ของ key นี้)"""
+        flight = self._inflight[key] = _Flight()
+        self._count(key, "background_refreshes")
+
+        def run():
+            with self._lock:
+                entry = self._entries.get(key)
+            old = entry.value if entry is not None else None
+            value = _RETRY
+            try:
+                with self.background() if self.background else _no_context():
+                    value = self._revalidate_or_fetch(key, fetch, ttl, revalidate, entry)
+            except Exception as e:
+                log.warning("background refresh of '%s' failed: %s", key, e)
+            finally:
+                flight.finish(value)
+                with self._lock:
+                    self._inflight.pop(key, None)
+            if value is not _RETRY and value is not old and self.on_update is not None and value != old:
+                self._count(key, "pushed_updates")
+                try:
+                    self.on_update(key, value)
+                except Exception as e:
+                    log.warning("on_update for '%s' failed: %s", key, e)
+
+        threading.Thread(target=run, name=f"cache-refresh-{key}", daemon=True).start()
+
+    def put(self, key, value, ttl=None, save=True, fetched_at=None):
+        """เก็บค่าลง RAM (และ disk ถ้า save) แล้วไล่ key ที่ไม่ได้ใช้นานที่สุดออกจนขนาดไม่เกินงบของกลุ่มและงบรวม"""
+        entry = _Entry(value, fetched_at or time.time(), ttl or self.default_ttl, estimate_size(value))
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            family = self.family(key)
+            if family is not None:
+                self._family_bytes[family] += entry.size
+                if self._family_bytes[family] > self.budgets[family]:
+                    self._evict(key, family)
+            if self._bytes > self.max_bytes:
+                self._evict(key)
+        if save and self.store is not None:
+            self.store.save(key, value, fetched_at=entry.fetched_at)
+
+    def _remove(self, key):
+        # เรียกภายใต้ self._lock
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+            family = self.family(key)
+            if family is not None:
+                self._family_bytes[family] -= entry.size
+        return entry
+
+    def _evict(self, keep, family=None):
+        """
+        ไล่ entry ที่ไม่ได้ใช้นานที่สุด (ของกลุ่ม family หรือทั้งหมด) ออกจนไม่เกินงบ ไม่แตะ keep และ key ที่ pin ไว้
+        เรียกภายใต้ self._lock
+        """
+        if family is None:
+            over = lambda: self._bytes > self.max_bytes
+        else:
+            over = lambda: self._family_bytes[family] > self.budgets[family]
+        for key in list(self._entries):
+            if not over():
+                break
+            if key == keep or key in self._pinned or (family is not None and self.family(key) != family):
+                continue
+            evicted = self._remove(key)
+            self._count(key, "evictions")
+            log.debug("evicted '%s' (%d bytes) from RAM", key, evicted.size)
+
+    def patch(self, key, update):
+        """
+        แก้ค่าของ key ในที่แล้วเขียนทับทั้ง RAM และ disk (write-through) โดยคง fetched_at เดิม (ไม่ต่ออายุ)
+        update(value) แก้ value แล้วคืน True ถ้ามีอะไรเปลี่ยน ; ไม่มีค่าของ key หรือไม่มีอะไรเปลี่ยนคืน False
+        ถ้าระหว่างนี้มีการรีเฟรชแทนค่าเดิม จะแก้ค่าชุดใหม่ซ้ำให้
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None:
+                value, fetched_at, ttl = entry.value, entry.fetched_at, entry.ttl
+            else:
+                age = self.store.age(key) if self.store is not None else None
+                value = self.store.load(key) if age is not None else None
+                if value is None:
+                    return False
+                fetched_at, ttl = time.time() - age, None
+            with self._lock:
+                if self._entries.get(key) is not entry:
+                    continue
+                if not update(value):
+                    return False
+                self.put(key, value, ttl, save=False, fetched_at=fetched_at)
+            if self.store is not None:
+                self.store.save(key, value, fetched_at=fetched_at)
+            self._count(key, "patches")
+            return True
+
+    def hydrate(self, keys):
+        """
+        โหลดข้อมูลล่าสุดของ keys จาก disk เข้า RAM ล่วงหน้า (ตอนเปิดแอป) ไม่ว่าจะเก่าแค่ไหน ตามลำดับที่ส่งมา
+        จนเต็มงบ max_bytes ; key ที่มีใน RAM, มีคนกำลังโหลดอยู่แล้ว หรือกลุ่มเต็มงบแล้วถูกข้าม
+        ข้อมูลที่หมดอายุแล้วถูกทำเครื่องหมายให้ get() คืนค่าทันทีแล้วรีเฟรชเบื้องหลัง (แม้จะเก่ากว่า max_stale)
+        คืนรายชื่อ key ที่โหลดได้
+        """
+        loaded = []
+        if self.store is None:
+            return loaded
+        for key in keys:
+            with self._lock:
+                if self._bytes >= self.max_bytes:
+                    break
+                family = self.family(key)
+                if key in self._entries or (family is not None and self._family_bytes[family] >= self.budgets[family]):
+                    continue
+            with self.claim([key]) as claimed:
+                if key not in claimed:
+                    continue
+                age = self.store.age(key)
+                data = self.store.load(key) if age is not None else None
+                if data is None:
+                    continue
+                self.put(key, data, save=False, fetched_at=time.time() - age)
+                with self._lock:
+                    entry = self._entries.get(key)
+                    if entry is not None and age >= entry.ttl:
+                        entry.hydrated = True
+                        self._count(key, "hydrated_stale")
+                self._count(key, "hydrated")
+                loaded.append(key)
+        return loaded
+
+    def keys(self, prefix=""):
+        """key ที่มีข้อมูลทั้งใน RAM และบน disk (ขึ้นต้นด้วย prefix)"""
+        with self._lock:
+            keys = {key for key in self._entries if key.startswith(prefix)}
+        if self.store is not None:
+            keys.update(self.store.keys(prefix))
+        return sorted(keys)
+
+    def peek(self, key):
+        """ค่าใน RAM ของ key (หมดอายุแล้วก็คืน) ; ไม่มีคืน None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.value if entry is not None else None
+
+    def is_fresh(self, key, ttl=None):
+        """มีข้อมูลที่ยังไม่หมดอายุใน RAM หรือบน disk หรือไม่ (ไม่โหลดข้อมูล)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            ttl = self._ttl(entry, ttl)
+            if entry is not None and time.time() - entry.fetched_at < ttl:
+                return True
+        age = self.store.age(key) if self.store is not None else None
+        return age is not None and age < ttl
+
+    @contextmanager
+    def claim(self, keys):
+        """
+        จองหลาย key ว่ากำลังโหลดอยู่ (เช่น fetch_tabs ที่โหลดหลาย tab ใน batchGet เดียว)
+        get() ของ key เหล่านี้จาก thread อื่นจะรอผลแทนการยิง request ซ้ำ
+        yield set ของ key ที่จองได้ (key ที่มีคนกำลังโหลดอยู่แล้วจะไม่ได้) ; ผู้จองควร put() ให้ครบก่อนออกจาก block
+        """
+        with self._lock:
+            flights = {key: _Flight() for key in keys if key not in self._inflight}
+            self._inflight.update(flights)
+        try:
+            yield set(flights)
+        finally:
+            with self._lock:
+                for key, flight in flights.items():
+                    entry = self._entries.get(key)
+                    flight.finish(entry.value if entry is not None else _RETRY)
+                    self._inflight.pop(key, None)
+
+    def invalidate(self, key, disk=False):
+        """ลืมค่าใน RAM ของ key (และลบบน disk ถ้า disk=True) ให้รอบหน้าโหลดใหม่"""
+        with self._lock:
+            self._remove(key)
+        if disk and self.store is not None:
+            self.store.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._family_bytes.clear()
+        if self.store is not None:
+            self.store.clear()
+
+    def key_stats(self):
+        """ตัวนับและขนาดของแต่ละ key ตั้งแต่เปิดแอป (รวม key ที่ถูกไล่ออกจาก RAM ไปแล้ว)"""
+        now = time.time()
+        with self._lock:
+            result = {key: dict(counts) for key, counts in self._key_counters.items()}
+            for key, entry in self._entries.items():
+                result.setdefault(key, {}).update(
+                    in_ram=True, bytes=entry.size, age_sec=round(now - entry.fetched_at),
+                    rows=len(entry.value) if isinstance(entry.value, (list, dict)) else None,
+                    pinned=key in self._pinned,
+                )
+        return dict(sorted(result.items()))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "families": {
+                    family: {"bytes": self._family_bytes[family], "budget": budget,
+                             "entries": sum(1 for key in self._entries if self.family(key) == family)}
+                    for family, budget in self.budgets.items()
+                },
+                "pinned": sorted(self._pinned),
+                "inflight": len(self._inflight),
+                **self.counters,
+            }
@@ -0,0 +1,27 @@
+import pytest
+
+import fake_sheets
+import g_sheet_api
+import sheets_scheduler
+
+# test_sheet.py ต่อ Google Sheets จริงด้วย credentials.json → ไม่รันใน pytest
+collect_ignore = ["test_sheet.py"]
+
+
+@pytest.fixture
+def demo_backend(tmp_path, monkeypatch):
+    """fake_sheets backend ขนาดเล็ก + scheduler ที่ไม่ติด quota ; ไฟล์ index / cache ลง tmp_path"""
+    monkeypatch.setattr(sheets_scheduler, "scheduler", sheets_scheduler.QuotaScheduler(10**9, 10**9, background_reserve=0, base_delay=0.01))
+    monkeypatch.setattr(g_sheet_api, "MONTH_INDEX_FILE", str(tmp_path / "monthly_summary_index.json"))
+    backend = fake_sheets.build_demo_backend(staff_count=10, days=20, pages_per_staff=2)
+    g_sheet_api.use_client(backend.client())
+    yield backend
+    g_sheet_api.use_client(None)
+
+
+@pytest.fixture
+def api(demo_backend, tmp_path, monkeypatch):
+    """Api ของ rcp_center_main บน demo_backend ; cache.db / mirror.db ลง tmp_path"""
+    import rcp_center_main
+    monkeypatch.setattr(rcp_center_main, "CACHE_DIR", str(tmp_path / "cache"))
+    return rcp_center_main.Api(fake_sheets.DEMO_MASTER_URL)
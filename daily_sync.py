@@ -1,9 +1,10 @@
 import g_sheet_api
-import time
 from datetime import datetime, timedelta, timezone # <<< ตรวจสอบว่ามี timezone import แล้ว
-import traceback
 import re
-from google.api_core.exceptions import GoogleAPIError 
+import sheets_scheduler
+import sheet_records
+import app_log
+from app_log import span
 import sys # <<< ตรวจสอบว่ามีบรรทัดนี้
 
 # --- การตั้งค่าหลัก ---
@@ -13,37 +14,21 @@ TRANSACTION_SHEET_NAME = "Transaction"
 CONFIG_SHEET_NAME = "Config"
 LOCK_CELL = "L2" # หรือเซลล์อื่นที่ว่างในชีต Config
 
-# --- Retry settings ---
-MAX_RETRIES = 5
-INITIAL_RETRY_DELAY = 1 
+log = app_log.get_logger("sync")
 
-# --- โค้ดแม่แบบที่สมบูรณ์ของลูกพี่ ---
+# --- ทุก API call ผ่าน sheets_scheduler (โควต้าต่อนาที + retry 429/5xx รวมศูนย์) ---
 def retry_api_call(func, *args, **kwargs):
-    for attempt in range(1, MAX_RETRIES + 1):
-        try:
-            return func(*args, **kwargs)
-        except GoogleAPIError as e: 
-            error_message = str(e).lower()
-            if any(err_key in error_message for err_key in ["quota", "rate limit", "unavailable", "timeout", "502", "503"]):
-                wait_time = INITIAL_RETRY_DELAY * (2 ** (attempt - 1)); print(f"    ⚠️ (ครั้งที่ {attempt}/{MAX_RETRIES}) เกิดข้อผิดพลาด API: {e}. รอ {wait_time} วิ..."); time.sleep(wait_time)
-            else:
-                print(f"    ❌ เกิดข้อผิดพลาด API ที่ไม่สามารถลองใหม่ได้: {e}"); raise 
-        except Exception as e:
-            print(f"    ❌ (ครั้งที่ {attempt}/{MAX_RETRIES}) เกิดข้อผิดพลาด: {e}. รอ {INITIAL_RETRY_DELAY * (2 ** (attempt - 1))} วิ..."); time.sleep(INITIAL_RETRY_DELAY * (2 ** (attempt - 1))) 
-    raise Exception(f"ไม่สามารถดำเนินการ API call ได้หลังจาก {MAX_RETRIES} ครั้ง.")
+    return sheets_scheduler.call(func, *args, **kwargs)
 
 def get_sheet_data_as_objects(sheet, header_row=1, data_range=None):
     try:
-        all_values = retry_api_call(sheet.get, data_range) if data_range else retry_api_call(lambda: sheet.get_all_values())
+        all_values = retry_api_call(sheet.get, data_range) if data_range else retry_api_call(sheet.get_all_values)
     except Exception as e:
-        print(f"    [Helper Error] ไม่สามารถ get values จากชีต '{sheet.title}': {e}"); return []
-    if len(all_values) < header_row: return []
-    headers = [str(h).strip() for h in all_values[header_row - 1]]
-    data_rows = all_values[header_row:]
-    return [dict(zip(headers, row + [''] * (len(headers) - len(row)))) for row in data_rows]
+        log.error("    [Helper Error] ไม่สามารถ get values จากชีต '%s': %s", sheet.title, e); return []
+    return sheet_records.decode_rows(all_values, header_row, unique=False)
 
 def append_and_format_separator(sheet, text, bg_color, text_color, num_cols_to_merge=12):
-    current_highest_row_in_sheet = len(retry_api_call(lambda: sheet.get_all_values())) 
+    current_highest_row_in_sheet = len(retry_api_call(sheet.get_all_values)) 
     next_row_num = current_highest_row_in_sheet + 1
     separator_row_data = [text] + [''] * (num_cols_to_merge - 1) 
     try:
@@ -51,10 +36,9 @@ def append_and_format_separator(sheet, text, bg_color, text_color, num_cols_to_m
         merge_range = f'A{next_row_num}:{chr(ord("A") + num_cols_to_merge - 1)}{next_row_num}'
         retry_api_call(sheet.merge_cells, merge_range)
         retry_api_call(sheet.format, merge_range, {"backgroundColor": bg_color, "horizontalAlignment": "CENTER", "textFormat": { "bold": True, "foregroundColor": text_color }})
-        print(f"    👍 สร้างแถบคั่นที่แถว {next_row_num} เรียบร้อย!")
+        log.info("    👍 สร้างแถบคั่นที่แถว %s เรียบร้อย!", next_row_num)
     except Exception as e:
-        print(f"    ⚠️ ข้อผิดพลาดในการสร้างแถบคั่น '{text}': {e}"); traceback.print_exc()
-    time.sleep(0.5)
+        log.warning("    ⚠️ ข้อผิดพลาดในการสร้างแถบคั่น '%s': %s", text, e, exc_info=True)
 
 def get_target_date_and_mode():
     """
@@ -68,10 +52,10 @@ def get_target_date_and_mode():
             date_str = sys.argv[date_index]
             # แปลง format dd/mm/yyyy เป็น object date
             target_date = datetime.strptime(date_str, '%d/%m/%Y')
-            print(f"🎯 โหมด: บังคับเลือกวัน (Manual Override) | วันที่เป้าหมาย: {target_date.strftime('%d/%m/%Y')}")
+            log.info("🎯 โหมด: บังคับเลือกวัน (Manual Override) | วันที่เป้าหมาย: %s", target_date.strftime('%d/%m/%Y'))
             return target_date
         except (ValueError, IndexError):
-            print("    ⚠️ รูปแบบวันที่ในคำสั่ง --date ไม่ถูกต้อง (ต้องเป็น dd/mm/yyyy), จะใช้โหมดอัตโนมัติแทน")
+            log.warning("    ⚠️ รูปแบบวันที่ในคำสั่ง --date ไม่ถูกต้อง (ต้องเป็น dd/mm/yyyy), จะใช้โหมดอัตโนมัติแทน")
             pass
 
     # ถ้าไม่มี --date ให้ใช้ Logic เวลาอัตโนมัติเดิมของลูกพี่
@@ -79,14 +63,14 @@ def get_target_date_and_mode():
     now_bkk = now_utc + timedelta(hours=7)
     if now_bkk.hour == 0:
         target_date = now_bkk - timedelta(days=1)
-        print(f"🎯 โหมด: เก็บตกท้ายวัน (Reconciliation) | วันที่เป้าหมาย: {target_date.strftime('%d/%m/%Y')}")
+        log.info("🎯 โหมด: เก็บตกท้ายวัน (Reconciliation) | วันที่เป้าหมาย: %s", target_date.strftime('%d/%m/%Y'))
     else:
         target_date = now_bkk
-        print(f"🎯 โหมด: อัปเดตรายชั่วโมง (Hourly) | วันที่เป้าหมาย: {target_date.strftime('%d/%m/%Y')}")
+        log.info("🎯 โหมด: อัปเดตรายชั่วโมง (Hourly) | วันที่เป้าหมาย: %s", target_date.strftime('%d/%m/%Y'))
     return target_date
 
 def delete_date_block(sheet, date_str_for_header):
-    print(f"    🔍 กำลังค้นหาบล็อกข้อมูลเก่าของวันที่ {date_str_for_header} เพื่อลบ...")
+    log.info("    🔍 กำลังค้นหาบล็อกข้อมูลเก่าของวันที่ %s เพื่อลบ...", date_str_for_header)
     all_data = retry_api_call(sheet.get_all_values)
     start_marker = f"--- เริ่มต้นการประมวลผลวันที่ {date_str_for_header}"
     end_marker = f"--- สิ้นสุดการประมวลผลวันที่ {date_str_for_header}"
@@ -101,67 +85,63 @@ def delete_date_block(sheet, date_str_for_header):
             if (i + 1) < len(all_data) and all(cell == '' for cell in all_data[i+1]): current_end = i + 1
             blocks_to_delete.append((current_start, current_end)); current_start = -1
     if not blocks_to_delete:
-        print(f"    ℹ️ ไม่พบบล็อกข้อมูลเก่าของวันที่ {date_str_for_header} ที่ต้องลบ")
+        log.info("    ℹ️ ไม่พบบล็อกข้อมูลเก่าของวันที่ %s ที่ต้องลบ", date_str_for_header)
         return
     for start, end in sorted(blocks_to_delete, reverse=True):
         start_1_based, end_1_based = start + 1, end + 1
-        print(f"    🗑️ พบบล็อกข้อมูลเก่าที่แถว {start_1_based} ถึง {end_1_based}. กำลังลบ...")
+        log.info("    🗑️ พบบล็อกข้อมูลเก่าที่แถว %s ถึง %s. กำลังลบ...", start_1_based, end_1_based)
         try:
             body = {"requests": [{"deleteDimension": {"range": {"sheetId": sheet.id, "dimension": "ROWS", "startIndex": start, "endIndex": end + 1}}}]}
             retry_api_call(sheet.spreadsheet.batch_update, body)
-            print(f"    ✅ ลบข้อมูลบล็อกเก่า {start_1_based}-{end_1_based} เรียบร้อย!")
-            time.sleep(1)
+            log.info("    ✅ ลบข้อมูลบล็อกเก่า %s-%s เรียบร้อย!", start_1_based, end_1_based)
         except Exception as e:
-             print(f"    ❌ เกิดข้อผิดพลาดร้ายแรงขณะลบแถว: {e}")
+             log.error("    ❌ เกิดข้อผิดพลาดร้ายแรงขณะลบแถว: %s", e)
 
 # --- Main Sync Logic Function ---
 def run_auto_sync():
-    client = None
     try:
         # <<< แก้ไข: เพิ่ม timezone +7 แสดงใน Log เริ่มต้น >>>
-        print(f"🚀 เริ่มกระบวนการซิงค์ข้อมูลรายวันด้วย Python... [{datetime.now(timezone.utc) + timedelta(hours=7):%Y-%m-%d %H:%M:%S}]")
+        log.info("🚀 เริ่มกระบวนการซิงค์ข้อมูลรายวันด้วย Python... [%s]", f"{datetime.now(timezone.utc) + timedelta(hours=7):%Y-%m-%d %H:%M:%S}")
         # <<< END: แก้ไข >>>
 
-        client = g_sheet_api.get_gspread_client()
-        master_workbook = retry_api_call(client.open_by_url, MASTER_SHEET_URL)
-        config_sheet = retry_api_call(master_workbook.worksheet, CONFIG_SHEET_NAME)
+        config_sheet = g_sheet_api.get_worksheet(MASTER_SHEET_URL, CONFIG_SHEET_NAME)
 
         # --- [จุดตรวจสอบสถานะของ Python] ---
-        print(f"🔍 ตรวจสอบสถานะที่เซลล์ {LOCK_CELL}...")
+        log.info("🔍 ตรวจสอบสถานะที่เซลล์ %s...", LOCK_CELL)
         current_status = retry_api_call(config_sheet.acell, LOCK_CELL).value
         if current_status == "RUNNING":
-            print("❌ ข้ามการทำงาน: พบสถานะ 'RUNNING' อยู่ในระบบ อาจมีสคริปต์อื่นทำงานอยู่")
+            log.warning("❌ ข้ามการทำงาน: พบสถานะ 'RUNNING' อยู่ในระบบ อาจมีสคริปต์อื่นทำงานอยู่")
             return # ออกจากการทำงานทันที
         
         # --- แขวนป้าย "RUNNING" ---
         retry_api_call(config_sheet.update_acell, LOCK_CELL, "RUNNING")
-        print(f"🟢 แขวนป้าย 'RUNNING' ที่เซลล์ {LOCK_CELL} เรียบร้อย")  
+        log.info("🟢 แขวนป้าย 'RUNNING' ที่เซลล์ %s เรียบร้อย", LOCK_CELL)  
         
 
-        print("📥 กำลังโหลดข้อมูล Staffs และ Config...")
-        staffs_sheet, config_sheet = (retry_api_call(master_workbook.worksheet, name) for name in [STAFFS_SHEET_NAME, CONFIG_SHEET_NAME])
+        log.info("📥 กำลังโหลดข้อมูล Staffs และ Config...")
+        staffs_sheet, config_sheet = (g_sheet_api.get_worksheet(MASTER_SHEET_URL, name) for name in [STAFFS_SHEET_NAME, CONFIG_SHEET_NAME])
         all_staffs, project_configs = get_sheet_data_as_objects(staffs_sheet), {conf.get('ConfigType','').strip(): conf for conf in get_sheet_data_as_objects(config_sheet) if conf.get('ConfigType')}
-        print(f"✅ โหลดสำเร็จ! พบ {len(all_staffs)} พนักงาน และ {len(project_configs)} รูปแบบการตั้งค่า")
+        log.info("✅ โหลดสำเร็จ! พบ %s พนักงาน และ %s รูปแบบการตั้งค่า", len(all_staffs), len(project_configs))
 
         current_processing_date = get_target_date_and_mode()
         date_str_for_compare = f"{current_processing_date.day}/{current_processing_date.month}/{current_processing_date.year}"
         date_str_for_id = current_processing_date.strftime('%d%m%Y')
         date_str_for_header = current_processing_date.strftime('%d/%m/%Y')
         
-        print(f"\n--- 🔄 เริ่มกระบวนการดึงข้อมูลสำหรับวันที่ {date_str_for_header} ---")
+        log.info("--- 🔄 เริ่มกระบวนการดึงข้อมูลสำหรับวันที่ %s ---", date_str_for_header)
         transactions_to_append_data, data_rows_for_person_separator_indices, staff_data_found_for_day, num_cols = [], [], False, 12
 
         for i, staff in enumerate(all_staffs):
             email, sheet_url, config_type, project_name = (staff.get(k, "").strip() for k in ["E-Mail", "PersonalSheetURL", "ConfigType", "Project Name"])
-            print(f"\n--- ⚙️ ({i+1}/{len(all_staffs)}) กำลังประมวลผลของ: {email} ---")
-            if not all([email, sheet_url, config_type]): print(f"    ⏩ ข้าม: ข้อมูลพนักงานไม่ครบถ้วน"); continue
+            log.info("--- ⚙️ (%s/%s) กำลังประมวลผลของ: %s ---", i+1, len(all_staffs), email)
+            if not all([email, sheet_url, config_type]): log.debug("    ⏩ ข้าม: ข้อมูลพนักงานไม่ครบถ้วน"); continue
             config = project_configs.get(config_type)
-            if not config: print(f"    ⏩ ข้าม: ไม่พบการตั้งค่าสำหรับ ConfigType '{config_type}'"); continue
+            if not config: log.debug("    ⏩ ข้าม: ไม่พบการตั้งค่าสำหรับ ConfigType '%s'", config_type); continue
             try:
-                emp_workbook = retry_api_call(client.open_by_url, sheet_url)
-                project_sheet, mgmt_sheet, timestamps_sheet = (retry_api_call(emp_workbook.worksheet, name) for name in [config['EmployeeSheetTab'], config['MgmtSheetTab'], 'Timestamps'])
-                emp_data_as_grid, timestamps_data_as_grid = retry_api_call(project_sheet.get_all_values), retry_api_call(timestamps_sheet.get_all_values)
-                mgmt_data_objects = get_sheet_data_as_objects(mgmt_sheet, int(config.get('MgmtHeaderRow', 1)), config.get('MgmtDataRange'))
+                with span(log, "    fetch sheets of %s", email):
+                    project_sheet, mgmt_sheet, timestamps_sheet = (g_sheet_api.get_worksheet(sheet_url, name) for name in [config['EmployeeSheetTab'], config['MgmtSheetTab'], 'Timestamps'])
+                    emp_data_as_grid, timestamps_data_as_grid = retry_api_call(project_sheet.get_all_values), retry_api_call(timestamps_sheet.get_all_values)
+                    mgmt_data_objects = get_sheet_data_as_objects(mgmt_sheet, int(config.get('MgmtHeaderRow', 1)), config.get('MgmtDataRange'))
                 date_col_index = ord(config.get('DateColumn').upper()) - 65
                 submission_row, timestamps_row, submission_row_index = None, None, -1
                 for idx, row in enumerate(emp_data_as_grid[1:]): 
@@ -170,12 +150,12 @@ def run_auto_sync():
                         try:
                             parts = row_date_str.replace('-', '/').split('/'); d, m, y = map(int, parts); y += 2000 if y < 100 else 0
                             if f"{d}/{m}/{y}" == date_str_for_compare:
-                                submission_row, submission_row_index = row, idx + 1; print(f"    👍 พบข้อมูลส่งงานของวันที่ {date_str_for_compare} ที่แถว {submission_row_index + 1}"); break
+                                submission_row, submission_row_index = row, idx + 1; log.debug("    👍 พบข้อมูลส่งงานของวันที่ %s ที่แถว %s", date_str_for_compare, submission_row_index + 1); break
                         except (ValueError, IndexError): continue
                 if submission_row_index != -1 and submission_row_index < len(timestamps_data_as_grid):
-                    timestamps_row = timestamps_data_as_grid[submission_row_index]; print(f"    👍 พบข้อมูลเวลาที่แถว {submission_row_index + 1}")
+                    timestamps_row = timestamps_data_as_grid[submission_row_index]; log.debug("    👍 พบข้อมูลเวลาที่แถว %s", submission_row_index + 1)
                 if not submission_row:
-                    print(f"    -> ไม่พบข้อมูลส่งงานของวันที่ {date_str_for_compare}"); continue
+                    log.debug("    -> ไม่พบข้อมูลส่งงานของวันที่ %s", date_str_for_compare); continue
                 
                 status_header, name_header, url_header = config.get('MgmtStatusColumn'), config.get('MgmtTypeNameColumn'), config.get('MgmtUrlColumn')
                 active_page_map = {int(re.search(r'\d+', str(item.get('No.'))).group(0)): item for item in mgmt_data_objects if 'active' in str(item.get(status_header, '')).strip().lower() and item.get('No.') and re.search(r'\d+', str(item.get('No.')))}
@@ -190,8 +170,8 @@ def run_auto_sync():
                     time_sent = str(timestamps_row[(page_num * 2) + 1]).strip() if timestamps_row and (page_num * 2) + 1 < len(timestamps_row) else ''
                     page_details = active_page_map.get(page_num)
                     page_name, page_url = (page_details.get(name_header, ''), page_details.get(url_header, '')) if page_details else ('', '')
-                    if page_details or time_sent: print(f"    ✔️ เพจ #{page_num}: พบข้อมูล! เวลา: {time_sent}")
-                    else: print(f"    ❌ เพจ #{page_num}: ไม่พบข้อมูลที่ Active หรือไม่มีเวลาส่ง")
+                    if page_details or time_sent: log.debug("    ✔️ เพจ #%s: พบข้อมูล! เวลา: %s", page_num, time_sent)
+                    else: log.debug("    ❌ เพจ #%s: ไม่พบข้อมูลที่ Active หรือไม่มีเวลาส่ง", page_num)
                     # <<< START: แก้ไขจุดนี้ >>>
                     now_bkk_for_sync = datetime.now(timezone.utc) + timedelta(hours=7)
                     sync_timestamp_str = now_bkk_for_sync.strftime('%d/%m/%Y, %H:%M:%S')
@@ -201,40 +181,40 @@ def run_auto_sync():
                     staff_transactions_for_current_staff.append(new_row)
 
                 if staff_transactions_for_current_staff:
-                    print(f"    ✍️ เตรียมข้อมูล {len(staff_transactions_for_current_staff)} แถวของ {email} เพื่อรวมใน Batch...")
+                    log.debug("    ✍️ เตรียมข้อมูล %s แถวของ %s เพื่อรวมใน Batch...", len(staff_transactions_for_current_staff), email)
                     transactions_to_append_data.extend(staff_transactions_for_current_staff)
                     staff_data_found_for_day = True 
                     if i < len(all_staffs) - 1: 
                         transactions_to_append_data.append([''] * num_cols); data_rows_for_person_separator_indices.append(len(transactions_to_append_data) - 1)
                 else:
-                    print(f"    ℹ️ ไม่มีข้อมูลที่สามารถดึงมาได้สำหรับ {email} ในวันนี้")
-            except Exception as e: print(f"    ❌ เกิดข้อผิดพลาดกับชีตของ {email}: {e}"); traceback.print_exc()
+                    log.info("    ℹ️ ไม่มีข้อมูลที่สามารถดึงมาได้สำหรับ %s ในวันนี้", email)
+            except Exception as e: log.error("    ❌ เกิดข้อผิดพลาดกับชีตของ %s: %s", email, e, exc_info=True)
         
         # --- ส่วนที่ 2: เขียนและจัดรูปแบบ (จัดลำดับใหม่ตามคำสั่ง) ---
         if not staff_data_found_for_day:
-            print(f"\nℹ️ ไม่มีข้อมูลใหม่สำหรับวันที่ {date_str_for_header} ในรอบนี้")
+            log.info("ℹ️ ไม่มีข้อมูลใหม่สำหรับวันที่ %s ในรอบนี้", date_str_for_header)
         else:
-            transaction_sheet = retry_api_call(master_workbook.worksheet, TRANSACTION_SHEET_NAME)
+            transaction_sheet = g_sheet_api.get_worksheet(MASTER_SHEET_URL, TRANSACTION_SHEET_NAME)
 
             # <<< START: จัดลำดับใหม่ตามคำสั่งของลูกพี่ >>>
             # 1. ลบบล็อกเก่าทิ้งก่อน
             delete_date_block(transaction_sheet, date_str_for_header)
             
             # 2. เขียนข้อมูลดิบและแถบคั่นบุคคลลงไปก่อน (เร็ว)
-            print(f"\n✍️ กำลังเขียนข้อมูลใหม่ {len(transactions_to_append_data)} แถวลงใน Transaction Sheet...")
-            initial_row_count = len(retry_api_call(lambda: transaction_sheet.get_all_values())) 
+            log.info("✍️ กำลังเขียนข้อมูลใหม่ %s แถวลงใน Transaction Sheet...", len(transactions_to_append_data))
+            initial_row_count = len(retry_api_call(transaction_sheet.get_all_values)) 
             retry_api_call(transaction_sheet.append_rows, transactions_to_append_data, value_input_option='USER_ENTERED')
-            print("    ✅ เขียนข้อมูล Batch เสร็จสิ้น!")
+            log.info("    ✅ เขียนข้อมูล Batch เสร็จสิ้น!")
 
             # 3. จัดรูปแบบแถบคั่นบุคคลที่เพิ่งเขียนไป
             person_separator_bg_color = { "red": 0.95, "green": 0.98, "blue": 0.95 }
-            print(f"    ⚡️ กำลังจัดรูปแบบแถวคั่นบุคคลทีละแถว...")
+            log.info("    ⚡️ กำลังจัดรูปแบบแถวคั่นบุคคลทีละแถว...")
             for relative_idx in data_rows_for_person_separator_indices:
                 current_absolute_row_num_1based = initial_row_count + relative_idx + 1 
                 format_range = f'A{current_absolute_row_num_1based}:{chr(ord("A") + num_cols - 1)}{current_absolute_row_num_1based}'
                 try: retry_api_call(transaction_sheet.format, format_range, {"backgroundColor": person_separator_bg_color})
-                except Exception as e: print(f"    ❌ ข้อผิดพลาดในการจัดรูปแบบแถวคั่นบุคคลที่แถว {current_absolute_row_num_1based}: {e}")
-            print("    ✅ จัดรูปแบบแถวคั่นบุคคลเสร็จสิ้น!")
+                except Exception as e: log.error("    ❌ ข้อผิดพลาดในการจัดรูปแบบแถวคั่นบุคคลที่แถว %s: %s", current_absolute_row_num_1based, e)
+            log.info("    ✅ จัดรูปแบบแถวคั่นบุคคลเสร็จสิ้น!")
             
             # 4. สร้างแถบคั่นหัว-ท้าย และแถวว่าง ทีหลัง (ตาม Logic เดิม)
             daily_separator_bg_color = { "red": 0.95, "green": 0.95, "blue": 0.8 }; daily_separator_text_color = { "red": 0.5, "green": 0.5, "blue": 0.2 }
@@ -242,11 +222,10 @@ def run_auto_sync():
             
             # --- START FIX: แก้ไข NameError และ DeprecationWarning ---
             # แก้ไข: ใช้ตัวแปรที่ถูกต้องคือ date_str_for_header
-            print(f"\n--- 📅 กำลังสร้างแถบคั่นเริ่มต้นสำหรับวันที่ {date_str_for_header} ---")
+            log.info("--- 📅 กำลังสร้างแถบคั่นเริ่มต้นสำหรับวันที่ %s ---", date_str_for_header)
             
             new_block_start_row = initial_row_count + 1
             retry_api_call(transaction_sheet.insert_rows, [['']]*3, row=new_block_start_row, value_input_option='USER_ENTERED')
-            time.sleep(1)
             
             header_range = f'A{new_block_start_row}'
             # แก้ไข: เปลี่ยนลำดับ argument ใน .update()
@@ -257,67 +236,63 @@ def run_auto_sync():
             blank_range = f'A{new_block_start_row+1}:{chr(ord("A") + num_cols - 1)}{new_block_start_row+2}'
             retry_api_call(transaction_sheet.format, blank_range, {"backgroundColor": blank_row_clean_color})
 
-            print("    ✅ สร้างแถบคั่นเริ่มต้นและแถวว่างเรียบร้อย!")
+            log.info("    ✅ สร้างแถบคั่นเริ่มต้นและแถวว่างเรียบร้อย!")
             # --- END FIX ---
             
-            print("\n✅ ประมวลผลข้อมูลรายบุคคลเสร็จสิ้น กำลังสร้างแถบคั่นประจำวัน...")
+            log.info("✅ ประมวลผลข้อมูลรายบุคคลเสร็จสิ้น กำลังสร้างแถบคั่นประจำวัน...")
             append_and_format_separator(transaction_sheet, f"--- สิ้นสุดการประมวลผลวันที่ {date_str_for_header} ---", daily_separator_bg_color, daily_separator_text_color, num_cols)
             
-            print("    ✨ เพิ่มแถวว่างเปล่าเพื่อคั่นวันถัดไปและล้างการจัดรูปแบบ...")
-            current_rows_after_all_data = len(retry_api_call(lambda: transaction_sheet.get_all_values())) 
+            log.info("    ✨ เพิ่มแถวว่างเปล่าเพื่อคั่นวันถัดไปและล้างการจัดรูปแบบ...")
+            current_rows_after_all_data = len(retry_api_call(transaction_sheet.get_all_values)) 
             retry_api_call(transaction_sheet.append_row, [''] * num_cols, value_input_option='USER_ENTERED')
             format_range_for_clean_blank = f'A{current_rows_after_all_data + 1}:{chr(ord("A") + num_cols - 1)}{current_rows_after_all_data + 1}'
             retry_api_call(transaction_sheet.format, format_range_for_clean_blank, {"backgroundColor": blank_row_clean_color, "textFormat": { "bold": False, "foregroundColor": { "red": 0, "green": 0, "blue": 0 } } })
-            time.sleep(0.5)
             # <<< END: จัดลำดับใหม่ >>>
             
     except Exception as e:
-        print(f"🔥🔥🔥 เกิดข้อผิดพลาดร้ายแรงในกระบวนการซิงค์: {e}")
-        traceback.print_exc()
+        log.exception("🔥🔥🔥 เกิดข้อผิดพลาดร้ายแรงในกระบวนการซิงค์: %s", e)
 
     # <<< แก้ไข: เพิ่ม timezone +7 แสดงใน Log สุดท้าย >>>
-    print(f"\n--- 🎉 การซิงค์ข้อมูลทั้งหมดเสร็จสิ้น --- [{datetime.now(timezone.utc) + timedelta(hours=7):%Y-%m-%d %H:%M:%S}]")
-    time.sleep(1) 
+    log.info("--- 🎉 การซิงค์ข้อมูลทั้งหมดเสร็จสิ้น --- [%s]", f"{datetime.now(timezone.utc) + timedelta(hours=7):%Y-%m-%d %H:%M:%S}")
 
 if __name__ == '__main__':
+    # สคริปต์นี้ log เป็นข้อความล้วนเหมือน print เดิม (ระดับตั้งได้ทาง RCP_LOG_LEVEL)
+    app_log.setup(fmt="%(message)s")
     # กำหนดค่าคงที่สำหรับ "เก็บป้าย" โดยเฉพาะ
     LOCK_CELL = "L2" 
     CONFIG_SHEET_NAME = "Config"
     
-    g_sheet_client = None
     config_sheet_main = None
-    master_workbook_main = None
 
     try:
         # สั่งให้ฟังก์ชันหลักทำงาน
         run_auto_sync()
     except Exception as main_exc:
         # ดักจับ Error ที่อาจจะหลุดออกมา
-        print(f"--- 🔴 สคริปต์หยุดทำงานเนื่องจากมีข้อผิดพลาดร้ายแรง: {main_exc} ---")
+        log.error("--- 🔴 สคริปต์หยุดทำงานเนื่องจากมีข้อผิดพลาดร้ายแรง: %s ---", main_exc)
     finally:
         # ไม่ว่าโปรแกรมจะทำงานสำเร็จหรือล้มเหลว
         # โค้ดส่วนนี้จะทำงาน "สุดท้ายเสมอ" เพื่อเก็บป้าย
-        print("\n--- 🏁 จบการทำงานทั้งหมด กำลังเก็บป้ายสถานะ ---")
+        log.info("--- 🏁 จบการทำงานทั้งหมด กำลังเก็บป้ายสถานะ ---")
         try:
             # เชื่อมต่อ API ใหม่อีกครั้ง
-            g_sheet_client = g_sheet_api.get_gspread_client()
-            master_workbook_main = retry_api_call(g_sheet_client.open_by_url, MASTER_SHEET_URL) # <<< แก้ไข: เรียกใช้ retry_api_call ตรงๆ
-            config_sheet_main = retry_api_call(master_workbook_main.worksheet, CONFIG_SHEET_NAME) # <<< แก้ไข: เรียกใช้ retry_api_call ตรงๆ
+            # ล้าง handle เดิมเพื่อให้ได้ col_count ล่าสุดหลังการซิงค์
+            g_sheet_api.invalidate_sheet_cache(MASTER_SHEET_URL)
+            config_sheet_main = g_sheet_api.get_worksheet(MASTER_SHEET_URL, CONFIG_SHEET_NAME)
              # --- [แทรกโค้ดบล็อกนี้เข้าไป] ---
-            print("    🧹 กำลังตรวจสอบและล้างคอลัมน์ส่วนเกิน (M-S)...")
-            transaction_sheet_main = retry_api_call(master_workbook_main.worksheet, TRANSACTION_SHEET_NAME)
+            log.info("    🧹 กำลังตรวจสอบและล้างคอลัมน์ส่วนเกิน (M-S)...")
+            transaction_sheet_main = g_sheet_api.get_worksheet(MASTER_SHEET_URL, TRANSACTION_SHEET_NAME)
             # เราจะลบคอลัมน์ที่ 13 (M) ออกไป 7 ครั้ง (M, N, O, P, Q, R, S)
             for _ in range(7):
                 # เช็คก่อนว่ามีคอลัมน์เกินหรือไม่
                 if transaction_sheet_main.col_count > 12:
                     retry_api_call(transaction_sheet_main.delete_columns, 13) # 13 คือคอลัมน์ M
-                    time.sleep(0.5) # พักให้ API ทำงาน
-            print("    ✅ ล้างคอลัมน์ส่วนเกินเรียบร้อยแล้ว")
+            log.info("    ✅ ล้างคอลัมน์ส่วนเกินเรียบร้อยแล้ว")
             # --- [จบส่วนที่แทรก] ---
 
             # สั่งอัปเดตเซลล์เพื่อเก็บป้าย
             retry_api_call(config_sheet_main.update_acell, LOCK_CELL, "IDLE") # <<< แก้ไข: เรียกใช้ retry_api_call ตรงๆ
-            print(f"⚪️ เก็บป้าย กลับสู่สถานะ 'IDLE' ที่เซลล์ {LOCK_CELL} เรียบร้อยแล้ว")
+            log.info("⚪️ เก็บป้าย กลับสู่สถานะ 'IDLE' ที่เซลล์ %s เรียบร้อยแล้ว", LOCK_CELL)
 
         except Exception as e_final:
-            print(f"    ❌ เกิดข้อผิดพลาดตอนพยายามเก็บป้ายครั้งสุดท้าย: {e_final}")
\ No newline at end of file
+            log.error("    ❌ เกิดข้อผิดพลาดตอนพยายามเก็บป้ายครั้งสุดท้าย: %s", e_final)
\ No newline at end of file
@@ -0,0 +1,573 @@
+"""
+Google Sheets ปลอมในหน่วยความจำ สำหรับวัดความเร็ว / ทดสอบแบบ offline
+
+ใช้แทน gspread client จริงผ่าน g_sheet_api.use_client():
+
+    backend = fake_sheets.build_demo_backend(staff_count=200, days=90)
+    g_sheet_api.use_client(backend.client())
+    api = Api(fake_sheets.DEMO_MASTER_URL)
+
+- เก็บ workbook หลายไฟล์ (master: Staffs / Transaction / Monthly_Summary / Config / tab โปรเจกต์
+  และ workbook ส่วนตัวของพนักงานแต่ละคนที่มี tab งาน / tab จัดการเพจ / Timestamps)
+- หน่วงเวลาต่อ request ได้ (latency, jitter) และสุ่มหรือสั่งให้ตอบ 429 ได้
+- นับทุก request แยกตามชื่อ method (backend.calls) และแยก read / write
+
+รันเป็นสคริปต์เพื่อ benchmark Api และ daily_sync.run_auto_sync:
+    python fake_sheets.py --staff 200 --days 90 --latency 0.05
+"""
+import random
+import re
+import threading
+import time
+import json
+from collections import Counter
+from datetime import datetime, timedelta
+
+import gspread
+import requests
+
+
+# method ที่นับเป็น read request (ที่เหลือเป็น write)
+READ_CALLS = {
+    "open_by_key", "open_by_url", "open", "worksheets", "worksheet", "fetch_sheet_metadata",
+    "values_get", "values_batch_get", "get_all_values", "get_all_records", "get", "acell", "cell",
+    "row_values", "col_values",
+}
+
+
+def _quota_error(status=429, message="Quota exceeded for quota metric 'Read requests'"):
+    """สร้าง gspread APIError แบบเดียวกับที่ได้จาก Google จริง"""
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(
+        {"error": {"code": status, "message": message, "status": "RESOURCE_EXHAUSTED"}}
+    ).encode("utf-8")
+    return gspread.exceptions.APIError(response)
+
+
+def _column_index(letters):
+    index = 0
+    for ch in letters.upper():
+        index = index * 26 + (ord(ch) - 64)
+    return index
+
+
+def _parse_cell(ref):
+    """'B12' → (12, 2) ; 'B' → (None, 2) ; '12' → (12, None)"""
+    m = re.fullmatch(r"([A-Za-z]*)(\d*)", ref)
+    if not m or not ref:
+        raise ValueError(f"Bad A1 reference: {ref}")
+    letters, digits = m.groups()
+    return (int(digits) if digits else None), (_column_index(letters) if letters else None)
+
+
+def parse_a1(a1):
+    """
+    "'Tab'!A2:C" → ("Tab", (row1, col1, row2, col2)) ; ค่า None = ไม่จำกัด
+    ถ้าไม่มีชื่อ tab จะคืน title เป็น None
+    """
+    title = None
+    if "!" in a1:
+        title, a1 = a1.rsplit("!", 1)
+        if title.startswith("'") and title.endswith("'"):
+            title = title[1:-1].replace("''", "'")
+    elif not re.fullmatch(r"[A-Za-z]*\d*(:[A-Za-z]*\d*)?", a1):
+        return a1.strip("'").replace("''", "'"), (None, None, None, None)
+    start, _, end = a1.partition(":")
+    r1, c1 = _parse_cell(start)
+    r2, c2 = _parse_cell(end) if end else (r1, c1)
+    return title, (r1, c1, r2, c2)
+
+
+class FakeCell:
+    def __init__(self, row, col, value):
+        self.row = row
+        self.col = col
+        self.value = value
+
+
+class FakeBackend:
+    """
+    สถานะรวมของ Sheets ปลอม: workbook ทั้งหมด, ตัวนับ request และการจำลอง latency / 429
+      latency     : วินาทีต่อ request
+      jitter      : สุ่มบวกเพิ่ม 0..jitter วินาที
+      error_rate  : โอกาส (0..1) ที่ request จะโดน 429
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.workbooks = {}
+        self.calls = Counter()
+        self.reads = 0
+        self.writes = 0
+        self.errors = 0
+        self._fail_next = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def client(self):
+        return FakeClient(self)
+
+    def add_workbook(self, sheet_id, tabs, title=None):
+        """tabs = { ชื่อ tab: grid (list ของ list) } ; คืน FakeSpreadsheet"""
+        book = FakeSpreadsheet(self, sheet_id, title or sheet_id)
+        for name, grid in tabs.items():
+            book.add_worksheet(name, grid)
+        self.workbooks[sheet_id] = book
+        return book
+
+    def fail_next(self, count=1, status=429):
+        """ให้ request ถัดไป count ครั้งตอบ error ตาม status"""
+        with self._lock:
+            self._fail_next.extend([status] * count)
+
+    def reset_counters(self):
+        with self._lock:
+            self.calls.clear()
+            self.reads = self.writes = self.errors = 0
+
+    def stats(self):
+        with self._lock:
+            return {"reads": self.reads, "writes": self.writes, "errors": self.errors, "calls": dict(self.calls)}
+
+    def hit(self, method):
+        """เรียกทุกครั้งที่มี request: นับ, หน่วงเวลา, และอาจโยน 429"""
+        with self._lock:
+            self.calls[method] += 1
+            if method in READ_CALLS:
+                self.reads += 1
+            else:
+                self.writes += 1
+            status = self._fail_next.pop(0) if self._fail_next else None
+            if status is None and self.error_rate and self._random.random() < self.error_rate:
+                status = 429
+            if status is not None:
+                self.errors += 1
+            delay = self.latency + (self._random.random() * self.jitter if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        if status is not None:
+            raise _quota_error(status)
+
+
+class FakeClient:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def _book(self, key):
+        book = self.backend.workbooks.get(key)
+        if book is None:
+            raise gspread.exceptions.SpreadsheetNotFound(key)
+        return book
+
+    def open_by_key(self, key):
+        self.backend.hit("open_by_key")
+        return self._book(key)
+
+    def open_by_url(self, url):
+        self.backend.hit("open_by_url")
+        return self._book(gspread.utils.extract_id_from_url(url))
+
+    def open(self, title):
+        self.backend.hit("open")
+        for book in self.backend.workbooks.values():
+            if book.title == title:
+                return book
+        raise gspread.exceptions.SpreadsheetNotFound(title)
+
+
+class FakeSpreadsheet:
+    def __init__(self, backend, sheet_id, title):
+        self.backend = backend
+        self.id = sheet_id
+        self.title = title
+        self._worksheets = []
+        self._next_ws_id = 0
+
+    def add_worksheet(self, title, grid=None, rows=None, cols=None):
+        ws = FakeWorksheet(self, self._next_ws_id, title, grid or [])
+        self._next_ws_id += 1
+        self._worksheets.append(ws)
+        return ws
+
+    def _ws(self, title):
+        for ws in self._worksheets:
+            if ws.title == title:
+                return ws
+        raise gspread.exceptions.WorksheetNotFound(title)
+
+    def worksheets(self, exclude_hidden=False):
+        self.backend.hit("worksheets")
+        return list(self._worksheets)
+
+    def worksheet(self, title):
+        self.backend.hit("worksheet")
+        return self._ws(title)
+
+    def fetch_sheet_metadata(self, params=None):
+        self.backend.hit("fetch_sheet_metadata")
+        return {"sheets": [{"properties": {"sheetId": ws.id, "title": ws.title}} for ws in self._worksheets]}
+
+    def _read_range(self, a1):
+        title, bounds = parse_a1(a1)
+        ws = self._ws(title) if title else self._worksheets[0]
+        return {"range": a1, "majorDimension": "ROWS", "values": ws.read(bounds)}
+
+    def values_get(self, range, params=None):
+        self.backend.hit("values_get")
+        return self._read_range(range)
+
+    def values_batch_get(self, ranges, params=None):
+        self.backend.hit("values_batch_get")
+        return {"spreadsheetId": self.id, "valueRanges": [self._read_range(r) for r in ranges]}
+
+    def values_batch_update(self, body):
+        self.backend.hit("values_batch_update")
+        for item in body.get("data", []):
+            title, (r1, c1, _, _) = parse_a1(item["range"])
+            self._ws(title).write(r1 or 1, c1 or 1, item.get("values", []))
+        return {"spreadsheetId": self.id, "totalUpdatedCells": sum(len(r) for d in body.get("data", []) for r in d.get("values", []))}
+
+    def batch_update(self, body):
+        self.backend.hit("batch_update")
+        for req in body.get("requests", []):
+            delete = req.get("deleteDimension")
+            if delete:
+                rng = delete["range"]
+                ws = next(w for w in self._worksheets if w.id == rng["sheetId"])
+                if rng.get("dimension", "ROWS") == "ROWS":
+                    del ws.grid[rng["startIndex"]:rng["endIndex"]]
+                else:
+                    for row in ws.grid:
+                        del row[rng["startIndex"]:rng["endIndex"]]
+                    ws.col_count -= rng["endIndex"] - rng["startIndex"]
+        return {"spreadsheetId": self.id, "replies": [{} for _ in body.get("requests", [])]}
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, ws_id, title, grid):
+        self.spreadsheet = spreadsheet
+        self.id = ws_id
+        self.title = title
+        self.grid = [[str(cell) for cell in row] for row in grid]
+        self.col_count = max([len(row) for row in self.grid] + [26])
+
+    @property
+    def row_count(self):
+        return max(len(self.grid), 1000)
+
+    def _hit(self, method):
+        self.spreadsheet.backend.hit(method)
+
+    # ─── อ่าน ───
+    def read(self, bounds, pad=False):
+        """อ่านช่วง (row1, col1, row2, col2) แบบ API จริง: ตัดเซลล์ว่างท้ายแถวและแถวว่างท้ายช่วง"""
+        r1, c1, r2, c2 = bounds
+        rows = self.grid[(r1 or 1) - 1:r2]
+        out = []
+        for row in rows:
+            cells = row[(c1 or 1) - 1:c2]
+            if not pad:
+                while cells and cells[-1] == "":
+                    cells = cells[:-1]
+            out.append(list(cells))
+        while out and not any(out[-1]):
+            out.pop()
+        if pad and out:
+            width = max(len(r) for r in out)
+            for r in out:
+                r.extend([""] * (width - len(r)))
+        return out
+
+    def get_all_values(self, **kwargs):
+        self._hit("get_all_values")
+        return self.read((None, None, None, None), pad=True)
+
+    def get_values(self, range_name=None, **kwargs):
+        self._hit("get")
+        bounds = parse_a1(range_name)[1] if range_name else (None, None, None, None)
+        return self.read(bounds, pad=True)
+
+    def get(self, range_name=None, **kwargs):
+        self._hit("get")
+        bounds = parse_a1(range_name)[1] if range_name else (None, None, None, None)
+        return self.read(bounds)
+
+    def get_all_records(self, head=1, **kwargs):
+        self._hit("get_all_records")
+        values = self.read((None, None, None, None), pad=True)
+        if len(values) < head:
+            return []
+        header = values[head - 1]
+        return [dict(zip(header, [gspread.utils.numericise(v) for v in row])) for row in values[head:]]
+
+    def acell(self, label, **kwargs):
+        self._hit("acell")
+        row, col = gspread.utils.a1_to_rowcol(label)
+        return FakeCell(row, col, self._value(row, col))
+
+    def cell(self, row, col, **kwargs):
+        self._hit("cell")
+        return FakeCell(row, col, self._value(row, col))
+
+    def row_values(self, row, **kwargs):
+        self._hit("row_values")
+        return self.read((row, None, row, None))[0] if row <= len(self.grid) else []
+
+    def col_values(self, col, **kwargs):
+        self._hit("col_values")
+        values = [r[0] if r else "" for r in self.read((None, col, None, col), pad=True)]
+        while values and values[-1] == "":
+            values.pop()
+        return values
+
+    def _value(self, row, col):
+        if row <= len(self.grid) and col <= len(self.grid[row - 1]):
+            return self.grid[row - 1][col - 1]
+        return ""
+
+    # ─── เขียน ───
+    def write(self, row, col, values):
+        for r_off, row_values in enumerate(values):
+            r = row + r_off
+            while len(self.grid) < r:
+                self.grid.append([])
+            target = self.grid[r - 1]
+            for c_off, value in enumerate(row_values):
+                c = col + c_off
+                if len(target) < c:
+                    target.extend([""] * (c - len(target)))
+                target[c - 1] = "" if value is None else str(value)
+            self.col_count = max(self.col_count, len(target))
+
+    def update(self, values=None, range_name=None, **kwargs):
+        self._hit("update")
+        if isinstance(values, str) and isinstance(range_name, list):
+            values, range_name = range_name, values
+        r1, c1, _, _ = parse_a1(range_name or "A1")[1]
+        self.write(r1 or 1, c1 or 1, values)
+        return {"updatedRange": range_name}
+
+    def update_acell(self, label, value):
+        self._hit("update_acell")
+        row, col = gspread.utils.a1_to_rowcol(label)
+        self.write(row, col, [[value]])
+
+    def update_cell(self, row, col, value):
+        self._hit("update_cell")
+        self.write(row, col, [[value]])
+
+    def _last_row(self):
+        n = len(self.grid)
+        while n and not any(self.grid[n - 1]):
+            n -= 1
+        return n
+
+    def append_row(self, values, **kwargs):
+        self._hit("append_row")
+        self.write(self._last_row() + 1, 1, [values])
+
+    def append_rows(self, values, **kwargs):
+        self._hit("append_rows")
+        self.write(self._last_row() + 1, 1, values)
+
+    def insert_rows(self, values, row=1, **kwargs):
+        self._hit("insert_rows")
+        self.grid[row - 1:row - 1] = [[str(v) for v in r] for r in values]
+
+    def delete_rows(self, start_index, end_index=None):
+        self._hit("delete_rows")
+        del self.grid[start_index - 1:(end_index or start_index)]
+
+    def insert_cols(self, values, col=1, **kwargs):
+        self._hit("insert_cols")
+        width = max([len(self.grid)] + [len(column) for column in values])
+        while len(self.grid) < width:
+            self.grid.append([])
+        for r, row in enumerate(self.grid):
+            if len(row) < col - 1:
+                row.extend([""] * (col - 1 - len(row)))
+            row[col - 1:col - 1] = [str(column[r]) if r < len(column) else "" for column in values]
+        self.col_count += len(values)
+
+    def delete_columns(self, start_index, end_index=None):
+        self._hit("delete_columns")
+        end_index = end_index or start_index
+        for row in self.grid:
+            del row[start_index - 1:end_index]
+        self.col_count -= end_index - start_index + 1
+
+    def merge_cells(self, name, merge_type="MERGE_ALL"):
+        self._hit("merge_cells")
+
+    def format(self, ranges, format=None):
+        self._hit("format")
+
+
+# ─── ข้อมูลตัวอย่างขนาดใกล้เคียงของจริง ───────────────────
+
+DEMO_MASTER_ID = "17lOtuHum9VHdukfHr7143uCGydVZSaJNi2RhzGfh81g"
+DEMO_MASTER_URL = f"https://docs.google.com/spreadsheets/d/{DEMO_MASTER_ID}/edit#gid=0"
+
+PROJECT_HEADER = [
+    "วันที่", "No.", "ชื่อเพจ/ช่อง", "ลิงก์เพจ", "FB", "IG", "ลิงก์คลิป 1", "ลิงก์คลิป 2",
+    "ยอดวิว 1", "ยอดวิว 2", "สถานะส่งงาน", "เวลาส่ง 1", "เวลาส่ง 2", "Clips_Sent",
+]
+STAFFS_HEADER = [
+    "ID", "Name", "E-Mail", "Role", "Project Name", "Status", "AvatarUrl", "DailyTarget",
+    "FB", "IG", "PersonalSheetURL", "ConfigType",
+]
+TRANSACTION_HEADER = [
+    "RecordID", "SyncTimestamp", "EmployeeEmail", "ProjectPage", "SubmissionDate", "Link1", "Link2",
+    "Status", "SheetURL", "LinkPage", "NamePage", "TimeSent", "Clips_Sent",
+]
+MONTHLY_HEADER = ["Date", "Name", "Project", "SheetName", "TotalSent", "สถานะ", "MissingDays", "LeaveDays"]
+CONFIG_HEADER = [
+    "ConfigType", "EmployeeSheetTab", "MgmtSheetTab", "MgmtHeaderRow", "MgmtDataRange", "DateColumn",
+    "MgmtStatusColumn", "MgmtTypeNameColumn", "MgmtUrlColumn", "PageStartColumn", "ColumnsPerPage", "",
+]
+
+
+def build_demo_backend(staff_count=50, days=60, pages_per_staff=4, projects=None, end_date=None,
+                       latency=0.0, jitter=0.0, error_rate=0.0, seed=1):
+    """
+    สร้าง backend พร้อม master workbook (id = DEMO_MASTER_ID) และ workbook ส่วนตัวของพนักงานทุกคน
+    ข้อมูลย้อนหลัง days วันจาก end_date (ค่าเริ่มต้นคือวันนี้)
+    """
+    rnd = random.Random(seed)
+    backend = FakeBackend(latency=latency, jitter=jitter, error_rate=error_rate, seed=seed)
+    end_date = end_date or datetime.now()
+    dates = [end_date - timedelta(days=d) for d in range(days - 1, -1, -1)]
+    projects = projects or [f"Project {chr(65 + i)}" for i in range(max(1, min(26, staff_count // 5 or 1)))]
+
+    staffs = [STAFFS_HEADER]
+    transaction = [TRANSACTION_HEADER]
+    monthly = [MONTHLY_HEADER]
+    project_tabs = {name: [PROJECT_HEADER] for name in projects}
+    config = [CONFIG_HEADER, ["Standard", "Work", "Pages", "1", "", "A", "Status", "Name", "Url", "B", "2", "IDLE"]]
+
+    for i in range(staff_count):
+        email = f"staff{i:04d}@example.com"
+        name = f"Staff {i:04d}"
+        project = projects[i % len(projects)]
+        personal_id = f"personal-{i:04d}"
+        personal_url = f"https://docs.google.com/spreadsheets/d/{personal_id}/edit"
+        staffs.append([
+            str(1000 + i), name, email, "Admin" if i == 0 else "User", project, "Active",
+            f"img/profile_pics/{i % 10}.png", "2", "1", str(i % 2), personal_url, "Standard",
+        ])
+
+        work = [["Date"] + [f"P{p}L{k}" for p in range(1, pages_per_staff + 1) for k in (1, 2)]]
+        # daily_sync อ่านเวลาส่งของเพจ p จากคอลัมน์ index p * 2 + 1 (เวลาส่งคลิปที่ 2)
+        stamps = [["Date", "Name"] + [f"P{p}T{k}" for p in range(1, pages_per_staff + 1) for k in (1, 2)]]
+        pages = [["No.", "Status", "Name", "Url"]] + [
+            [str(p), "Active", f"{name} Page {p}", f"https://facebook.com/{personal_id}-{p}"]
+            for p in range(1, pages_per_staff + 1)
+        ]
+        for d in dates:
+            date_str = f"{d.day}/{d.month}/{d.year}"
+            on_leave = rnd.random() < 0.05
+            row, stamp_row, sent_total = [date_str], [date_str, name], 0
+            for p in range(1, pages_per_staff + 1):
+                sent = 0 if on_leave else rnd.choice((0, 1, 2, 2, 2))
+                links = [f"https://facebook.com/reel/{i}-{p}-{d:%Y%m%d}-{k}" if k <= sent else "" for k in (1, 2)]
+                row += links
+                stamp_row += [f"{d:%d/%m/%Y} {9 + k}:00" if links[k - 1] else "" for k in (1, 2)]
+                sent_total += sent
+                page_url = pages[p][3]
+                transaction.append([
+                    f"{email}_{project}_{d:%d%m%Y}_Page{p}", f"{d:%d/%m/%Y}, 23:00:00", email,
+                    f"{project} - Page {p}", date_str, links[0], links[1], "Completed", personal_url,
+                    page_url, pages[p][2], stamp_row[-2], str(sent),
+                ])
+                project_tabs[project].append([
+                    date_str, str(p), pages[p][2], page_url, "1", str(i % 2), links[0], links[1],
+                    f"{rnd.randint(0, 50000):,}", f"{rnd.randint(0, 50000):,}",
+                    "ส่งแล้ว" if sent else "ยังไม่ส่ง", stamp_row[-2], stamp_row[-1], str(sent),
+                ])
+            work.append(row)
+            stamps.append(stamp_row)
+            status = "ลา" if on_leave else ("ส่งครบ" if sent_total >= pages_per_staff * 2 else "ขาดส่ง")
+            monthly.append([
+                date_str, name, project, project, str(sent_total), status,
+                "1" if status == "ขาดส่ง" else "0", "1" if on_leave else "0",
+            ])
+
+        backend.add_workbook(personal_id, {"Work": work, "Pages": pages, "Timestamps": stamps}, title=name)
+
+    backend.add_workbook(DEMO_MASTER_ID, {
+        "Staffs": staffs,
+        "Transaction": transaction,
+        "Monthly_Summary": monthly,
+        "Config": config,
+        **project_tabs,
+    }, title="RCP Master")
+    return backend
+
+
+def _bench(label, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    print(f"  {label:<40} {(time.perf_counter() - start) * 1000:9.1f} ms")
+    return result
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark Api / daily_sync against an in-memory Sheets backend")
+    parser.add_argument("--staff", type=int, default=50)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--pages", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="chance of a 429 per request")
+    parser.add_argument("--quota", type=int, default=0,
+                        help="read/write requests per minute for sheets_scheduler (0 = no throttling)")
+    parser.add_argument("--skip-sync", action="store_true")
+    args = parser.parse_args(argv)
+
+    import sheets_scheduler
+    quota = args.quota or 10 ** 9
+    sheets_scheduler.scheduler = sheets_scheduler.QuotaScheduler(quota, quota, base_delay=0.05)
+
+    import tempfile
+    import g_sheet_api
+    import rcp_center_main
+    # ไม่ให้ข้อมูลปลอมไปปนกับ cache / index ของชีตจริงบนเครื่อง
+    scratch = tempfile.mkdtemp(prefix="rcp_fake_")
+    rcp_center_main.CACHE_DIR = scratch
+    g_sheet_api.MONTH_INDEX_FILE = f"{scratch}/monthly_summary_index.json"
+
+    print(f"Building fake workbooks: {args.staff} staff x {args.days} days x {args.pages} pages")
+    backend = build_demo_backend(args.staff, args.days, args.pages, latency=args.latency,
+                                 error_rate=args.error_rate)
+    g_sheet_api.use_client(backend.client())
+
+    api = rcp_center_main.Api(DEMO_MASTER_URL)
+    today = datetime.now()
+    admin_email = "staff0000@example.com"
+    user_email = "staff0001@example.com"
+
+    print("Api:")
+    _bench("login (admin)", api.login, admin_email)
+    _bench("get_all_staff_for_dashboard", api.get_all_staff_for_dashboard)
+    _bench("get_employee_dashboard_data", api.get_employee_dashboard_data, user_email, f"{today:%Y-%m-%d}")
+    _bench("get_employee_page_details", api.get_employee_page_details, user_email, f"{today:%Y-%m-%d}")
+    _bench("fetch_leaves_list", api.fetch_leaves_list)
+    _bench("fetch_monthly_summary", api.fetch_monthly_summary, today.year, today.month)
+    project_id = next((pid for pid in api.current_user["ProjectMap"] if pid.startswith("project_")), None)
+    if project_id:
+        _bench(f"fetch_employee_data ({project_id})", api.fetch_employee_data, project_id)
+    print(f"  requests: {backend.stats()}")
+
+    if not args.skip_sync:
+        import daily_sync
+        backend.reset_counters()
+        print("daily_sync.run_auto_sync:")
+        _bench("run_auto_sync", daily_sync.run_auto_sync)
+        print(f"  requests: {backend.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,41 @@
 import gspread
+import logging
 import traceback
 import time
 import re
 import calendar
+import threading
+import os
+import json
+import hashlib
 from datetime import datetime
+from google.oauth2.service_account import Credentials
+from google.auth.transport.requests import Request as AuthRequest
+
+import sheets_scheduler
+import sheet_records
+import app_log
+import runtime_stats
+from app_log import span
+
+log = app_log.get_logger("sheets")
 
 
 CREDS_FILE = 'credentials.json'
+INDEX_DIR = os.path.join(os.path.dirname(__file__), 'cache')
+MONTH_INDEX_FILE = os.path.join(INDEX_DIR, 'monthly_summary_index.json')
 
 # Global cache
-_staffs_header_cache = {}
-_staffs_id_row_map_cache = {}
+_staffs_indexes = {}      # { (sheet_id, sheet_name): StaffsIndex }
+
+# ─── Connection Pool ───────────────────────────────────
+# client ตัวเดียวทั้ง process + cache ของ Spreadsheet / Worksheet ที่เปิดแล้ว
+# ทำให้การอ่าน tab ที่เคยเปิดแล้วเหลือแค่ values request เดียว (ไม่ต้องดึง metadata ซ้ำ)
+_client = None
+_client_creds = None
+_client_lock = threading.RLock()
+_spreadsheet_cache = {}   # { sheet_id: Spreadsheet }
+_worksheet_cache = {}     # { sheet_id: { title: Worksheet } }
 
 # ดึงข้อมูล staff จาก Google Sheet
 
@@ -26,7 +51,7 @@ def get_leaves_list_data(sheet_url, year, month, day, monthly_data_cache=None, s
 
         # ถ้าไม่มีข้อมูล cache ถูกส่งมา ให้ดึงใหม่ (เป็น fallback)
         if monthly_data_cache is None:
-            print("[WARN] No monthly cache provided to get_leaves_list_data. Fetching fresh data.")
+            log.warning("get_leaves_list_data: no monthly cache provided, fetching fresh data")
             monthly_data_cache = get_monthly_summary_data(sheet_url, year, month)
 
         summary_data_by_name = {record['name']: record for record in monthly_data_cache}
@@ -70,103 +95,321 @@ def get_leaves_list_data(sheet_url, year, month, day, monthly_data_cache=None, s
             
         return leaves_list
     except Exception as e:
-        print(f"[ERROR] get_leaves_list_data: {e}")
-        traceback.print_exc()
+        log.exception("get_leaves_list_data: %s", e)
         return []
 
 def get_monthly_summary_data(sheet_url, year, month):
-    print("[TRACE] Called from:", traceback.format_stack(limit=2)[0])
     """
     ดึงและประมวลผลข้อมูลจากชีต 'Monthly_Summary' สำหรับเดือนและปีที่ระบุ
+    อ่านเฉพาะช่วงแถวของเดือนนั้นผ่าน MonthlySummaryIndex ; ถ้า index ดูไม่น่าเชื่อถือค่อยอ่านทั้ง tab
     """
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("get_monthly_summary_data called from: %s", traceback.format_stack(limit=2)[0].strip())
     try:
-        gc = get_gspread_client()
-        sheet_id = _extract_sheet_id(sheet_url)
-        sh = gc.open_by_key(sheet_id)
-        ws = sh.worksheet("Monthly_Summary")
-
-        all_records = ws.get_all_records()
-
-        # --- ภารกิจที่ 2: แก้ไข Logic การกรองวันที่ ---
-        filtered_records = []
-        for r in all_records:
-            date_str = r.get('Date', '').strip()
-            if not date_str:
-                continue
+        index = get_monthly_summary_index(sheet_url)
+        with span(log, "fetch Monthly_Summary %d/%d", month, year):
+            records = index.fetch_month(year, month)
+            if records is None and index.rebuild_from_dates():
+                log.debug("get_monthly_summary_data: month index miss for %s/%s, rebuilt from Date column", month, year)
+                records = index.fetch_month(year, month)
+            if records is None:
+                log.debug("get_monthly_summary_data: month index miss for %s/%s, scanning full tab", month, year)
+                ws = get_worksheet(sheet_url, index.sheet_name)
+                all_values = sheets_scheduler.read(ws.get_all_values)
+                index.load_values(all_values)
+                records = _values_to_records(all_values)
+        with span(log, "summarize Monthly_Summary %d/%d (%d rows)", month, year, len(records)):
+            return summarize_monthly_records(records, year, month)
+
+    except Exception as e:
+        log.exception("get_monthly_summary_data: %s", e)
+        return []
+
+class MonthlySummaryIndex:
+    """
+    index เดือน → ช่วงแถว (first_row, last_row) ของชีต Monthly_Summary
+    สร้างจากแถว header + คอลัมน์ Date อย่างเดียว (rebuild_from_dates) หรือจาก grid ทั้ง tab ที่อ่านมาแล้ว (load_values)
+    และเก็บลงไฟล์ไว้ใช้ข้ามการเปิดโปรแกรม
+    ทุกครั้งที่อ่านเดือนหนึ่งจะตรวจว่าแถวที่ได้เป็นของเดือนนั้นจริง ถ้าไม่ตรง → ให้ผู้เรียก scan ทั้ง tab
+    """
+
+    def __init__(self, sheet_url, sheet_name="Monthly_Summary", path=None):
+        self.sheet_id = _sheet_key(sheet_url)
+        self.sheet_name = sheet_name
+        self.path = path or MONTH_INDEX_FILE
+        self.header = []
+        self.months = {}    # { "YYYY-MM": [first_row, last_row] }
+        self.last_row = 0   # แถวสุดท้ายที่มีข้อมูล ณ ตอนสร้าง index
+        self._lock = threading.RLock()
+        self._load()
+
+    @staticmethod
+    def _month_key(year, month):
+        return f"{year:04d}-{month:02d}"
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                saved = json.load(f).get(f"{self.sheet_id}/{self.sheet_name}")
+        except (OSError, ValueError):
+            return
+        if saved:
+            self.header = saved.get("header", [])
+            self.months = saved.get("months", {})
+            self.last_row = saved.get("last_row", 0)
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
             try:
-                # ลองแปลงวันที่ในรูปแบบ "dd/mm/yyyy" หรือ "d/m/yy"
-                dt_obj = datetime.strptime(date_str, '%d/%m/%Y')
-            except ValueError:
-                try:
-                    dt_obj = datetime.strptime(date_str, '%d/%m/%y')
-                except ValueError:
-                    # ถ้าแปลงไม่ได้ ให้ข้าม record นี้ไป
-                    print(f"[WARN] Could not parse date: {date_str}")
-                    continue
-            
-            # เปรียบเทียบเดือนและปี
-            if dt_obj.month == month and dt_obj.year == year:
-                filtered_records.append(r)
-        # --- สิ้นสุดการแก้ไข ---
-
-        # ประมวลผลข้อมูลเป็นโครงสร้างที่ JS ต้องการ
-        processed_data = {}
-        for row in filtered_records:
-            name = row.get('Name', '').strip()
-            if not name:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    saved = json.load(f)
+            except (OSError, ValueError):
+                saved = {}
+            saved[f"{self.sheet_id}/{self.sheet_name}"] = {
+                "header": self.header, "months": self.months, "last_row": self.last_row
+            }
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(saved, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.warning("MonthlySummaryIndex: could not save index: %s", e)
+
+    def _date_col(self):
+        header = [h.strip() for h in self.header]
+        return header.index('Date') if 'Date' in header else None
+
+    def _add_rows(self, rows, first_row_number):
+        date_col = self._date_col()
+        for offset, row in enumerate(rows):
+            row_number = first_row_number + offset
+            if any(cell != "" for cell in row):
+                self.last_row = max(self.last_row, row_number)
+            if date_col is None or date_col >= len(row):
+                continue
+            parsed = sheet_records.parse_dmy(row[date_col])
+            if not parsed:
                 continue
+            key = self._month_key(parsed[0], parsed[1])
+            span = self.months.get(key)
+            if span is None:
+                self.months[key] = [row_number, row_number]
+            else:
+                span[0] = min(span[0], row_number)
+                span[1] = max(span[1], row_number)
 
-            day = int(row.get('Date', '0/').split('/')[0])
-
-            if name not in processed_data:
-                processed_data[name] = {
-                    "projectName": row.get('Project', ''),
-                    "name": name,
-                    "dailyData": {},
-                    "totalClips": 0,
-                    "totalMissing": 0,
-                    "totalHolidays": 0,
-                    "totalViews": 0 # เตรียมไว้เผื่ออนาคต
-                }
-
-            # สร้างข้อมูลรายวัน
-            status_text = row.get('สถานะ', '')
-            
-            
-            # --- Helper to safely convert to int ---
-            def safe_int(value):
-                try:
-                    return int(value)
-                except (ValueError, TypeError):
-                    return 0
-            # --- End Helper ---
-
-            clips_sent = safe_int(row.get('TotalSent', 0))
-            
-            day_info = {"clips": clips_sent}
-            if 'ส่งครบ' in status_text:
-                day_info["status"] = "complete"
-                processed_data[name]["totalClips"] += clips_sent
-            
-            # เพิ่มเช็ก "ขาดส่ง" ด้วยเผื่อชีตใช้คำนี้
-            elif 'ขาดส่ง' in status_text or 'ไม่ได้ส่ง' in status_text:
-                day_info["status"] = "missing"
-                processed_data[name]["totalMissing"] += safe_int(row.get('MissingDays', 0))
-            elif 'ลา' in status_text:
-                day_info["status"] = "holiday"
-                day_info["text"] = "หยุด"
-                processed_data[name]["totalHolidays"] += safe_int(row.get('LeaveDays', 0))
+    def load_values(self, all_values):
+        """สร้าง index ใหม่ทั้งหมดจาก grid ทั้ง tab ที่อ่านมาแล้ว (ไม่เสีย request เพิ่ม)"""
+        with self._lock:
+            self.header = list(all_values[0]) if all_values else []
+            self.months = {}
+            self.last_row = 1 if all_values else 0
+            self._add_rows(all_values[1:], 2)
+            self._save()
+            self._record_fingerprints(all_values[1:], 2, list(self.months))
+
+    def rebuild_from_dates(self):
+        """
+        สร้าง index ใหม่จากแถว header + คอลัมน์ Date (batchGet เดียว ถ้าคอลัมน์ Date ไม่ย้ายไปจากที่เดาไว้)
+        คืน False ถ้าไม่พบคอลัมน์ Date
+        """
+        sh = open_spreadsheet(self.sheet_id)
+        with self._lock:
+            guessed = self._date_col() or 0
+            value_ranges = sheets_scheduler.read(
+                sh.values_batch_get, [f"{_a1_range(self.sheet_name)}!1:1", self._column_range(guessed, 2)]
+            ).get('valueRanges', [])
+            header_values = value_ranges[0].get('values', [[]]) if value_ranges else [[]]
+            self.header = header_values[0] if header_values else []
+            date_col = self._date_col()
+            if date_col is None:
+                self.header, self.months, self.last_row = [], {}, 0
+                return False
+            if date_col == guessed and len(value_ranges) > 1:
+                cells = value_ranges[1].get('values', [])
             else:
-                day_info["status"] = "nodata"
+                cells = sheets_scheduler.read(sh.values_get, self._column_range(date_col, 2)).get('values', [])
+            self.months = {}
+            self.last_row = 1
+            # _add_rows อ่าน Date จากตำแหน่ง date_col ของแถว
+            self._add_rows([[""] * date_col + cell[:1] for cell in cells], 2)
+            self._save()
+            return True
 
-            processed_data[name]["dailyData"][day] = day_info
+    def _record_fingerprints(self, rows, first_row, keys):
+        """จำ fingerprint ของแต่ละเดือนใน keys จากแถวที่อ่านมา (rows เริ่มที่แถว first_row)"""
+        for key in keys:
+            first, last = self.months.get(key, (0, 0))
+            if first >= first_row:
+                _record_fingerprint(self.sheet_id, self.sheet_name, self.header,
+                                    rows[first - first_row:last - first_row + 2], first, last, month_key=key)
 
-        return list(processed_data.values())
+    def _row_range(self, first_row, last_row=None):
+        last_col = re.sub(r'\d', '', gspread.utils.rowcol_to_a1(1, max(1, len(self.header))))
+        end = f"{last_col}{last_row}" if last_row else last_col
+        return f"{_a1_range(self.sheet_name)}!A{first_row}:{end}"
 
-    except Exception as e:
-        print(f"[ERROR] get_monthly_summary_data: {e}")
-        traceback.print_exc()
-        return []
+    def _column_range(self, col, first_row):
+        letter = re.sub(r'\d', '', gspread.utils.rowcol_to_a1(1, col + 1))
+        return f"{_a1_range(self.sheet_name)}!{letter}{first_row}:{letter}"
+
+    def _date_tail_range(self):
+        return self._column_range(self._date_col(), self.last_row + 1)
+
+    def fetch_month(self, year, month):
+        """
+        คืน list ของ record (dict) เฉพาะแถวในช่วงของเดือนที่ขอ (อาจมีแถวอื่นปนมา summarize จะกรองอีกชั้น)
+        คืน None ถ้า index ยังไม่มีหรือดูเก่า → ผู้เรียกควร scan ทั้ง tab
+        """
+        with self._lock:
+            if not self.header or not self.last_row or self._date_col() is None:
+                return None
+            key = self._month_key(year, month)
+            header_range = f"{_a1_range(self.sheet_name)}!1:1"
+            latest_key = max(self.months) if self.months else ""
+            sh = open_spreadsheet(self.sheet_id)
+
+            if key >= latest_key:
+                # เดือนล่าสุด (หรือใหม่กว่า) อาจมีแถวต่อท้ายเพิ่ม: อ่านตั้งแต่ต้นเดือนจนสุด tab
+                first_row = self.months.get(key, [self.last_row + 1])[0]
+                ranges = [header_range, self._row_range(first_row)]
+            else:
+                # เดือนเก่า: อ่านช่วงของเดือน (เกินไป 1 แถวเพื่อตรวจว่าไม่มีแถวถูกแทรกเพิ่ม)
+                # และคอลัมน์ Date ของแถวที่ต่อท้ายหลังสร้าง index เผื่อมีการลงข้อมูลย้อนหลัง
+                first_row, last_row = self.months.get(key, [self.last_row + 1, self.last_row])
+                ranges = [header_range, self._date_tail_range()]
+                if key in self.months:
+                    ranges.append(self._row_range(first_row, last_row + 1))
+
+            value_ranges = sheets_scheduler.read(sh.values_batch_get, ranges).get('valueRanges', [])
+            header_values = value_ranges[0].get('values', [[]]) if value_ranges else [[]]
+            sheet_header = header_values[0] if header_values else []
+            # values.batchGet ตัดเซลล์ว่างท้ายแถวออก ส่วน header ใน index มาจาก get_all_values ที่เติมให้ครบ
+            if sheet_header != self.header[:len(sheet_header)] or any(self.header[len(sheet_header):]):
+                return None
+            if key < latest_key:
+                tail = value_ranges[1].get('values', []) if len(value_ranges) > 1 else []
+                for cell in tail:
+                    parsed = sheet_records.parse_dmy(cell[0]) if cell else None
+                    if parsed and parsed[:2] == (year, month):
+                        return None
+                if key not in self.months:
+                    return []
+                rows = value_ranges[2].get('values', []) if len(value_ranges) > 2 else []
+            else:
+                rows = value_ranges[1].get('values', []) if len(value_ranges) > 1 else []
+
+            date_col = self._date_col()
+            in_month = []
+            for offset, row in enumerate(rows):
+                parsed = sheet_records.parse_dmy(row[date_col]) if date_col < len(row) else None
+                belongs = parsed is not None and (parsed[0], parsed[1]) == (year, month)
+                if key < latest_key:
+                    inside_span = first_row + offset <= self.months[key][1]
+                    if belongs != inside_span and (belongs or offset == 0):
+                        # แถวแรกไม่ใช่เดือนนี้ หรือมีแถวของเดือนนี้เกินช่วง → index เก่าแล้ว
+                        return None
+                if belongs:
+                    in_month.append(row)
+
+            if key >= latest_key:
+                if rows and key in self.months and not in_month:
+                    return None
+                # เก็บแถวใหม่ที่ต่อท้ายเข้า index ไปด้วย
+                if first_row + len(rows) - 1 > self.last_row:
+                    self._add_rows(rows, first_row)
+                    self._save()
+
+            self._record_fingerprints(rows, first_row, [key])
+            return _values_to_records([self.header] + in_month)
+
+_monthly_summary_indexes = {}
+
+def get_monthly_summary_index(sheet_url, sheet_name="Monthly_Summary"):
+    key = (_sheet_key(sheet_url), sheet_name)
+    index = _monthly_summary_indexes.get(key)
+    if index is None:
+        with _client_lock:
+            index = _monthly_summary_indexes.setdefault(key, MonthlySummaryIndex(sheet_url, sheet_name))
+    return index
+
+def summarize_monthly_records(all_records, year, month):
+    """
+    แปลง record ของชีต 'Monthly_Summary' (ทั้ง tab) ให้เป็นโครงสร้างรายคนที่ JS ต้องการ
+    เฉพาะเดือน/ปีที่ระบุ ใช้ร่วมกันทั้ง get_monthly_summary_data และ fetch_tabs
+    """
+    # --- ภารกิจที่ 2: แก้ไข Logic การกรองวันที่ ---
+    filtered_records = []
+    for r in all_records:
+        date_str = str(r.get('Date', '')).strip()
+        if not date_str:
+            continue
+        # รองรับ "dd/mm/yyyy" และ "d/m/yy"
+        parsed = sheet_records.parse_dmy(date_str)
+        if parsed is None:
+            # ถ้าแปลงไม่ได้ ให้ข้าม record นี้ไป
+            log.warning("Could not parse date: %s", date_str)
+            continue
+
+        # เปรียบเทียบเดือนและปี
+        if parsed[1] == month and parsed[0] == year:
+            filtered_records.append(r)
+    # --- สิ้นสุดการแก้ไข ---
+
+    # ประมวลผลข้อมูลเป็นโครงสร้างที่ JS ต้องการ
+    processed_data = {}
+    for row in filtered_records:
+        name = row.get('Name', '').strip()
+        if not name:
+            continue
+
+        day = int(row.get('Date', '0/').split('/')[0])
+
+        if name not in processed_data:
+            processed_data[name] = {
+                "projectName": row.get('Project', ''),
+                "name": name,
+                "dailyData": {},
+                "totalClips": 0,
+                "totalMissing": 0,
+                "totalHolidays": 0,
+                "totalViews": 0 # เตรียมไว้เผื่ออนาคต
+            }
+
+        # สร้างข้อมูลรายวัน
+        status_text = row.get('สถานะ', '')
+        
+        
+        # --- Helper to safely convert to int ---
+        def safe_int(value):
+            try:
+                return int(value)
+            except (ValueError, TypeError):
+                return 0
+        # --- End Helper ---
+
+        clips_sent = safe_int(row.get('TotalSent', 0))
+        
+        day_info = {"clips": clips_sent}
+        if 'ส่งครบ' in status_text:
+            day_info["status"] = "complete"
+            processed_data[name]["totalClips"] += clips_sent
+        
+        # เพิ่มเช็ก "ขาดส่ง" ด้วยเผื่อชีตใช้คำนี้
+        elif 'ขาดส่ง' in status_text or 'ไม่ได้ส่ง' in status_text:
+            day_info["status"] = "missing"
+            processed_data[name]["totalMissing"] += safe_int(row.get('MissingDays', 0))
+        elif 'ลา' in status_text:
+            day_info["status"] = "holiday"
+            day_info["text"] = "หยุด"
+            processed_data[name]["totalHolidays"] += safe_int(row.get('LeaveDays', 0))
+        else:
+            day_info["status"] = "nodata"
+
+        processed_data[name]["dailyData"][day] = day_info
+
+    return list(processed_data.values())
 
 
 def get_staff_sheet(sheet_url):
@@ -183,176 +426,560 @@ def _extract_sheet_id(url):
 
 def get_users_data(sheet_url, sheet_name="Users", header_row=1):
     try:
-        gc = get_gspread_client()
-        sheet_id = _extract_sheet_id(sheet_url)
-        sh = gc.open_by_key(sheet_id)
-        ws = sh.worksheet(sheet_name)
-        all_values = ws.get_all_values()
+        ws = get_worksheet(sheet_url, sheet_name)
+        all_values = sheets_scheduler.read(ws.get_all_values)
         if not all_values or len(all_values) < header_row:
             return []
         header = [h.strip() for h in all_values[header_row - 1]]
         if len(header) != len(set(header)):
-            print(f"[WARN][get_users_data] Duplicate headers found: {header}")
-        data_rows = all_values[header_row:]
-        records = []
-        for row in data_rows:
-            while len(row) < len(header):
-                row.append("")
-            record = dict(zip(header, row))
-            records.append(record)
-        print(f"[DEBUG][get_users_data] header={header} records={records}")
+            log.warning("get_users_data: duplicate headers found: %s", header)
+        records = sheet_records.decode_rows(all_values, header_row, unique=False)
+        log.debug("get_users_data: %d columns, %d records", len(header), len(records))
         return records
     except Exception as e:
-        print(f"[PYTHON ERROR] get_users_data: {e}")
-        traceback.print_exc()
+        log.exception("get_users_data: %s", e)
         return []
 
-def get_staffs_data(sheet_url, sheet_name="Staffs", header_row=1):
-    try:
-        gc = get_gspread_client()
-        sheet_id = _extract_sheet_id(sheet_url)
-        sh = gc.open_by_key(sheet_id)
-        ws = sh.worksheet(sheet_name)
-        all_values = ws.get_all_values()
-        if not all_values or len(all_values) < header_row:
-            return []
+def _unique_header(raw_header):
+    """ตัดช่องว่างหัวคอลัมน์ และเติม _2, _3 ... ให้หัวคอลัมน์ที่ซ้ำกัน"""
+    return list(sheet_records.RecordSchema(raw_header).names)
 
-        header = [h.strip() for h in all_values[header_row - 1]]
-        unique_header = []
-        counts = {}
-        for h in header:
-            if h in counts:
-                counts[h] += 1
-                unique_header.append(f"{h}_{counts[h]}")
-            else:
-                counts[h] = 1
-                unique_header.append(h)
-
-        data_rows = all_values[header_row:]
-        records = []
-        _staffs_id_row_map_cache.clear()
-        for i, row in enumerate(data_rows):
-            while len(row) < len(unique_header):
-                row.append("")
-            record = dict(zip(unique_header, row))
-            records.append(record)
-            staff_id = record.get('ID')
-            if staff_id:
-                _staffs_id_row_map_cache[str(staff_id)] = header_row + i + 1
+def _values_to_records(all_values, header_row=1):
+    """แปลง grid จาก get_all_values() ให้เป็น list ของ record (รูปแบบเดียวกับ get_staffs_data)"""
+    return sheet_records.decode_rows(all_values, header_row, numeric=sheet_records.NUMERIC_COLUMNS)
 
+def get_staffs_data(sheet_url, sheet_name="Staffs", header_row=1):
+    try:
+        ws = get_worksheet(sheet_url, sheet_name)
+        with span(log, "fetch tab '%s'", sheet_name):
+            all_values = sheets_scheduler.read(ws.get_all_values)
+        _record_tab_fingerprint(sheet_url, sheet_name, all_values, header_row)
+        with span(log, "parse tab '%s' (%d rows)", sheet_name, len(all_values)):
+            records = _values_to_records(all_values, header_row)
+        if sheet_name == "Staffs":
+            get_staffs_index(sheet_url, sheet_name, header_row).load_values(all_values)
         return records
     except gspread.exceptions.WorksheetNotFound:
-        print(f"[PYTHON ERROR] get_staffs_data: ไม่พบชีตชื่อ '{sheet_name}' ใน URL: {sheet_url}")
+        log.error("get_staffs_data: ไม่พบชีตชื่อ '%s' ใน URL: %s", sheet_name, sheet_url)
         return []
     except Exception as e:
-        print(f"[PYTHON ERROR] get_staffs_data: เกิดข้อผิดพลาดในการดึงข้อมูล Staffs: {e}")
-        traceback.print_exc()
+        log.exception("get_staffs_data: เกิดข้อผิดพลาดในการดึงข้อมูล Staffs: %s", e)
         return []
 
-def update_staff_data(sheet_url, staff_id, column_name, new_value, sheet_name="Staffs", header_row=1):
-    max_retries = 5
-    base_delay = 1
-    for attempt in range(max_retries):
-        try:
-            gc = get_gspread_client()
-            sheet_id = _extract_sheet_id(sheet_url)
-            sh = gc.open_by_key(sheet_id)
-            ws = sh.worksheet(sheet_name)
-            header = [h.strip() for h in ws.row_values(header_row)]
-            if column_name not in header:
-                return {"status": "error", "message": f"ไม่พบคอลัมน์ '{column_name}'"}
-            col_index = header.index(column_name) + 1
-
-            all_values = ws.get_all_values()
-            data_rows = all_values[header_row:]
-            row_index = None
-            for i, row in enumerate(data_rows):
-                if len(row) < len(header):
-                    row += [''] * (len(header) - len(row))
-                record = dict(zip(header, row))
-                if str(record.get('ID', '')).strip() == str(staff_id).strip():
-                    row_index = header_row + i + 1
-                    break
-            if row_index is None:
-                return {"status": "error", "message": f"ไม่พบ Staff ID: {staff_id} ในชีต"}
-
-            print(f"[DEBUG][update_staff_data] staff_id={staff_id}, row_index={row_index}, col={col_index}, col_name={column_name}, new_value={new_value}")
-            ws.update_cell(row_index, col_index, new_value)
-            return {"status": "ok", "message": f"อัปเดตข้อมูล Staff ID {staff_id} เรียบร้อย"}
-        except gspread.exceptions.APIError as e:
-            if e.response.status_code == 429 and attempt < max_retries - 1:
-                delay = base_delay * (2 ** attempt)
-                print(f"[WARNING] Quota exceeded. Retrying in {delay} seconds...")
-                time.sleep(delay)
+def _normalize_id(value):
+    return str(value).strip()
+
+def _normalize_email(value):
+    return str(value).strip().lower()
+
+class StaffsIndex:
+    """
+    index ของชีต Staffs สำหรับเขียนข้อมูลรายเซลล์โดยไม่ต้องโหลดทั้งชีต
+      - columns    : header → column (1-based)
+      - id_rows    : ID → row (1-based)
+      - email_rows : email (lower) → row
+    ก่อนเขียนจะอ่านแถว header + เซลล์ key ของแถวนั้นกลับมาเช็คใน request เดียว ถ้าไม่ตรง
+    (เช่นมีคนแทรกแถว / แทรกหรือย้ายคอลัมน์) จะ refresh เฉพาะ header + คอลัมน์ ID / E-Mail แล้วหาแถวใหม่
+    """
+
+    KEY_COLUMNS = {"id": ("ID", _normalize_id), "email": ("E-Mail", _normalize_email)}
+
+    def __init__(self, sheet_url, sheet_name="Staffs", header_row=1):
+        self.sheet_id = _sheet_key(sheet_url)
+        self.sheet_name = sheet_name
+        self.header_row = header_row
+        self.columns = {}
+        self.id_rows = {}
+        self.email_rows = {}
+        self._lock = threading.RLock()
+
+    def _rows_for(self, kind):
+        return self.id_rows if kind == "id" else self.email_rows
+
+    def load_values(self, all_values):
+        """สร้าง index จาก grid ทั้งชีตที่โหลดมาแล้ว (ไม่เสีย request เพิ่ม)"""
+        if not all_values or len(all_values) < self.header_row:
+            return
+        header = _unique_header(all_values[self.header_row - 1])
+        with self._lock:
+            self.columns = {h: i + 1 for i, h in enumerate(header) if h}
+            self.id_rows.clear()
+            self.email_rows.clear()
+            id_col = self.columns.get("ID")
+            email_col = self.columns.get("E-Mail")
+            for offset, row in enumerate(all_values[self.header_row:]):
+                row_number = self.header_row + offset + 1
+                if id_col and id_col <= len(row) and _normalize_id(row[id_col - 1]):
+                    self.id_rows[_normalize_id(row[id_col - 1])] = row_number
+                if email_col and email_col <= len(row) and _normalize_email(row[email_col - 1]):
+                    self.email_rows[_normalize_email(row[email_col - 1])] = row_number
+
+    def _column_range(self, col):
+        letter = re.sub(r'\d', '', gspread.utils.rowcol_to_a1(1, col))
+        return f"{_a1_range(self.sheet_name)}!{letter}{self.header_row + 1}:{letter}"
+
+    def _header_range(self):
+        return f"{_a1_range(self.sheet_name)}!{self.header_row}:{self.header_row}"
+
+    @staticmethod
+    def _columns_of(value_range):
+        """header → column จาก valueRange ของแถว header"""
+        values = (value_range or {}).get('values', [[]])
+        header = _unique_header(values[0] if values else [])
+        return {h: i + 1 for i, h in enumerate(header) if h}
+
+    def _key_columns(self):
+        return [self.columns.get(name) for name, _ in self.KEY_COLUMNS.values()]
+
+    def refresh(self):
+        """
+        โหลด index ใหม่แบบเบาๆ: อ่านแค่แถว header + คอลัมน์ ID + คอลัมน์ E-Mail
+        ตำแหน่งคอลัมน์ key ยึดจาก header ที่อ่านรอบนี้ ; ถ้าต่างจากที่เดาไว้ (ยังไม่รู้ / มีการแทรกหรือย้ายคอลัมน์)
+        จะอ่านคอลัมน์ key ใหม่อีก 1 request
+        """
+        sh = open_spreadsheet(self.sheet_id)
+        with self._lock:
+            guessed = self._key_columns()
+            ranges = [self._header_range()] + [self._column_range(col) for col in guessed if col]
+            value_ranges = sheets_scheduler.read(sh.values_batch_get, ranges).get('valueRanges', [])
+            self.columns = self._columns_of(value_ranges[0] if value_ranges else None)
+
+            key_cols = self._key_columns()
+            column_ranges = value_ranges[1:]
+            if key_cols != guessed:
+                log.debug("StaffsIndex: key columns moved %s → %s, re-reading key columns", guessed, key_cols)
+                ranges = [self._column_range(col) for col in key_cols if col]
+                column_ranges = sheets_scheduler.read(sh.values_batch_get, ranges).get('valueRanges', []) if ranges else []
+
+            column_values = iter(column_ranges)
+            for kind, (name, normalize) in self.KEY_COLUMNS.items():
+                rows = self._rows_for(kind)
+                rows.clear()
+                if not self.columns.get(name):
+                    continue
+                cells = next(column_values, {}).get('values', [])
+                for offset, cell in enumerate(cells):
+                    if cell and normalize(cell[0]):
+                        rows[normalize(cell[0])] = self.header_row + offset + 1
+
+    def _verify(self, sh, kind, key, row):
+        """อ่าน header + เซลล์ key ของแถวด้วย batchGet เดียว ; header เปลี่ยน หรือ key ไม่ตรง คืน False"""
+        name, normalize = self.KEY_COLUMNS[kind]
+        col = self.columns.get(name)
+        if not col:
+            return False
+        value_ranges = sheets_scheduler.read(
+            sh.values_batch_get, [self._header_range(), self._cell_range(row, col)]
+        ).get('valueRanges', [])
+        if len(value_ranges) < 2 or self._columns_of(value_ranges[0]) != self.columns:
+            return False
+        cell = value_ranges[1].get('values', [[""]])
+        return normalize(cell[0][0] if cell and cell[0] else "") == key
+
+    def locate(self, sh, kind, key):
+        """หาแถวของ key (ID หรือ email) พร้อมตรวจว่า header และแถวใน index ยังถูกต้อง ; ไม่เจอคืน None"""
+        _, normalize = self.KEY_COLUMNS[kind]
+        key = normalize(key)
+        with self._lock:
+            row = self._rows_for(kind).get(key)
+            if row is not None and self._verify(sh, kind, key, row):
+                return row
+            log.debug("StaffsIndex: index miss/stale for %s=%s, refreshing key columns", kind, key)
+            self.refresh()
+            row = self._rows_for(kind).get(key)
+            return row
+
+    def update(self, kind, key, column_name, new_value):
+        """เขียนค่าเซลล์เดียวของ staff ที่ระบุด้วย ID หรือ email"""
+        sh = open_spreadsheet(self.sheet_id)
+        ws = get_worksheet(self.sheet_id, self.sheet_name)
+        with self._lock:
+            if not self.columns:
+                self.refresh()
+            # locate ตรวจ header ไปพร้อมกัน → ตำแหน่งคอลัมน์ต้องดูหลัง locate เท่านั้น
+            row = self.locate(sh, kind, key)
+            col = self.columns.get(column_name)
+            if not col:
+                return None, None
+            if row is None:
+                return col, None
+            sheets_scheduler.write(ws.update_cell, row, col, new_value)
+
+            # ถ้าแก้คอลัมน์ key เอง ให้ index ตามไปด้วย
+            for index_kind, (name, normalize) in self.KEY_COLUMNS.items():
+                if name == column_name:
+                    rows = self._rows_for(index_kind)
+                    for old_key in [k for k, r in rows.items() if r == row]:
+                        del rows[old_key]
+                    if normalize(new_value):
+                        rows[normalize(new_value)] = row
+            return col, row
+
+    def read_row(self, kind, key):
+        """
+        อ่านแถวของ staff ที่ระบุด้วย ID หรือ email กลับมาทั้งแถวพร้อมแถว header ด้วย request เดียว (ใช้ยืนยันค่าหลังเขียน)
+        คืน dict ชื่อคอลัมน์ตาม header ที่อ่านมา (แบบเดียวกับ get_staffs_data) → ค่า ; ไม่เจอคืน None
+        """
+        name, normalize = self.KEY_COLUMNS[kind]
+        key = normalize(key)
+        sh = open_spreadsheet(self.sheet_id)
+        with self._lock:
+            if not self.columns:
+                self.refresh()
+            for attempt in range(2):
+                row = self._rows_for(kind).get(key)
+                if row is not None and self.columns.get(name):
+                    value_ranges = sheets_scheduler.read(
+                        sh.values_batch_get, [self._header_range(), f"{_a1_range(self.sheet_name)}!{row}:{row}"]
+                    ).get('valueRanges', [])
+                    header_range, row_range = (value_ranges + [{}, {}])[:2]
+                    columns = self._columns_of(header_range)
+                    values = row_range.get('values', [])
+                    cells = values[0] if values else []
+                    # header ไม่เปลี่ยนและแถวใน index ยังถูกต้อง (เช็คจากเซลล์ key ในแถวที่อ่านมาเลย ไม่ต้องยิงแยก)
+                    key_col = columns.get(name)
+                    if columns == self.columns and key_col <= len(cells) and normalize(cells[key_col - 1]) == key:
+                        break
+                if attempt == 0:
+                    log.debug("StaffsIndex: index miss/stale for %s=%s, refreshing header and key columns", kind, key)
+                    self.refresh()
             else:
-                print(f"[ERROR] เกิดข้อผิดพลาดในการอัปเดตข้อมูล Staffs: {e}")
-                traceback.print_exc()
-                return {"status": "error", "message": str(e)}
-        except Exception as e:
-            print(f"[ERROR] เกิดข้อผิดพลาดในการอัปเดตข้อมูล Staffs: {e}")
-            traceback.print_exc()
-            return {"status": "error", "message": str(e)}
-    return {"status": "error", "message": "Failed after multiple retries due to quota issues."}
+                return None
+        record = {}
+        for column, col in columns.items():
+            value = cells[col - 1] if col <= len(cells) else ""
+            record[column] = sheet_records.parse_number(value) if column in sheet_records.NUMERIC_COLUMNS else value
+        return record
+
+    def _cell_range(self, row, col):
+        return f"{_a1_range(self.sheet_name)}!{gspread.utils.rowcol_to_a1(row, col)}"
+
+    def batch_update(self, kind, edits):
+        """
+        เขียนหลายเซลล์ด้วย values.batchUpdate ครั้งเดียว ; edits = [(key, column_name, new_value), ...]
+        ตรวจ header + แถวใน index ทั้งหมดด้วย batchGet ของแถว header และเซลล์ key ครั้งเดียวก่อนเขียน
+        คืน list ของผลลัพธ์ตามลำดับ edits
+        """
+        name, normalize = self.KEY_COLUMNS[kind]
+        sh = open_spreadsheet(self.sheet_id)
+        with self._lock:
+            refreshed = False
+            if not self.columns:
+                self.refresh()
+                refreshed = True
+            key_col = self.columns.get(name)
+            rows = self._rows_for(kind)
+            keys = [normalize(key) for key, _, _ in edits]
+
+            known = sorted({rows[k] for k in keys if k in rows})
+            stale = not refreshed and (len(known) < len(set(keys)) or not key_col)
+            if not refreshed and not stale and known:
+                ranges = [self._header_range()] + [self._cell_range(r, key_col) for r in known]
+                value_ranges = sheets_scheduler.read(sh.values_batch_get, ranges).get('valueRanges', [])
+                if len(value_ranges) < len(ranges) or self._columns_of(value_ranges[0]) != self.columns:
+                    stale = True
+                for row, value_range in zip(known, [] if stale else value_ranges[1:]):
+                    cell = value_range.get('values', [[""]])
+                    if normalize(cell[0][0] if cell and cell[0] else "") not in keys:
+                        stale = True
+                        break
+                    if rows.get(normalize(cell[0][0])) != row:
+                        stale = True
+                        break
+            if stale:
+                log.debug("StaffsIndex: index stale for batch of %d edits, refreshing key columns", len(edits))
+                self.refresh()
+
+            results = []
+            data = []
+            for key, (_, column_name, new_value) in zip(keys, edits):
+                col = self.columns.get(column_name)
+                row = rows.get(key)
+                if not col:
+                    results.append({"status": "error", "message": f"ไม่พบคอลัมน์ '{column_name}'"})
+                elif row is None:
+                    results.append({"status": "error", "message": f"ไม่พบ {name}: {key} ในชีต"})
+                else:
+                    results.append({"status": "ok", "row": row, "col": col})
+                    data.append({"range": self._cell_range(row, col), "values": [[new_value]]})
+
+            if data:
+                sheets_scheduler.write(sh.values_batch_update, {"valueInputOption": "USER_ENTERED", "data": data})
+
+            for key, (_, column_name, new_value), result in zip(keys, edits, results):
+                if result["status"] == "ok" and column_name == name and normalize(new_value) != key:
+                    rows.pop(key, None)
+                    rows[normalize(new_value)] = result["row"]
+            return results
+
+def get_staffs_index(sheet_url, sheet_name="Staffs", header_row=1):
+    key = (_sheet_key(sheet_url), sheet_name)
+    index = _staffs_indexes.get(key)
+    if index is None:
+        with _client_lock:
+            index = _staffs_indexes.setdefault(key, StaffsIndex(sheet_url, sheet_name, header_row))
+    return index
+
+def update_staff_data(sheet_url, staff_id, column_name, new_value, sheet_name="Staffs", header_row=1):
+    # 429 / 5xx ถูก retry ใน sheets_scheduler แล้ว ที่นี่จัดการเฉพาะผลลัพธ์
+    try:
+        index = get_staffs_index(sheet_url, sheet_name, header_row)
+        col_index, row_index = index.update("id", staff_id, column_name, new_value)
+        if col_index is None:
+            return {"status": "error", "message": f"ไม่พบคอลัมน์ '{column_name}'"}
+        if row_index is None:
+            return {"status": "error", "message": f"ไม่พบ Staff ID: {staff_id} ในชีต"}
+
+        log.debug("update_staff_data: staff_id=%s row=%s col=%s col_name=%s new_value=%s",
+                  staff_id, row_index, col_index, column_name, new_value)
+        return {"status": "ok", "message": f"อัปเดตข้อมูล Staff ID {staff_id} เรียบร้อย"}
+    except Exception as e:
+        log.exception("เกิดข้อผิดพลาดในการอัปเดตข้อมูล Staffs: %s", e)
+        return {"status": "error", "message": str(e)}
+
+def batch_update_staff_cells(sheet_url, edits, sheet_name="Staffs", header_row=1):
+    """
+    เขียนหลายเซลล์ของชีต Staffs (ระบุแถวด้วย Staff ID) ใน request เดียว
+    edits = [(staff_id, column_name, new_value), ...] ; คืนผลลัพธ์ต่อ edit ตามลำดับ
+    error ของ API ที่ยังเหลือหลัง sheets_scheduler retry แล้ว (เช่น 429 ต่อเนื่อง) จะโยนออกไปให้ผู้เรียก
+    """
+    index = get_staffs_index(sheet_url, sheet_name, header_row)
+    return index.batch_update("id", edits)
+
+def read_staff_row(sheet_url, staff_id=None, user_email=None, sheet_name="Staffs", header_row=1):
+    """อ่านแถวเดียวของ Staffs ตาม Staff ID หรือ email (1 request) ; ไม่เจอคืน None"""
+    index = get_staffs_index(sheet_url, sheet_name, header_row)
+    if staff_id is not None:
+        return index.read_row("id", staff_id)
+    return index.read_row("email", user_email)
 
 def update_staff_by_email(sheet_url, user_email, column_name, new_value, sheet_name="Staffs", header_row=1):
-    max_retries = 5
-    base_delay = 1
-    for attempt in range(max_retries):
-        try:
-            gc = get_gspread_client()
-            sheet_id = _extract_sheet_id(sheet_url)
-            sh = gc.open_by_key(sheet_id)
-            ws = sh.worksheet(sheet_name)
-            header = [h.strip() for h in ws.row_values(header_row)]
-            
-            if column_name not in header:
-                return {"status": "error", "message": f"Column '{column_name}' not found in sheet."}
-            col_index = header.index(column_name) + 1
-
-            # Find the row index by matching the email
-            email_col_index = header.index('E-Mail') + 1
-            all_values = ws.get_all_values()
-            data_rows = all_values[header_row:]
-            row_index_to_update = -1
-            for i, row in enumerate(data_rows):
-                if len(row) > email_col_index -1 and row[email_col_index - 1].strip().lower() == user_email.strip().lower():
-                    row_index_to_update = header_row + i + 1
-                    break
-
-            if row_index_to_update == -1:
-                return {"status": "error", "message": f"User with email '{user_email}' not found."}
-
-            # Update the specific cell
-            ws.update_cell(row_index_to_update, col_index, new_value)
-            return {"status": "ok", "message": f"Successfully updated {column_name} for {user_email}."}
-
-        except gspread.exceptions.APIError as e:
-            if e.response.status_code == 429 and attempt < max_retries - 1:
-                delay = base_delay * (2 ** attempt)
-                print(f"[WARNING] Quota exceeded. Retrying in {delay} seconds...")
-                time.sleep(delay)
-            else:
-                print(f"[ERROR] API error during staff update by email: {e}")
-                return {"status": "error", "message": str(e)}
-        except Exception as e:
-            print(f"[ERROR] General error during staff update by email: {e}")
-            return {"status": "error", "message": str(e)}
-    return {"status": "error", "message": "Update failed after multiple retries due to API quota issues."}
+    # 429 / 5xx ถูก retry ใน sheets_scheduler แล้ว ที่นี่จัดการเฉพาะผลลัพธ์
+    try:
+        index = get_staffs_index(sheet_url, sheet_name, header_row)
+        col_index, row_index = index.update("email", user_email, column_name, new_value)
+        if col_index is None:
+            return {"status": "error", "message": f"Column '{column_name}' not found in sheet."}
+        if row_index is None:
+            return {"status": "error", "message": f"User with email '{user_email}' not found."}
+
+        return {"status": "ok", "message": f"Successfully updated {column_name} for {user_email}."}
+    except gspread.exceptions.APIError as e:
+        log.error("API error during staff update by email: %s", e)
+        return {"status": "error", "message": str(e)}
+    except Exception as e:
+        log.error("General error during staff update by email: %s", e)
+        return {"status": "error", "message": str(e)}
 
 def get_gspread_client():
-    return gspread.service_account(filename=CREDS_FILE)
+    """
+    คืน gspread client ตัวเดียวของทั้ง process
+    สร้าง credentials ครั้งแรกครั้งเดียว และ refresh token เองเมื่อหมดอายุ
+    """
+    global _client, _client_creds
+    with _client_lock:
+        if _client is None:
+            _client_creds = Credentials.from_service_account_file(CREDS_FILE, scopes=gspread.auth.DEFAULT_SCOPES)
+            _client = gspread.authorize(_client_creds)
+        if _client_creds is not None and not _client_creds.valid:
+            _client_creds.refresh(AuthRequest())
+        return _client
+
+def use_client(client):
+    """
+    ใช้ client ที่ส่งมาแทนการ login ด้วย credentials.json (เช่น fake_sheets.FakeClient สำหรับทดสอบ offline)
+    ล้าง handle และ index ที่ cache ไว้ของ client เดิมทั้งหมด ; ส่ง None เพื่อกลับไปใช้ client จริง
+    """
+    global _client, _client_creds
+    with _client_lock:
+        _client = client
+        _client_creds = None
+        _spreadsheet_cache.clear()
+        _worksheet_cache.clear()
+        _staffs_indexes.clear()
+        _monthly_summary_indexes.clear()
+
+def _sheet_key(sheet_url):
+    """รับได้ทั้ง URL เต็มหรือ sheet id เปล่าๆ"""
+    if '/' in sheet_url:
+        return _extract_sheet_id(sheet_url)
+    return sheet_url
+
+def open_spreadsheet(sheet_url):
+    """เปิด Spreadsheet ผ่าน cache (เสีย metadata request เฉพาะครั้งแรกของแต่ละ sheet id)"""
+    sheet_id = _sheet_key(sheet_url)
+    sh = _spreadsheet_cache.get(sheet_id)
+    if sh is None:
+        sh = sheets_scheduler.read(get_gspread_client().open_by_key, sheet_id)
+        with _client_lock:
+            sh = _spreadsheet_cache.setdefault(sheet_id, sh)
+    return sh
+
+def _refresh_worksheet_map(sheet_url):
+    sheet_id = _sheet_key(sheet_url)
+    sh = open_spreadsheet(sheet_id)
+    titles = {ws.title: ws for ws in sheets_scheduler.read(sh.worksheets)}
+    with _client_lock:
+        _worksheet_cache[sheet_id] = titles
+    return titles
+
+def get_worksheet(sheet_url, sheet_name):
+    """
+    คืน Worksheet จาก map title→worksheet ที่ cache ไว้
+    ถ้าไม่เจอ title ใน map จะดึง metadata ใหม่หนึ่งครั้งก่อนยอมแพ้ (เผื่อมีการเพิ่ม/เปลี่ยนชื่อ tab)
+    """
+    sheet_id = _sheet_key(sheet_url)
+    titles = _worksheet_cache.get(sheet_id)
+    if titles is None or sheet_name not in titles:
+        titles = _refresh_worksheet_map(sheet_id)
+    ws = titles.get(sheet_name)
+    if ws is None:
+        raise gspread.exceptions.WorksheetNotFound(sheet_name)
+    return ws
+
+def invalidate_sheet_cache(sheet_url=None):
+    """ล้าง handle ที่ cache ไว้ของ sheet ที่ระบุ (หรือทั้งหมดถ้าไม่ระบุ)"""
+    with _client_lock:
+        if sheet_url is None:
+            _spreadsheet_cache.clear()
+            _worksheet_cache.clear()
+        else:
+            sheet_id = _sheet_key(sheet_url)
+            _spreadsheet_cache.pop(sheet_id, None)
+            _worksheet_cache.pop(sheet_id, None)
 
 def get_all_tab_names(sheet_url):
     try:
-        gc = get_gspread_client()
-        sheet_id = _extract_sheet_id(sheet_url)
-        sh = gc.open_by_key(sheet_id)
-        return [ws.title for ws in sh.worksheets()]
+        return list(_refresh_worksheet_map(sheet_url).keys())
     except Exception as e:
-        print("Error in get_all_tab_names:", e)
-        traceback.print_exc()
+        log.exception("get_all_tab_names: %s", e)
         return []
 
+# ─── Tab Fingerprint ───────────────────────────────────
+# ก่อนโหลด tab ใหม่ทั้ง tab ให้ตรวจ "ลายนิ้วมือ" ของ tab ก่อน: header + N แถวท้ายของข้อมูล + แถวถัดไปอีก 1 แถว
+# อ่านด้วย batchGet เล็กๆ ครั้งเดียว ถ้าเหมือนตอนที่โหลดมา ข้อมูลใน cache ยังใช้ได้ (ต่ออายุได้เลย)
+# fingerprint มองไม่เห็นการแก้แถวกลาง tab จึงใช้ได้ไม่เกิน FINGERPRINT_MAX_AGE แล้วต้องโหลดเต็มใหม่
+FINGERPRINT_TAIL_ROWS = 20
+FINGERPRINT_MAX_AGE = 6 * 60 * 60
+_fingerprints = {}   # { (sheet_id, tab, "YYYY-MM" หรือ None): fingerprint }
+
+def _fingerprint_digest(rows):
+    """hash ของแถวทั้งหมด ; ตัดเซลล์ว่างท้ายแถวก่อน เพราะ get_all_values เติมให้ครบแต่ batchGet ตัดออก"""
+    h = hashlib.blake2b(digest_size=16)
+    for row in rows:
+        cells = [str(cell) for cell in row]
+        while cells and cells[-1] == "":
+            cells.pop()
+        h.update(json.dumps(cells, ensure_ascii=False).encode('utf-8'))
+        h.update(b"\n")
+    return h.hexdigest()
+
+def _record_fingerprint(sheet_url, tab, header, rows, first_row, last_row, header_row=1, month_key=None):
+    """
+    จำ fingerprint ของช่วงแถว first_row..last_row ที่เพิ่งอ่านมาทั้งช่วง
+    rows เริ่มที่แถว first_row และอาจมีแถว last_row + 1 ต่อท้ายมาด้วย (ถ้าไม่มีถือว่าเป็นแถวว่าง)
+    ต้องเรียกก่อน decode เพราะ decode แปลงคอลัมน์ตัวเลขในที่
+    """
+    start = max(first_row, last_row - FINGERPRINT_TAIL_ROWS + 1)
+    end = max(last_row + 1, start)
+    window = rows[start - first_row:end - first_row + 1]
+    window = window + [[]] * (end - start + 1 - len(window))
+    sheet_id = _sheet_key(sheet_url)
+    _fingerprints[(sheet_id, tab, month_key)] = {
+        "sheet_id": sheet_id, "tab": tab, "header_row": header_row,
+        "start": start, "end": end,
+        "digest": _fingerprint_digest([header] + window),
+        "taken_at": time.time(),
+    }
+
+def _record_tab_fingerprint(sheet_url, tab, all_values, header_row=1):
+    """fingerprint ของทั้ง tab จาก grid ของ get_all_values / batchGet"""
+    header = all_values[header_row - 1] if len(all_values) >= header_row else []
+    _record_fingerprint(sheet_url, tab, header, all_values[header_row:], header_row + 1,
+                        max(len(all_values), header_row), header_row)
+
+def get_fingerprint(sheet_url, tab, year=None, month=None):
+    """fingerprint ล่าสุดของ tab (หรือของเดือนใน Monthly_Summary) ; ยังไม่เคยโหลดคืน None"""
+    month_key = MonthlySummaryIndex._month_key(year, month) if year and month else None
+    return _fingerprints.get((_sheet_key(sheet_url), tab, month_key))
+
+def fingerprint_unchanged(fingerprint):
+    """
+    อ่านแค่ header + หน้าต่างแถวท้ายของ fingerprint (1 request) แล้วเทียบ hash
+    True = ช่วงแถวนั้นยังเหมือนตอนที่โหลดมา
+    """
+    sh = open_spreadsheet(fingerprint["sheet_id"])
+    tab = _a1_range(fingerprint["tab"])
+    header_row = fingerprint["header_row"]
+    start, end = fingerprint["start"], fingerprint["end"]
+    ranges = [f"{tab}!{header_row}:{header_row}", f"{tab}!{start}:{end}"]
+    with span(log, "fingerprint check '%s' rows %d-%d", fingerprint["tab"], start, end):
+        value_ranges = sheets_scheduler.read(sh.values_batch_get, ranges).get('valueRanges', [])
+    header_values = value_ranges[0].get('values', []) if value_ranges else []
+    rows = value_ranges[1].get('values', []) if len(value_ranges) > 1 else []
+    rows = rows + [[]] * (end - start + 1 - len(rows))
+    header = header_values[0] if header_values else []
+    return _fingerprint_digest([header] + rows) == fingerprint["digest"]
+
+# values.batchGet รับได้หลาย range ต่อ request แต่ URL ยาวเกินไปจะโดนปฏิเสธ จึงแบ่งเป็นก้อน
+FETCH_TABS_CHUNK = 40
+
+def _a1_range(tab_or_range):
+    """ชื่อ tab เปล่าๆ → 'ชื่อ tab' (อ่านทั้ง tab) ; ถ้าเป็น A1 range อยู่แล้ว (มี '!') ส่งต่อไปตรงๆ"""
+    if '!' in tab_or_range:
+        return tab_or_range
+    return "'" + tab_or_range.replace("'", "''") + "'"
+
+def _range_tab_title(tab_or_range):
+    if '!' not in tab_or_range:
+        return tab_or_range
+    title = tab_or_range.rsplit('!', 1)[0]
+    if title.startswith("'") and title.endswith("'"):
+        title = title[1:-1].replace("''", "'")
+    return title
+
+def fetch_tabs(sheet_url, tabs, project_tabs=(), header_row=1):
+    """
+    อ่านหลาย tab (หรือ A1 range) ของ spreadsheet เดียวกันด้วย values.batchGet ครั้งเดียว
+      - tabs         → decode แบบเดียวกับ get_staffs_data (list ของ dict)
+      - project_tabs → decode แบบเดียวกับ get_employee_sheet ({"reels": [...], "sheet_name": ...})
+    คืนค่า dict { ชื่อ/range ที่ขอ: ข้อมูล } ; tab ที่ไม่มีอยู่ในชีตจะถูกข้าม (ไม่มี key ในผลลัพธ์)
+    """
+    # ผลลัพธ์ใช้ชื่อ tab เป็น key: tab ที่ขอทั้งสองแบบจะ decode แบบ tabs อย่างเดียว
+    requested = [(name, False) for name in tabs] + [(name, True) for name in project_tabs if name not in tabs]
+    if not requested:
+        return {}
+
+    # กรอง tab ที่ไม่มีอยู่จริงออกก่อน เพราะ range ที่ผิดแค่อันเดียวจะทำให้ทั้ง batch ล้ม
+    sheet_id = _sheet_key(sheet_url)
+    titles = _worksheet_cache.get(sheet_id)
+    if titles is None or any(_range_tab_title(name) not in titles for name, _ in requested):
+        titles = _refresh_worksheet_map(sheet_id)
+    missing = [name for name, _ in requested if _range_tab_title(name) not in titles]
+    if missing:
+        log.warning("fetch_tabs: skipping unknown tabs: %s", missing)
+    requested = [(name, is_project) for name, is_project in requested if _range_tab_title(name) in titles]
+
+    sh = open_spreadsheet(sheet_id)
+    results = {}
+    for start in range(0, len(requested), FETCH_TABS_CHUNK):
+        chunk = requested[start:start + FETCH_TABS_CHUNK]
+        with span(log, "fetch_tabs batchGet of %d ranges", len(chunk)), runtime_stats.timed("batchGet"):
+            response = sheets_scheduler.read(sh.values_batch_get, [_a1_range(name) for name, _ in chunk])
+        for (name, is_project), value_range in zip(chunk, response.get('valueRanges', [])):
+            values = value_range.get('values', [])
+            if '!' not in name:
+                _record_tab_fingerprint(sheet_id, name, values, 1 if is_project else header_row)
+            if name == "Monthly_Summary":
+                get_monthly_summary_index(sheet_id, name).load_values(values)
+            if is_project:
+                results[name] = {"reels": _values_to_reels(values), "sheet_name": _range_tab_title(name)}
+            else:
+                results[name] = _values_to_records(values, header_row)
+                if name == "Staffs":
+                    get_staffs_index(sheet_id, name, header_row).load_values(values)
+    return results
+
 # ==== ใส่ mapping key ====
 COL_RENAME = {
     'วันที่': 'Date',
@@ -373,59 +1000,41 @@ COL_RENAME = {
 def rename_keys(row):
     return {COL_RENAME.get(k, k): v for k, v in row.items()}
 
+def _values_to_reels(all_values, date=None):
+    """แปลง grid ของ tab โปรเจกต์ให้เป็น list ของ reel (รูปแบบเดียวกับ get_employee_sheet)"""
+    if not all_values or len(all_values) < 2:
+        return []
+
+    log.debug("get_employee_sheet: header=%s first rows=%s", all_values[0], all_values[1:4])
+
+    with span(log, "parse project tab (%d rows)", len(all_values) - 1):
+        reels = sheet_records.decode_rows(
+            all_values, rename=COL_RENAME, numeric=sheet_records.NUMERIC_COLUMNS, strip=True
+        )
+    if date:
+        return [item for item in reels if item.get("Date", "") == date]
+    return reels
+
 def get_employee_sheet(sheet_url, sheet_name=None, date=None):
     try:
-        gc = get_gspread_client()
-        sheet_id = _extract_sheet_id(sheet_url)
-        sh = gc.open_by_key(sheet_id)
-        
-        # --- DEBUG: Log the sheet name being opened ---
-        print(f"[DEBUG][get_employee_sheet] Attempting to open worksheet: '{sheet_name or 'Project Q'}'")
-        
-        ws = sh.worksheet(sheet_name or "Project Q")
-        
-        # --- DEBUG: Confirm worksheet opened successfully ---
-        print(f"[DEBUG][get_employee_sheet] Successfully opened worksheet: '{ws.title}'")
-
-        all_values = ws.get_all_values()
+        ws = get_worksheet(sheet_url, sheet_name or "Project Q")
+        with span(log, "fetch tab '%s'", ws.title):
+            all_values = sheets_scheduler.read(ws.get_all_values)
         if not all_values or len(all_values) < 2:
-            print("[DEBUG][get_employee_sheet] No data rows found in tab")
+            log.debug("get_employee_sheet: no data rows found in tab '%s'", ws.title)
             # ✅ Return with empty reels list but indicate success for empty data
             return {"reels": [], "sheet_name": ws.title}
-        
-        header = [h.strip() for h in all_values[0]]
-        data_rows = all_values[1:]
-        
-        # --- DEBUG: Log header and first few data rows ---
-        print(f"[DEBUG][get_employee_sheet] Header: {header}")
-        print(f"[DEBUG][get_employee_sheet] First 3 data rows: {data_rows[:3]}")
-
-        result = []
-        for row in data_rows:
-            while len(row) < len(header):
-                row.append("")
-            row = [cell.strip() for cell in row]
-            item_th = dict(zip(header, row))
-            item = rename_keys(item_th)
-            
-            # --- DEBUG: Log each item after renaming keys, especially the 'Date' ---
-            print(f"[DEBUG][get_employee_sheet] ITEM (ENG): Date='{item.get('Date', 'N/A Date')}' | Full Item: {item}")
-            
-            if date:
-                if item.get("Date", "") == date:
-                    result.append(item)
-            else:
-                result.append(item)
-        print(f"[DEBUG][get_employee_sheet] loaded {len(result)} rows from tab '{ws.title}'")
+
+        _record_tab_fingerprint(sheet_url, ws.title, all_values)
+        result = _values_to_reels(all_values, date)
+        log.debug("get_employee_sheet: loaded %d rows from tab '%s'", len(result), ws.title)
         return {"reels": result, "sheet_name": ws.title}
     except gspread.exceptions.WorksheetNotFound:
-        print(f"[PYTHON ERROR] get_employee_sheet: ไม่พบชีตชื่อ '{sheet_name or 'Project Q'}'")
-        traceback.print_exc()
+        log.error("get_employee_sheet: ไม่พบชีตชื่อ '%s'", sheet_name or 'Project Q')
         # ✅ Return error_message for specific WorksheetNotFound
         return {"reels": [], "sheet_name": sheet_name or "Project Q", "error_message": f"ไม่พบชีตชื่อ '{sheet_name or 'Project Q'}'"}
     except Exception as e:
-        print("[ERROR] get_employee_sheet:", e)
-        traceback.print_exc()
+        log.exception("get_employee_sheet: %s", e)
         # ✅ Return error_message for general exceptions
         return {"reels": [], "sheet_name": sheet_name or "Project Q", "error_message": str(e)}
 
@@ -433,5 +1042,8 @@ def get_employee_sheet(sheet_url, sheet_name=None, date=None):
 __all__ = [
     'get_staff_sheet', 'get_users_data', 'fetch_google_sheet_data',
     'get_employee_sheet', 'update_staff_data', 'get_all_tab_names',
-    'get_staffs_data', 'update_staff_by_email', 'get_monthly_summary_data', 'get_leaves_list_data'
+    'get_staffs_data', 'update_staff_by_email', 'get_monthly_summary_data', 'get_leaves_list_data',
+    'get_gspread_client', 'use_client', 'open_spreadsheet', 'get_worksheet', 'invalidate_sheet_cache',
+    'fetch_tabs', 'summarize_monthly_records', 'get_staffs_index', 'batch_update_staff_cells',
+    'get_monthly_summary_index', 'get_fingerprint', 'fingerprint_unchanged', 'read_staff_row'
 ]
@@ -0,0 +1,155 @@
+import threading
+import heapq
+import itertools
+
+import sheets_scheduler
+import runtime_stats
+import app_log
+
+log = app_log.get_logger("prewarm")
+
+
+# ลำดับของงาน prewarm (เลขน้อยได้ก่อน)
+PREWARM_FIRST = 0   # ข้อมูลที่หน้าแรกของผู้ใช้ต้องใช้: โปรเจกต์ของตัวเอง + เดือนปัจจุบัน
+PREWARM_NEXT = 1    # ข้อมูลที่คำนวณต่อจากชุดแรก (เช่น Leaves ของเดือนนี้)
+PREWARM_LATER = 2   # โปรเจกต์อื่นๆ ของ admin
+
+MAX_WORKERS = 2
+
+
+class PrewarmTask:
+    __slots__ = ("order", "seq", "name", "func")
+
+    def __init__(self, order, seq, name, func):
+        self.order = order
+        self.seq = seq
+        self.name = name
+        self.func = func
+
+    def __lt__(self, other):
+        return (self.order, self.seq) < (other.order, other.seq)
+
+
+class PrewarmScheduler:
+    """
+    คิว prewarm เดียวของทั้งแอป
+    - งานเรียงตาม order ก่อน แล้วตามลำดับที่ใส่ (heap)
+    - รันพร้อมกันไม่เกิน max_workers งาน ทุก Sheets call ในงานใช้ PRIORITY_BACKGROUND
+      จึงได้โควต้าเฉพาะส่วนที่เหลือจากงานหน้าจอ (sheets_scheduler.BACKGROUND_RESERVE)
+    - start() / cancel() เปลี่ยนรุ่น (generation) ของคิว: งานที่ยังไม่เริ่มของรุ่นเก่าถูกทิ้ง
+      งานที่กำลังรันอยู่ทำต่อจนจบ (ผลเข้า cache ตามปกติ) แต่ไม่แจ้งความคืบหน้าแล้ว
+    - ความคืบหน้าแจ้งผ่าน on_progress(dict) หลังจบแต่ละงาน
+    """
+
+    def __init__(self, on_progress=None, max_workers=MAX_WORKERS):
+        self.on_progress = on_progress
+        self.max_workers = max_workers
+        self._queue = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._generation = 0
+        self._workers = 0
+        self._running = 0
+        self._total = 0
+        self._done = 0
+        self._failed = 0
+
+    def start(self, tasks=()):
+        """เริ่มคิวรอบใหม่ (ยกเลิกรอบเดิม) ; tasks เป็น (order, name, func) ; คืน generation ของรอบนี้"""
+        with self._cond:
+            self._reset()
+            generation = self._generation
+        self.submit(tasks, generation)
+        return generation
+
+    def submit(self, tasks, generation=None):
+        """
+        เพิ่มงานเข้ารอบปัจจุบัน ; ถ้าระบุ generation แล้วไม่ใช่รอบปัจจุบัน (ถูกยกเลิกไปแล้ว) จะไม่ใส่
+        คืน True ถ้าใส่งานได้
+        """
+        with self._cond:
+            if generation is not None and generation != self._generation:
+                return False
+            for order, name, func in tasks:
+                heapq.heappush(self._queue, PrewarmTask(order, next(self._seq), name, func))
+                self._total += 1
+            self._spawn()
+        return True
+
+    def cancel(self):
+        """ทิ้งงานที่ยังไม่เริ่มทั้งหมด (logout / เปลี่ยนผู้ใช้)"""
+        with self._cond:
+            if self._queue:
+                log.debug("Prewarm: cancelled %s pending task(s)", len(self._queue))
+            self._reset()
+
+    def wait(self, timeout=None):
+        """รอจนคิวว่างและไม่มีงานค้าง ; คืน False ถ้าหมดเวลาก่อน"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._queue and not self._running, timeout)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "generation": self._generation,
+                "queued": len(self._queue),
+                "running": self._running,
+                "done": self._done,
+                "failed": self._failed,
+                "total": self._total,
+            }
+
+    def _reset(self):
+        # เรียกภายใต้ self._cond
+        self._generation += 1
+        self._queue.clear()
+        self._total = self._done = self._failed = 0
+        self._cond.notify_all()
+
+    def _spawn(self):
+        # เรียกภายใต้ self._cond ; เปิด worker เพิ่มเท่าที่มีงานรอและยังไม่เต็ม max_workers
+        while self._workers < self.max_workers and self._workers - self._running < len(self._queue):
+            self._workers += 1
+            threading.Thread(target=self._work, name=f"prewarm-{self._workers}", daemon=True).start()
+
+    def _work(self):
+        with sheets_scheduler.priority(sheets_scheduler.PRIORITY_BACKGROUND), runtime_stats.origin("prewarm"):
+            while True:
+                with self._cond:
+                    if not self._queue:
+                        self._workers -= 1
+                        self._cond.notify_all()
+                        return
+                    task = heapq.heappop(self._queue)
+                    generation = self._generation
+                    self._running += 1
+                ok = True
+                try:
+                    log.debug("Prewarm: %s", task.name)
+                    task.func()
+                except Exception as e:
+                    ok = False
+                    log.warning("Prewarm: %s failed: %s", task.name, e)
+                with self._cond:
+                    self._running -= 1
+                    current = generation == self._generation
+                    if current:
+                        self._done += 1
+                        self._failed += not ok
+                        progress = {
+                            "task": task.name, "ok": ok, "done": self._done, "failed": self._failed,
+                            "total": self._total, "finished": self._done == self._total,
+                        }
+                    self._cond.notify_all()
+                if current:
+                    if progress["finished"]:
+                        log.debug("Prewarm complete: %s task(s), %s failed", progress["total"], progress["failed"])
+                    self._notify(progress)
+
+    def _notify(self, progress):
+        if self.on_progress is None:
+            return
+        try:
+            self.on_progress(progress)
+        except Exception as e:
+            log.warning("Prewarm: progress callback failed: %s", e)
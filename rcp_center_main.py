@@ -3,17 +3,21 @@ import webview
 from pathlib import Path
 
 import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 import json
 import os
 import calendar
 import sys
 import time
-import traceback  # ✅✅✅ เพิ่มบรรทัดนี้เข้าไปครับ ✅✅✅
 from datetime import datetime # Added this line
 import keyring
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import g_sheet_api
+import sheets_scheduler
+import sheet_records
+import app_log
+import runtime_stats
+from app_log import span
 from g_sheet_api import (
     get_employee_sheet,
     get_staffs_data,
@@ -25,34 +29,75 @@ from g_sheet_api import (
     get_all_tab_names,
     get_leaves_list_data
 )
+from write_queue import StaffWriteQueue
+from cache_manager import CacheManager, SqliteStore
+from sheet_mirror import SheetMirror
+from prewarm import PrewarmScheduler, PREWARM_FIRST, PREWARM_NEXT, PREWARM_LATER
+from wire_format import WireStreams
 
+log = app_log.get_logger("api")
 
-# ─── File-based Cache Helpers ───────────────────────────
+
+# ─── Cache ──────────────────────────────────────────────
+# RAM + disk cache ของ Api อยู่ใน cache_manager.CacheManager ; ที่นี่กำหนดแค่ค่าตั้งต้น
 CACHE_TTL = 60 * 60
 CACHE_DIR = os.path.join(os.path.dirname(__file__), 'cache')
-os.makedirs(CACHE_DIR, exist_ok=True)
-
-
-def _cache_file(name: str) -> str:
-    return os.path.join(CACHE_DIR, f"{name}.json")
-
-def _load_cache(name: str):
-    path = _cache_file(name)
-    if os.path.exists(path) and time.time() - os.path.getmtime(path) < CACHE_TTL:
-        print(f"[DEBUG][Cache] Loaded disk cache for '{name}'")
-        with open(path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return None
-
-def _save_cache(name: str, data):
-    path = _cache_file(name)
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False)
-    print(f"[DEBUG][Cache] Saved disk cache for '{name}' with data: {data}") # ✅เพิ่ม Debug
-
-    # ▶ เพิ่มสองบรรทัดนี้ ต่อท้าย helper block เลย
-_load_file_cache = _load_cache
-_save_file_cache = _save_cache
+CACHE_DB = 'cache.db'
+# สำเนาข้อมูลจากชีตพร้อม index สำหรับค้นตาม email / วันที่ / โปรเจกต์ / เพจ (sheet_mirror.SheetMirror)
+MIRROR_DB = 'mirror.db'
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+# งบ RAM ของ cache ที่เพิ่มขึ้นตามจำนวนเดือน / โปรเจกต์ที่เปิดดู (เกินแล้วไล่อันที่ไม่ได้ใช้นานสุดไปอยู่บน disk อย่างเดียว)
+# เดือนปัจจุบันและโปรเจกต์ของผู้ใช้ที่ login อยู่ถูก pin ไว้ไม่ถูกไล่
+CACHE_BUDGETS = {
+    'summary_': 32 * 1024 * 1024,
+    'sheet_': 96 * 1024 * 1024,
+}
+# stale-while-revalidate: cache ที่หมดอายุแล้วแต่อายุไม่เกินค่านี้ตอบทันทีแล้วรีเฟรชเบื้องหลัง
+# เก่ากว่านี้ต้องรอโหลดใหม่ ; ตั้งเป็น 0 เพื่อปิด (รอโหลดใหม่ทุกครั้งที่หมดอายุแบบเดิม)
+CACHE_MAX_STALE = 12 * 60 * 60
+# จำนวน tab โปรเจกต์ต่อ batchGet ของงาน prewarm หนึ่งงาน
+PREWARM_BATCH_TABS = 5
+# tab พื้นฐาน (ไม่ใช่ tab โปรเจกต์) ; Monthly_Summary ไม่อยู่ใน batchGet ของ prewarm เพราะทั้ง tab คือประวัติทุกเดือน
+PREWARM_BASE_TABS = ("Staffs", "Transaction", "Monthly_Summary")
+PREWARM_BATCH_BASE_TABS = ("Staffs", "Transaction")
+# session ที่ login ล่าสุดของแต่ละ email (เก็บใน cache.db) ใช้ login ได้ทันทีโดยไม่ต้องรอชีต
+SESSION_CACHE_PREFIX = 'session_'
+SESSION_MAX_AGE = 30 * 24 * 60 * 60
+# Api.batch: จำนวน call ที่รันพร้อมกัน (ทุกชุดใช้ pool เดียวกัน)
+BATCH_WORKERS = 4
+# Api.batch: method ที่เรียกผ่าน batch ได้ (API อ่านข้อมูลของหน้าจอ) ; method อื่นเรียกจาก JS ตรงๆ เท่านั้น
+BATCH_METHODS = frozenset({
+    "auto_login", "fetch_all_tab_names", "fetch_employee_data", "fetch_leaves_list", "fetch_monthly_summary",
+    "fetch_staffs_data", "get_all_staff_for_dashboard", "get_employee_dashboard_data",
+    "get_employee_page_details", "get_profile_data", "get_runtime_stats", "list_profile_pics",
+})
+# fetch_employee_data แบบมี query: จำนวนแถวต่อหน้าเมื่อ JS ไม่ระบุ limit และเพดานของ limit
+REELS_PAGE_SIZE = 50
+REELS_MAX_LIMIT = 500
+
+
+def _reel_number(row):
+    number = str(row.get("No", "")).strip()
+    return int(number) if number.isdigit() else float("inf")
+
+
+# คอลัมน์ที่ fetch_employee_data เรียงให้ได้ → key ของ sorted
+REEL_SORT_KEYS = {
+    "date": lambda row: sheet_records.parse_dmy(row.get("Date", "")) or (0, 0, 0),
+    "page": lambda row: str(row.get("PageName", "")).strip().lower(),
+    "no": _reel_number,
+    "status": lambda row: str(row.get("Status", "")).strip(),
+}
+
+
+def _is_batch_ref(arg):
+    """arg ของ Api.batch ที่อ้างผลของ call ก่อนหน้า: {"ref": i, "path": [...]}"""
+    return isinstance(arg, dict) and "ref" in arg and set(arg) <= {"ref", "path"}
+
+
+def _sheet_cache_name(sheet_name):
+    """ชื่อ cache ของ tab โปรเจกต์ เช่น 'Project Q' → 'sheet_project_q'"""
+    return f"sheet_{sheet_name.lower().replace(' ', '_')}"
 
 # ──────────────────────────────────────────────────────
 
@@ -72,245 +117,333 @@ def get_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
+@runtime_stats.track_api
 class Api:
 
     def __init__(self, sheet_url):
         self.sheet_url = sheet_url
         self.current_user = None
         self.window = None
-        self._staffs_cache = None
-        self._staffs_cache_time = 0
-        self._monthly_summary_cache = {} # Cache for monthly data { (year, month): data }
-        self._monthly_summary_cache_time = {} # Timestamp for each cache entry
-        self._transaction_cache = None
-        self._transaction_cache_time = 0
-        self._employee_sheet_cache      = {}
-        self._employee_sheet_cache_time = {}
+        # cache ของทุก tab: 'staffs', 'transaction', 'sheet_<tab>', 'summary_<year>_<month>'
+        self._cache = CacheManager(
+            SqliteStore(os.path.join(CACHE_DIR, CACHE_DB)), max_bytes=CACHE_MAX_BYTES, default_ttl=CACHE_TTL,
+            max_stale=CACHE_MAX_STALE, on_update=self._on_cache_updated,
+            background=lambda: sheets_scheduler.priority(sheets_scheduler.PRIORITY_BACKGROUND),
+            budgets=CACHE_BUDGETS
+        )
+        self._fingerprints = {}  # { ชื่อ cache: fingerprint ของ tab ตอนที่โหลดข้อมูลชุดนั้น }
+        self._mirror = SheetMirror(os.path.join(CACHE_DIR, MIRROR_DB))
         self.allowed_projects = []  # เก็บข้อมูลโปรเจกต์จากสิทธิ์ของผู้ใช้
+        # การแก้ไข Staffs จากหน้า admin จะถูกรวบเขียนเป็น batch ใน background
+        self._staff_write_queue = StaffWriteQueue(on_result=self._on_staff_write_result)
+        self._confirm_edit_ids = set()  # edit_id ที่ขอให้อ่านแถวกลับมายืนยันหลังเขียนสำเร็จ
+        # prewarm หลัง login: คิวเดียว เรียงตามความสำคัญ ยกเลิกได้ตอน logout / เปลี่ยนผู้ใช้
+        self._prewarm = PrewarmScheduler(on_progress=self._on_prewarm_progress)
+        # ข้อมูลแบบย่อ (header + แถวเป็น array) และ delta ต่อ stream สำหรับ JS ที่ขอด้วย parameter wire
+        self._wire = WireStreams()
+        self._batch_pool = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="api-batch")
         
         
 
-    def preload_all_projects(self, user_email: str):
-        try:
-            # ดึงพนักงานทั้งหมดจาก Project Admin
-            staffs = get_employee_sheet("Project Admin")
-
-            # หา record ของคน login
-            current_user = next(
-                (s for s in staffs if s.get("E-Mail", "").strip().lower() == user_email.strip().lower()),
-                None
+    def _start_prewarm(self, own_tab, project_tabs):
+        """
+        เริ่ม prewarm รอบใหม่ของผู้ใช้ที่เพิ่ง login (ยกเลิกรอบของผู้ใช้ก่อนหน้า)
+        ก่อน: Staffs / Transaction / สรุปเดือนนี้ + tab โปรเจกต์ของตัวเอง → Leaves เดือนนี้ → โปรเจกต์อื่นๆ (admin)
+        """
+        now = datetime.now()
+        year, month = now.year, now.month
+        own = [own_tab] if own_tab and own_tab not in PREWARM_BASE_TABS else []
+        tasks = [
+            (PREWARM_FIRST, f"{own_tab or 'base'} {year}-{month:02d}",
+             lambda: self._prewarm_base(own, year, month)),
+            (PREWARM_NEXT, f"leaves {year}-{month:02d}", self._prewarm_leaves),
+        ]
+        tasks += self._project_prewarm_tasks([tab for tab in project_tabs if tab != own_tab])
+        log.debug("Prewarm: queued %s task(s) for %s project sheet(s)", len(tasks), len(own) + len(project_tabs))
+        self._prewarm.start(tasks)
+
+    def _prewarm_base(self, own, year, month):
+        """Staffs / Transaction / tab โปรเจกต์ของตัวเองด้วย batchGet เดียว แล้วสรุปเดือนนี้ผ่าน month index (อ่านเฉพาะแถวของเดือน)"""
+        self._prewarm_tabs(PREWARM_BATCH_BASE_TABS, own)
+        self.get_monthly_summary_cached(year, month)
+
+    def _project_prewarm_tasks(self, project_tabs):
+        """งาน prewarm ของ tab โปรเจกต์ทีละ PREWARM_BATCH_TABS tab (ยกเลิกได้ระหว่างชุด)"""
+        # tab พื้นฐานอาจหลุดมาในรายชื่อโปรเจกต์ของ admin ; ห้าม decode เป็น tab โปรเจกต์เพราะจะทับ cache ของมัน
+        project_tabs = [tab for tab in project_tabs if tab not in PREWARM_BASE_TABS]
+        tasks = []
+        for start in range(0, len(project_tabs), PREWARM_BATCH_TABS):
+            batch = project_tabs[start:start + PREWARM_BATCH_TABS]
+            tasks.append((PREWARM_LATER, f"projects {', '.join(batch)}", lambda batch=batch: self._prewarm_tabs((), batch)))
+        return tasks
+
+    def _prewarm_tabs(self, tabs=(), project_tabs=()):
+        """
+        โหลด tab ที่ยังไม่มี cache สดด้วย batchGet เดียว
+        จอง cache ไว้ก่อน: หน้าจอที่ขอ tab เดียวกันระหว่างนี้จะรอผลจาก batchGet นี้
+        ส่วน tab ที่หน้าจอกำลังโหลดอยู่แล้วก็ไม่ต้องโหลดซ้ำ
+        """
+        base_names = {"Staffs": 'staffs', "Transaction": 'transaction'}
+        cache_names = {tab: base_names[tab] for tab in tabs}
+        cache_names.update((tab, _sheet_cache_name(tab)) for tab in project_tabs)
+        cache_names = {tab: name for tab, name in cache_names.items() if not self._cache.is_fresh(name)}
+        if not cache_names:
+            return
+        with self._cache.claim(cache_names.values()) as claimed:
+            fetched = g_sheet_api.fetch_tabs(
+                self.sheet_url,
+                [tab for tab in tabs if cache_names.get(tab) in claimed],
+                project_tabs=[tab for tab in project_tabs if cache_names.get(tab) in claimed]
             )
+            self._store_fetched_tabs(fetched)
 
-            if not current_user:
-                print(f"[Preload] ไม่พบข้อมูลผู้ใช้ {user_email}")
-                return
+    def _prewarm_leaves(self):
+        result = self.fetch_leaves_list()
+        if result["status"] != "ok":
+            raise RuntimeError(result["message"])
 
-            user_role = current_user.get("Role", "user").lower()
-            year = datetime.now().year
-            month = datetime.now().month
+    def _on_prewarm_progress(self, progress):
+        self.python_callback_to_js({"type": "prewarm_progress", "payload": progress})
 
-            if user_role == "admin":
-                # preload ทุกโปรเจกต์ (admin)
-                project_names = sorted(set(
-                    s.get("Project Name", "").strip()
-                    for s in staffs if s.get("Project Name", "").strip()
-                ))
-            else:
-                # preload เฉพาะโปรเจกต์ของตัวเอง
-                project_name = current_user.get("Project Name", "").strip()
-                if not project_name:
-                    print(f"[Preload] ผู้ใช้ไม่มีชื่อโปรเจกต์")
-                    return
-                project_names = [project_name]
-
-            for project in project_names:
-                try:
-                    print(f"[Preload] Loading data for {project}")
-                    get_employee_sheet(project)
-                    get_project_transactions(project)
-                    get_monthly_summary_cached(project, year, month)
-                    print(f"[Preload] {project} loaded.")
-                except Exception as e:
-                    print(f"[Preload] Failed to load {project}: {e}")
+    def _preload_projects_sheets(self):
+        """ใส่ tab ของ allowed_projects ที่ยังไม่มี cache เข้าคิว prewarm (ต่อท้ายงานที่สำคัญกว่า)"""
+        self._prewarm.submit(self._project_prewarm_tasks(self.allowed_projects))
 
+    def _store_fetched_tabs(self, fetched):
+        """
+        เก็บผลลัพธ์จาก g_sheet_api.fetch_tabs ลง RAM & disk cache
+        - Staffs / Transaction → cache ของ tab นั้นๆ
+        - tab โปรเจกต์        → cache sheet_{key}
+        """
+        if "Staffs" in fetched:
+            self._overlay_pending_staff_edits(fetched["Staffs"])
+            self._cache.put('staffs', fetched["Staffs"])
+            self._remember_fingerprint('staffs', "Staffs")
+            self._mirror_sync('staffs', fetched["Staffs"])
+        if "Transaction" in fetched:
+            self._cache.put('transaction', fetched["Transaction"])
+            self._remember_fingerprint('transaction', "Transaction")
+            self._mirror_sync('transaction', fetched["Transaction"])
+        for payload in fetched.values():
+            if isinstance(payload, dict) and "reels" in payload:
+                name = _sheet_cache_name(payload["sheet_name"])
+                self._cache.put(name, payload["reels"])
+                self._remember_fingerprint(name, payload["sheet_name"])
+                self._mirror_sync(name, payload["reels"])
+
+    def _remember_fingerprint(self, cache_name, tab, since=0, year=None, month=None):
+        """
+        เก็บ fingerprint ของ tab คู่กับ cache ที่เพิ่งบันทึก (RAM + disk)
+        ถ้า fingerprint เก่ากว่า since แปลว่าการโหลดรอบนี้ล้มเหลว (ได้ค่าว่างกลับมา) → ลืม fingerprint เดิมทิ้ง
+        คืน True ถ้าได้ fingerprint ของการโหลดรอบนี้
+        """
+        fingerprint = g_sheet_api.get_fingerprint(self.sheet_url, tab, year, month)
+        if fingerprint and fingerprint["taken_at"] >= since:
+            self._fingerprints[cache_name] = fingerprint
+            self._cache.store.set_fingerprint(cache_name, fingerprint)
+            return True
+        self._fingerprints.pop(cache_name, None)
+        self._cache.store.set_fingerprint(cache_name, None)
+        return False
+
+    def _revalidate(self, cache_name):
+        """
+        cache หมดอายุแล้ว: ตรวจ fingerprint ของ tab กับชีต (1 request เล็กๆ)
+        คืน True ถ้ายังเหมือนตอนที่โหลดมา → CacheManager ต่ออายุข้อมูลเดิมแทนการโหลดใหม่
+        """
+        fingerprint = self._fingerprints.get(cache_name) or self._cache.store.fingerprint(cache_name)
+        if not fingerprint or time.time() - fingerprint.get("taken_at", 0) > g_sheet_api.FINGERPRINT_MAX_AGE:
+            return False
+        try:
+            unchanged = g_sheet_api.fingerprint_unchanged(fingerprint)
         except Exception as e:
-            print(f"[Preload] Cannot fetch Project Admin sheet: {e}")   
-        
+            log.warning("Cache: fingerprint check for '%s' failed: %s", cache_name, e)
+            return False
+        if not unchanged:
+            log.debug("Cache: '%s' changed on sheet, refetching", cache_name)
+            return False
+        log.debug("Cache: '%s' unchanged on sheet, extending cache", cache_name)
+        self._fingerprints[cache_name] = fingerprint
+        return True
+
+    def _cached(self, cache_name, tab, fetch, max_age_sec, year=None, month=None):
+        """
+        อ่านผ่าน cache กลาง: RAM → disk → (หมดอายุ) ตรวจ fingerprint → fetch ใหม่
+        หลาย thread ที่ขอ cache_name เดียวกันพร้อมกันจะรอผลจากการ fetch ครั้งเดียว
+        """
+        return self._cache.get(cache_name, lambda: self._fetch_tab(cache_name, tab, fetch, year, month),
+                               ttl=max_age_sec, revalidate=self._revalidate)
 
+    def _fetch_tab(self, cache_name, tab, fetch, year=None, month=None, required=False):
+        """
+        โหลด tab จากชีต + จำ fingerprint + sync mirror (ผู้เรียกเป็นคนเก็บลง cache)
+        ได้ค่าว่างและไม่ได้ fingerprint ถือว่าโหลดไม่สำเร็จ: โยน RuntimeError ถ้ามีข้อมูลเดิมอยู่หรือ required
+        """
+        log.debug("Cache: fetching '%s' from API", cache_name)
+        started = time.time()
+        with runtime_stats.timed(f"fetch {tab}"):
+            data = fetch()
+        loaded = self._remember_fingerprint(cache_name, tab, since=started, year=year, month=month)
+        if not data and not loaded and (required or self._last_known(cache_name)):
+            # เช่นออฟไลน์ ฟังก์ชันอ่านชีตคืนค่าว่าง → อย่าทับของเดิม (RAM หรือ disk) ด้วยค่าว่าง
+            raise RuntimeError(f"loading '{cache_name}' returned no data")
+        self._mirror_sync(cache_name, data)
+        return data
 
+    def _refetch(self, cache_name, tab, fetch):
+        """
+        อ่าน tab ใหม่จากชีตทันทีโดยไม่ผ่าน TTL / stale-while-revalidate แล้วเก็บกลับลง cache
+        ใช้กับงานที่ใช้ข้อมูลเก่าไม่ได้ (เช่นตรวจสิทธิ์ของ session) ; ข้อมูลเปลี่ยนจะแจ้ง JS เหมือนรีเฟรชเบื้องหลัง
+        """
+        old = self._cache.peek(cache_name)
+        data = self._fetch_tab(cache_name, tab, fetch, required=True)
+        self._cache.put(cache_name, data)
+        if old is not None and data != old:
+            self._on_cache_updated(cache_name, data)
+        return data
 
-    def preload_projects_sheets(self):
-        no_cache_count = 0  # นับว่ามีกี่อันที่ไม่มีแคชเลย
+    def _mirror_stamp(self, cache_name):
+        """
+        เวอร์ชันของข้อมูล cache_name ที่ใช้เทียบกับ mirror: taken_at ของ fingerprint (ต่ออายุด้วย fingerprint แล้วไม่เปลี่ยน)
+        ไม่มี fingerprint ใช้ fetched_at ของ cache บน disk
+        """
+        fingerprint = self._fingerprints.get(cache_name) or self._cache.store.fingerprint(cache_name)
+        if fingerprint:
+            return fingerprint.get("taken_at")
+        info = self._cache.store.info(cache_name)
+        return info["fetched_at"] if info else None
 
-        def load_sheet(sheet_name):
-            nonlocal no_cache_count
-            cache_key = f"sheet_{sheet_name.lower().replace(' ', '_')}"
-            if not self._is_cache_valid(cache_key):
-                no_cache_count += 1
-                try:
-                    print(f"[DEBUG] Fetching data for {sheet_name}")
-                    data = get_employee_sheet(self.sheet_url, sheet_name).get('reels', [])
-                    self._save_file_cache(cache_key, data)
-                    print(f"[DEBUG] Cached data for {sheet_name}")
-                except Exception as e:
-                    print(f"[ERROR] Failed fetching {sheet_name}: {e}")
-                time.sleep(1)  # ป้องกันยิง API รัวเกินถ้าไม่มีแคช
-            else:
-                print(f"[Cache] Loaded RAM or disk cache for '{cache_key}'")
+    def _mirror_sync(self, cache_name, data):
+        """อัปเดต mirror ให้ตรงกับข้อมูลชุดใหม่ของ cache_name ใน background (เขียนเฉพาะแถวที่เปลี่ยน)"""
+        self._mirror.sync_later(cache_name, data, self._mirror_stamp(cache_name))
 
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            futures = [executor.submit(load_sheet, sheet) for sheet in self.allowed_projects]
-            for _ in as_completed(futures):
-                pass  # ให้รอให้ทุก sheet ทำเสร็จ
+    def _mirrored(self, cache_name, data):
+        """
+        mirror ที่มีข้อมูลของ cache_name ชุดล่าสุดแน่นอน ; ปกติ sync ไว้แล้วตอนโหลดจากชีต
+        ถ้ายังไม่มี (เช่นเพิ่งลบ mirror.db) หรือ stamp ไม่ตรงกับ cache (เช่นปิดแอประหว่าง sync_later) sync จาก data ก่อน
+        """
+        self._mirror.wait(cache_name)
+        stamp = self._mirror_stamp(cache_name)
+        if not self._mirror.has(cache_name) or self._mirror.stamp(cache_name) != stamp:
+            self._mirror.sync(cache_name, data, stamp)
+        return self._mirror
 
-        print(f"[DEBUG] Preload complete. No-cache count: {no_cache_count}")
+    def _on_cache_updated(self, cache_name, data):
+        """
+        การรีเฟรชเบื้องหลังได้ข้อมูลใหม่ที่ต่างจากที่หน้าจอแสดงอยู่
+        แจ้ง JS ด้วยชื่อ cache ; view ที่ใช้ cache นั้นจะเรียก API ซ้ำ (ได้จาก RAM ทันที) แล้ววาดใหม่
+        """
+        log.debug("Cache: '%s' refreshed in background, notifying UI", cache_name)
+        self.python_callback_to_js({"type": "cache_updated", "key": cache_name})
 
     def _is_cache_valid(self, key, max_age_sec=3600):
-        cache_time = getattr(self, '_cache_time', {}).get(key, 0)
-        return (time.time() - cache_time) < max_age_sec
+        return self._cache.is_fresh(key, max_age_sec)
+
+    def _last_known(self, cache_name):
+        """ข้อมูลล่าสุดที่มีของ cache_name (RAM แล้วค่อย disk แม้หมดอายุแล้ว) ; ไม่มีเลยคืน []"""
+        data = self._cache.peek(cache_name)
+        if data is None:
+            data = self._cache.store.load(cache_name)
+        return data or []
+
+    def _load_staffs_sheet(self):
+        return self._overlay_pending_staff_edits(get_staffs_data(self.sheet_url, sheet_name="Staffs"))
 
     def get_staffs_cached(self, max_age_sec=3600):
-        """
-        ดึงข้อมูล Staffs โดยใช้ระบบ Cache 3 ชั้น:
-        1) RAM cache (self._staffs_cache)
-        2) Disk cache (cache/staffs.json)
-        3) Fetch ใหม่จาก Google Sheets
-        """
-        import time
-        now = time.time()
-
-        # 1) RAM cache
-        if getattr(self, '_staffs_cache', None) and \
-        (now - getattr(self, '_staffs_cache_time', 0) < max_age_sec):
-            print("[DEBUG][Cache] Using RAM cache for Staffs")
-            return self._staffs_cache
-
-        # 2) Disk cache
-        disk = _load_file_cache('staffs')
-        if disk is not None:
-            print("[DEBUG][Cache] Loaded disk cache for Staffs")
-            self._staffs_cache = disk
-            self._staffs_cache_time = now
-            return disk
-
-        # 3) Fetch ใหม่จาก API
-        print("[DEBUG][Cache] Fetching new Staffs data from API")
+        """ข้อมูลชีต Staffs ผ่าน cache กลาง (RAM → disk → fingerprint → fetch)"""
         try:
-            staffs = get_staffs_data(self.sheet_url, sheet_name="Staffs")
-            # เก็บกลับทั้ง RAM & disk
-            self._staffs_cache = staffs
-            self._staffs_cache_time = now
-            _save_file_cache('staffs', staffs)
-            return staffs
+            return self._cached('staffs', "Staffs", self._load_staffs_sheet, max_age_sec)
         except Exception as e:
-            print(f"[ERROR][Python API] Failed to load staffs data: {e}")
-            # เคลียร์ cache เพื่อรอบถัดไปจะได้ลอง fetch ใหม่
-            self._staffs_cache = None
-            self._staffs_cache_time = 0
-            return []
+            # โหลดใหม่ไม่สำเร็จ (ออฟไลน์ / quota): ใช้ข้อมูลเดิมใน cache ต่อไป รอบถัดไปจะลอง fetch ใหม่เอง
+            log.error("Failed to load staffs data: %s", e)
+            return self._last_known('staffs')
 
     def get_transaction_cached(self, max_age_sec=3600):
-        """
-        ดึงข้อมูลจากชีต Transaction โดยใช้ระบบ Cache:
-        1) RAM cache (self._transaction_cache)
-        2) Disk cache (cache/transaction.json ผ่าน _load_file_cache)
-        3) Fetch ใหม่จาก Google Sheets แล้วเก็บกลับทั้ง RAM & disk
-        """
-        now = time.time()
-
-        # 1) ตรวจสอบ RAM cache ก่อน
-        if getattr(self, '_transaction_cache', None) and \
-           (now - getattr(self, '_transaction_cache_time', 0) < max_age_sec):
-            print("[DEBUG][Cache] Using RAM cache for Transaction")
-            return self._transaction_cache
-
-        # 2) ถ้า RAM หมดอายุ ลองโหลดจาก disk cache
-        disk = _load_file_cache('transaction')
-        if disk is not None:
-            print("[DEBUG][Cache] Loaded disk cache for Transaction")
-            self._transaction_cache = disk
-            self._transaction_cache_time = now
-            return disk
-
-        # 3) สุดท้าย fetch ใหม่จาก Google Sheets
-        print("[DEBUG][Cache] Fetching new Transaction data from API")
+        """ข้อมูลชีต Transaction ผ่าน cache กลาง (RAM → disk → fingerprint → fetch)"""
         try:
-            transactions = g_sheet_api.get_staffs_data(
-                self.sheet_url,
-                sheet_name="Transaction"
-            )
-            # เก็บกลับทั้ง RAM & disk
-            self._transaction_cache = transactions
-            self._transaction_cache_time = now
-            _save_file_cache('transaction', transactions)
-            return transactions
+            return self._cached('transaction', "Transaction",
+                                lambda: get_staffs_data(self.sheet_url, sheet_name="Transaction"), max_age_sec)
         except Exception as e:
-            print(f"[ERROR][Python API] Failed to load transaction data: {e}")
-            # เคลียร์ cache เพื่อรอบถัดไปจะได้ลองใหม่
-            self._transaction_cache = None
-            self._transaction_cache_time = 0
-            return []
+            log.error("Failed to load transaction data: %s", e)
+            return self._last_known('transaction')
 
     def get_employee_sheet_cached(self, sheet_name, max_age_sec=3600):
-        """ดึงซ้ำ Project แต่ละ Tab จากไฟล์ cache ก่อน ถ้าไม่มีค่อย fetch ใหม่"""
-        key = sheet_name.lower().replace(" ", "_")
-        data = _load_cache(f"sheet_{key}")
-        if data is not None:
-            return data
-
-        print(f"[Cache] fetching new sheet '{sheet_name}'")
-        lst = get_employee_sheet(self.sheet_url, sheet_name=sheet_name).get('reels', [])
-        _save_cache(f"sheet_{key}", lst)
-        return lst
+        """reels ของ tab โปรเจกต์ ผ่าน cache กลาง (RAM → disk → fingerprint → fetch)"""
+        return self._cached(
+            _sheet_cache_name(sheet_name), sheet_name,
+            lambda: get_employee_sheet(self.sheet_url, sheet_name=sheet_name).get('reels', []),
+            max_age_sec
+        )
 
     def get_monthly_summary_cached(self, year, month, max_age_sec=3600):
+        """สรุปรายเดือนจากชีต Monthly_Summary ผ่าน cache กลาง (fingerprint ตรวจเฉพาะแถวของเดือนนั้น)"""
+        return self._cached(
+            f"summary_{year}_{month}", "Monthly_Summary",
+            lambda: get_monthly_summary_data(self.sheet_url, year, month),
+            max_age_sec, year=year, month=month
+        )
+
+    def _hydrate_caches(self):
         """
-        ดึงข้อมูลสรุปรายเดือนจาก Google Sheets พร้อม cache 3 ชั้น:
-        1) RAM
-        2) Disk (_load_file_cache / _save_file_cache)
-        3) Fetch ใหม่
+        โหลด cache ที่ใช้บ่อยจาก disk เข้า RAM ใน background thread (เรียกตอนเปิดแอป คู่กับการสร้างหน้าต่าง)
+        ลำดับ: Staffs → Transaction → สรุปเดือนนี้ → tab โปรเจกต์ที่โหลดมาล่าสุดก่อน
+        ข้อมูลที่หมดอายุแล้วก็โหลด (หน้าจอแรกแสดงได้แม้เน็ตช้า/ใช้ไม่ได้) แล้วค่อยรีเฟรชเมื่อถูกใช้ครั้งแรก
         """
-        import time
-        key = (year, month)
-        now = time.time()
-
-        # 1) RAM cache
-        if key in self._monthly_summary_cache and (now - self._monthly_summary_cache_time.get(key, 0) < max_age_sec):
-            return self._monthly_summary_cache[key]
-
-        # 2) Disk cache
-        disk = _load_file_cache(f"summary_{year}_{month}")
-        if disk is not None:
-            self._monthly_summary_cache[key] = disk
-            self._monthly_summary_cache_time[key] = now
-            return disk
-
-        # 3) Fetch ใหม่
-        data = get_monthly_summary_data(self.sheet_url, year, month)
-        self._monthly_summary_cache[key] = data
-        self._monthly_summary_cache_time[key] = now
-        _save_file_cache(f"summary_{year}_{month}", data)
-        return data
-
-       
+        def run():
+            now = datetime.now()
+            keys = ['staffs', 'transaction', f"summary_{now.year}_{now.month}"]
+            store = self._cache.store
+            keys += sorted(store.keys("sheet_"), key=lambda key: -((store.info(key) or {}).get("fetched_at") or 0))
+            try:
+                with span(log, "hydrate caches from disk"):
+                    loaded = self._cache.hydrate(keys)
+                log.debug("Cache: hydrated %s cache(s) from disk: %s", len(loaded), loaded)
+            except Exception as e:
+                log.warning("Cache: startup hydration failed: %s", e)
 
+        thread = threading.Thread(target=run, name="cache-hydrate", daemon=True)
+        thread.start()
+        return thread
 
     def clear_caches(self):
-        self._transaction_cache      = None
-        self._transaction_cache_time = 0
-        self._staffs_cache           = None
-        self._staffs_cache_time      = 0
-        self._monthly_summary_cache.clear()
-        self._monthly_summary_cache_time.clear()
-
-        # ลบไฟล์ cache ทั้งหมดในโฟลเดอร์ cache/
-        for fn in os.listdir(CACHE_DIR):
-            if fn.endswith('.json'):
-                os.remove(os.path.join(CACHE_DIR, fn))
-
-        print("[DEBUG][Cache] All caches cleared")
+        # ล้างทั้ง RAM, disk cache (cache/cache.db) และ mirror (cache/mirror.db)
+        self._cache.clear()
+        self._fingerprints.clear()
+        self._mirror.clear()
+
+        log.debug("Cache: All caches cleared")
         return {"status": "ok"}
 
+    def invalidate_tab(self, tab_name):
+        """
+        API: ลืม cache ของ tab เดียว (RAM + disk + fingerprint) ให้รอบหน้าโหลดจากชีตใหม่ ; cache อื่นไม่ถูกแตะ
+        Monthly_Summary = สรุปทุกเดือนที่มี ; คืนชื่อ cache ที่ถูกล้าง
+        """
+        if tab_name == "Staffs":
+            names = ['staffs']
+        elif tab_name == "Transaction":
+            names = ['transaction']
+        elif tab_name == "Monthly_Summary":
+            names = self._cache.keys("summary_")
+        else:
+            names = [_sheet_cache_name(tab_name)]
+        for name in names:
+            self._invalidate_cache(name)
+        log.debug("Cache: invalidated %s for tab '%s'", names, tab_name)
+        return {"status": "ok", "payload": names}
+
+    def invalidate_month(self, year, month):
+        """API: ลืม cache สรุปรายเดือนของเดือนเดียว"""
+        name = f"summary_{int(year)}_{int(month)}"
+        self._invalidate_cache(name)
+        log.debug("Cache: invalidated '%s'", name)
+        return {"status": "ok", "payload": [name]}
+
+    def _invalidate_cache(self, cache_name):
+        # ต้องลบ fingerprint ด้วย ไม่งั้นรอบหน้าจะ revalidate ผ่าน (แถวที่แก้อาจไม่อยู่ในช่วงที่ fingerprint ครอบ)
+        self._cache.invalidate(cache_name, disk=True)
+        self._fingerprints.pop(cache_name, None)
+
     # ✅✅✅ เพิ่มฟังก์ชันนี้เข้าไปในคลาส Api ✅✅✅
     
 
@@ -318,34 +451,10 @@ class Api:
     # วางฟังก์ชันนี้ต่อจากฟังก์ชันอื่นในคลาส Api ได้เลยครับ
     def get_all_staff_for_dashboard(self):
         try:
-            staffs_raw_data = g_sheet_api.get_staffs_data(self.sheet_url, sheet_name="Staffs")
-
-            # --- ส่วนที่เพิ่มเข้ามา: หาวันที่ล่าสุด ---
-            latest_data_date = None
-            try:
-                transaction_data = g_sheet_api.get_staffs_data(self.sheet_url, sheet_name="Transaction")
-                dates_in_sheet = []
-                for row in transaction_data:
-                    date_str = row.get('SubmissionDate')
-                    if not date_str or not date_str.strip():
-                        continue
-                    
-                    try:
-                        # มีความยืดหยุ่นต่อ space และรูปแบบ dd/mm/yyyy หรือ d/m/yyyy
-                        day, month, year = map(int, date_str.strip().split('/'))
-                        if year < 100:
-                            year += 2000
-                        dates_in_sheet.append(datetime(year, month, day))
-                    except (ValueError, TypeError) as ve:
-                        print(f"[WARN] Could not parse date '{date_str}'. Error: {ve}. Skipping.")
-                        continue
-
-                if dates_in_sheet:
-                    latest_data_date = max(dates_in_sheet).strftime('%Y-%m-%d')
-            except Exception as e:
-                print(f"[WARN] Could not determine latest date: {e}")
-                traceback.print_exc()
-            # --- สิ้นสุดส่วนที่เพิ่ม ---
+            # Staffs + Transaction ผ่าน cache (หมดอายุแล้วรีเฟรชเบื้องหลัง) ; วันที่ล่าสุดอ่านจากยอดรวมรายวันของ mirror
+            staffs_raw_data = self.get_staffs_cached()
+            transaction_data = self.get_transaction_cached()
+            latest_data_date = self._mirrored('transaction', transaction_data).latest_day('transaction')
 
             employee_list = [{
                 "name": staff.get("Name", "-"),
@@ -358,7 +467,7 @@ class Api:
             return {"status": "ok", "payload": {"staffs": employee_list, "latest_date": latest_data_date}}
 
         except Exception as e:
-            print(f"[ERROR][Python API] get_all_staff_for_dashboard: {e}")
+            log.error("get_all_staff_for_dashboard: %s", e)
             return {"status": "error", "message": str(e)}
 
 
@@ -369,29 +478,32 @@ class Api:
         API สำหรับดึงข้อมูล "เฉพาะ" ส่วนของการ์ดเพจ (Page Cards)
         สำหรับหน้า Stats & Analytics
         """
-        print(f"[API] Fetching PAGE DETAILS for {email} on {date_str}")
+        log.info("Fetching PAGE DETAILS for %s on %s", email, date_str)
         try:
             selected_date = datetime.strptime(date_str, "%Y-%m-%d")
-            sheet_date_format = selected_date.strftime('%#d/%#m/%Y')
+            sheet_date_format = f"{selected_date.day}/{selected_date.month}/{selected_date.year}"
             
             # 1. ดึงข้อมูลพื้นฐานของพนักงาน
             staffs_data = self.get_staffs_cached()
-            staff_info = next((s for s in staffs_data if s.get("E-Mail") == email), {})
+            staff_info = self._mirrored('staffs', staffs_data).first('staffs', email=email)
             if not staff_info:
                 return {"status": "error", "message": "ไม่พบข้อมูลพนักงาน"}
 
             project_sheet_name = staff_info.get("Project Name")
             daily_target = int(staff_info.get("DailyTarget", 2))
 
-            # 2. ดึงข้อมูล Transaction ของวันนั้นๆ
-            transaction_data = g_sheet_api.get_staffs_data(self.sheet_url, sheet_name="Transaction")
-            employee_transactions = [row for row in transaction_data if row.get('EmployeeEmail') == email and row.get('SubmissionDate') == sheet_date_format]
+            # 2. ดึงข้อมูล Transaction ของวันนั้นๆ (index email + วันที่ ใน mirror)
+            transaction_data = self.get_transaction_cached()
+            employee_transactions = self._mirrored('transaction', transaction_data).find(
+                'transaction', email=email, date=sheet_date_format)
 
-            # 3. ดึงข้อมูลจากชีต Project ของพนักงาน
-            project_sheet_data = []
+            # 3. ดึงข้อมูลจากชีต Project ของพนักงาน เฉพาะแถวของวันนั้น จัดกลุ่มตามชื่อเพจ
+            daily_project_data = {}
             if project_sheet_name:
-                project_sheet_data = g_sheet_api.get_employee_sheet(self.sheet_url, sheet_name=project_sheet_name).get('reels', [])
-            daily_project_data = [row for row in project_sheet_data if row.get('Date') == sheet_date_format]
+                cache_name = _sheet_cache_name(project_sheet_name)
+                project_sheet_data = self.get_employee_sheet_cached(project_sheet_name)
+                for p in self._mirrored(cache_name, project_sheet_data).find(cache_name, date=sheet_date_format):
+                    daily_project_data.setdefault(p.get('PageName', '').strip().lower(), p)
 
             # 4. รวบรวมข้อมูล Page Cards (รองรับกรณีไม่มีชื่อเพจ)
             unique_pages = {}
@@ -405,11 +517,7 @@ class Api:
                 platform  = 'ig' if 'instagram.com' in link.lower() else 'fb'
 
                 # หาแถวของเพจใน daily_project_data (เช็ค PageName)
-                proj_row = next(
-                    (p for p in daily_project_data
-                    if p.get('PageName', '').strip().lower() == page_name.lower()),
-                    None
-                )
+                proj_row = daily_project_data.get(page_name.lower())
                 try:
                     clips_sent = int(proj_row.get('Clips_Sent', 0))
                 except (ValueError, AttributeError):
@@ -434,38 +542,33 @@ class Api:
             return {"status": "ok", "payload": list(unique_pages.values())}
 
         except Exception as e:
-            print(f"[ERROR][Python API] get_employee_page_details: {e}")
-            traceback.print_exc()
+            log.exception("get_employee_page_details: %s", e)
             return {"status": "error", "message": str(e)}
 
     def get_employee_dashboard_data(self, email, date_str):
         """
         API สำหรับดึงข้อมูลทั้งหมดสำหรับหน้า Stats Dashboard (เวอร์ชันแก้ไข Error และใช้ Project Name ในการ map)
         """
-        print(f"[API] Fetching final dashboard data for {email} on {date_str}")
+        log.info("Fetching final dashboard data for %s on %s", email, date_str)
         try:
             # === STEP 1: PREPARATION (ส่วนนี้ถูกต้องแล้ว) ===
             selected_date = datetime.strptime(date_str, "%Y-%m-%d")
             
-            possible_date_formats = {
-                selected_date.strftime('%d/%m/%Y'),
-                f"{selected_date.day}/{selected_date.month}/{selected_date.year}"
-            }
+            sheet_date_format = f"{selected_date.day}/{selected_date.month}/{selected_date.year}"
             
-            # === STEP 2: FETCH DATA (ส่วนนี้ถูกต้องแล้ว) ===
+            # === STEP 2: FETCH DATA (ค้นผ่าน index ของ mirror แทนการวนทั้ง list) ===
             staffs_data = self.get_staffs_cached()
             transaction_data = self.get_transaction_cached()
+            summary_key = f"summary_{selected_date.year}_{selected_date.month}"
             monthly_summary_data = self.get_monthly_summary_cached(selected_date.year, selected_date.month)
 
-            staff_info = next((s for s in staffs_data if s.get("E-Mail", "").strip().lower() == email.strip().lower()), None)
+            staff_info = self._mirrored('staffs', staffs_data).first('staffs', email=email)
             if not staff_info:
                 return {"status": "error", "message": f"ไม่พบข้อมูลพนักงานสำหรับ {email}"}
 
-            employee_transactions = [
-                row for row in transaction_data 
-                if row.get('EmployeeEmail', '').strip().lower() == email.strip().lower() 
-                and row.get('SubmissionDate', '').strip() in possible_date_formats
-            ]
+            # วันที่ใน mirror ถูก normalize แล้ว จึงเจอทั้งแบบ dd/mm/yyyy และ d/m/yyyy
+            employee_transactions = self._mirrored('transaction', transaction_data).find(
+                'transaction', email=email, date=sheet_date_format)
 
             # === STEP 3: BUILD PAGE CARDS (รองรับกรณีไม่มีชื่อเพจ) ===
             # กำหนดค่า daily_target_per_page จากข้อมูล staff_info
@@ -489,7 +592,7 @@ class Api:
 
                 # คำนวณจำนวนคลิปที่ส่ง
                 clips_sent = 0
-                clips_val = row.get('Clips_Sent', '').strip()
+                clips_val = str(row.get('Clips_Sent', '')).strip()
                 if clips_val.isdigit():
                     clips_sent = int(clips_val)
                 else:
@@ -529,7 +632,7 @@ class Api:
             try:
                 # ✅ ใช้ "Project Name" จาก staff_info ในการค้นหา
                 staff_project_name = staff_info.get('Project Name', '').strip()
-                summary_for_staff = next((s for s in monthly_summary_data if s.get('projectName', '').strip().lower() == staff_project_name.lower()), None)
+                summary_for_staff = self._mirrored(summary_key, monthly_summary_data).first(summary_key, project=staff_project_name)
 
                 if summary_for_staff:
                     daily_dict = summary_for_staff.get('dailyData', {})
@@ -560,14 +663,15 @@ class Api:
                             leave_status_kpi = "ลา"
 
                     else:
-                        # ถ้าไม่เจอข้อมูลของ "วัน" นั้นๆ ใน summary
+                        # ถ้าไม่เจอข้อมูลของ "วัน" นั้นๆ ใน summary ใช้ยอดคลิปจาก Transaction แทน
                         submission_status_kpi = "ยังไม่ส่ง"
+                        total_clips_today = self._transaction_clips(email, selected_date)
                 else:
                      # ถ้าไม่เจอข้อมูลของ "โปรเจกต์" นั้นๆ ใน summary
                      submission_status_kpi = "ไม่มีข้อมูลสรุป"
 
             except Exception as e_summary:
-                print(f"[ERROR] เกิดข้อผิดพลาดขณะประมวลผล KPI ของหน้า Stats: {e_summary}")
+                log.error("เกิดข้อผิดพลาดขณะประมวลผล KPI ของหน้า Stats: %s", e_summary)
                 submission_status_kpi = "Error"
                 leave_status_kpi = "Error"
 
@@ -586,17 +690,34 @@ class Api:
             return {"status": "ok", "payload": dashboard_payload}
 
         except Exception as e:
-            print(f"[ERROR][Python API] get_employee_dashboard_data: {e}")
-            traceback.print_exc()
+            log.exception("get_employee_dashboard_data: %s", e)
             return {"status": "error", "message": str(e)}
         
 
     
 
 
+    def _transaction_clips(self, email, day):
+        """ยอดคลิปของ email ในวัน day (datetime) จากยอดรวมรายวันของ Transaction"""
+        mirror = self._mirrored('transaction', self.get_transaction_cached())
+        day_key = day.strftime("%Y-%m-%d")
+        return mirror.daily_totals('transaction', 'email', email, day_key, day_key).get(day_key, {}).get('clips', 0)
+
+    def _transaction_month_totals(self, year, month):
+        """{ชื่อพนักงาน (ตัวเล็ก): ยอดคลิปทั้งเดือน} จากยอดรวมรายวันของ Transaction"""
+        mirror = self._mirrored('transaction', self.get_transaction_cached())
+        _, num_days = calendar.monthrange(year, month)
+        totals = mirror.totals('transaction', 'email', f"{year:04d}-{month:02d}-01", f"{year:04d}-{month:02d}-{num_days:02d}")
+        clips = {}
+        for staff in self.get_staffs_cached():
+            found = totals.get(str(staff.get('E-Mail', '')).strip().lower())
+            if found:
+                clips[str(staff.get('Name', '')).strip().lower()] = found['clips']
+        return clips
+
     def fetch_leaves_list(self, year=None, month=None, day=None):
         """ API สำหรับดึงข้อมูลตารางในหน้า Leaves (รายวัน) """
-        print(f"[DEBUG][Python API] fetch_leaves_list called with year={year}, month={month}, day={day}")
+        log.debug("fetch_leaves_list called with year=%s, month=%s, day=%s", year, month, day)
         try:
             now = datetime.now()
             target_year = year if year is not None else now.year
@@ -613,13 +734,13 @@ class Api:
             data = get_leaves_list_data(self.sheet_url, target_year, target_month, target_day, monthly_data, staffs_data)
             return {"status": "ok", "payload": data}
         except Exception as e:
-            print(f"[ERROR][Python API] fetch_leaves_list failed: {e}")
+            log.error("fetch_leaves_list failed: %s", e)
             return {"status": "error", "message": str(e)}    
         
 
-    def fetch_monthly_summary(self, year, month):
-        """ API สำหรับให้ JS เรียกเพื่อดึงข้อมูลสรุปรายเดือน """
-        print(f"[DEBUG][Python API] fetch_monthly_summary called for {month}/{year}")
+    def fetch_monthly_summary(self, year, month, wire=None):
+        """ API สำหรับให้ JS เรียกเพื่อดึงข้อมูลสรุปรายเดือน (wire: ดู _wire_rows) """
+        log.debug("fetch_monthly_summary called for %s/%s", month, year)
         try:
             # ใช้ cached data
             data = self.get_monthly_summary_cached(year, month)
@@ -628,22 +749,66 @@ class Api:
             _, num_days = calendar.monthrange(year, month)
             monthly_target = 40 * num_days
 
-            # เพิ่ม 'เป้าต่อเดือน' เข้าไปในข้อมูลของแต่ละคน
-            for person_data in data:
-                person_data['monthlyTarget'] = monthly_target
+            # ยอดคลิปทั้งเดือนจาก Transaction (ยอดรวมรายวันใน mirror) จับคู่คนด้วยชื่อ → email ใน Staffs
+            submitted = self._transaction_month_totals(year, month)
+
+            # เพิ่ม 'เป้าต่อเดือน' เข้าไปในข้อมูลของแต่ละคน (สำเนาใหม่ ไม่แก้ข้อมูลใน cache)
+            data = [{**person_data, 'monthlyTarget': monthly_target,
+                     'submittedClips': submitted.get(str(person_data.get('name', '')).strip().lower(), 0)}
+                    for person_data in data]
             
-            return {"status": "ok", "payload": data}
+            return {"status": "ok", "payload": self._wire_rows(f"summary_{year}_{month}", data, wire, key='name')}
         except Exception as e:
-            print(f"[ERROR][Python API] fetch_monthly_summary failed: {e}")
+            log.error("fetch_monthly_summary failed: %s", e)
             return {"status": "error", "message": str(e)}   
 
 
     def login(self, email, remember=False):
-        print(f"[DEBUG][Python API] Login request for email: {email}")
+        log.debug("Login request for email: %s", email)
+
+        # 1. เคย login บนเครื่องนี้แล้ว → ใช้ session ที่บันทึกไว้ ตอบทันที แล้วค่อยตรวจกับชีตจริงเบื้องหลัง
+        snapshot = self._load_session(email)
+        if snapshot is not None:
+            user = {**snapshot["user"], "E-Mail": email}
+            project_name_raw = snapshot["project"]
+            log.debug("Login: using saved session for %s", email)
+        else:
+            session = self._resolve_session(email)
+            if session is None:
+                return {"status": "error", "message": "ไม่พบผู้ใช้งาน"}
+            user, project_name_raw = session
+            self._save_session(email, user, project_name_raw)
 
-        # 1. ดึงข้อมูลพนักงาน (cached)
-        staffs = self.get_staffs_cached()
-        print(f"[DEBUG][Python API] Fetched staffs data: {len(staffs)} records (cached)")
+        self.current_user = user
+        log.debug("Current user set: %s", self.current_user)
+
+        # 2. บันทึก token ถ้ามี remember
+        if remember:
+            token_data = {"email": email, "role": user["Role"]}
+            keyring.set_password('RCP_Center', 'user_token', json.dumps(token_data))
+            log.debug("Remember Me: Token saved to OS Keychain")
+
+        # 3. Pre-warm caches & project sheets ใน background (ยกเลิก prewarm ของผู้ใช้ก่อนหน้าถ้ามี)
+        self._pin_session_caches(project_name_raw)
+        self._start_prewarm(project_name_raw, self._session_project_tabs(user))
+
+        if snapshot is not None:
+            threading.Thread(target=self._reconcile_session, args=(email, user), name="session-reconcile", daemon=True).start()
+
+        return {
+            "status":  "ok",
+            "payload": self.current_user
+        }
+
+    def _resolve_session(self, email, staffs=None):
+        """
+        หา role / AllowedProjects / ProjectMap ของ email จาก Staffs (และรายชื่อ tab สำหรับ admin)
+        คืน (current_user, ชื่อโปรเจกต์ของผู้ใช้) ; ไม่พบผู้ใช้คืน None
+        """
+        # 1. ดึงข้อมูลพนักงาน (cached ถ้าไม่ได้ส่งมา)
+        if staffs is None:
+            staffs = self.get_staffs_cached()
+        log.debug("Fetched staffs data: %s records", len(staffs))
 
         # 2. หา user record
         match = next(
@@ -652,14 +817,14 @@ class Api:
             None
         )
         if not match:
-            print(f"[DEBUG][Python API] User not found for email: {email}")
-            return {"status": "error", "message": "ไม่พบผู้ใช้งาน"}
+            log.debug("User not found for email: %s", email)
+            return None
 
         # 3. อ่าน role และ project info
         role               = match.get("Role", "User")
         project_name_raw   = match.get("Project Name", "").strip()
         project_id         = canonical_id(project_name_raw)
-        print(f"[DEBUG][Python API] User '{email}' found. Role: '{role}', Project Name: '{project_name_raw}', Project ID: '{project_id}'")
+        log.debug("User '%s' found. Role: '%s', Project Name: '%s', Project ID: '%s'", email, role, project_name_raw, project_id)
 
         # 4. กำหนด AllowedProjects & ProjectMap
         if role.lower() == 'admin':
@@ -685,87 +850,113 @@ class Api:
                     allowed.append(pid)
                     project_map[pid] = {"tab": tab, "owner": owner_map.get(pid)}
 
-            print(f"[DEBUG][Python API] Admin mode. Allowed projects: {allowed}")
-            print(f"[DEBUG][Python API] Project Map: {project_map}")
+            log.debug("Admin mode. Allowed projects: %s", allowed)
+            log.debug("Project Map: %s", project_map)
         else:
             allowed     = [project_id] if project_id else []
             project_map = {
                 project_id: {"tab": project_name_raw, "owner": email}
             } if project_id else {}
-            print(f"[DEBUG][Python API] User mode. Allowed projects: {allowed}")
+            log.debug("User mode. Allowed projects: %s", allowed)
 
-        # 5. เซ็ต current_user
-        self.current_user = {
+        user = {
             "E-Mail":         email,
             "Role":           role,
             "AllowedProjects": allowed,
             "ProjectMap":     project_map
         }
-        print(f"[DEBUG][Python API] Current user set: {self.current_user}")
+        return user, project_name_raw
 
-        self.preload_all_projects(self.current_user["E-Mail"])  # ✅ key ที่ถูกต้องคือ E-Mail
+    @staticmethod
+    def _session_key(email):
+        return f"{SESSION_CACHE_PREFIX}{email.strip().lower()}"
 
-        # 6. บันทึก token ถ้ามี remember
-        if remember:
-            token_data = {"email": email, "role": role}
-            keyring.set_password('RCP_Center', 'user_token', json.dumps(token_data))
-            print("[DEBUG][Python API] Remember Me: Token saved to OS Keychain")
+    @staticmethod
+    def _session_project_tabs(user):
+        """tab โปรเจกต์ที่ต้อง prewarm นอกจากโปรเจกต์ของตัวเอง (admin = ทุกโปรเจกต์)"""
+        if user["Role"].lower() != 'admin':
+            return []
+        return [info.get("tab") for info in user["ProjectMap"].values() if info.get("tab")]
 
-        # 7. Pre-warm caches & project sheets ใน background
-        def _prewarm():
-            print("[DEBUG][Python API] Pre-warming caches...")
-            try:
-                # พื้นฐาน
-                self.get_transaction_cached()
-                self.get_staffs_cached()
-                now = datetime.now()
-                self.get_monthly_summary_cached(now.year, now.month)
-
-                # ถ้าเป็น admin ให้โหลด sheet ของทุกโปรเจกต์
-                if role.lower() == 'admin':
-                    for pid, info in project_map.items():
-                        tab = info.get("tab")
-                        if not tab:
-                            continue
-                        try:
-                            print(f"[DEBUG][Python API] Pre-warming sheet '{tab}'")
-                            self.get_employee_sheet_cached(tab)
-                            print(f"[DEBUG][Python API] Pre-warmed sheet '{tab}' successfully")
-                        except Exception as e:
-                            # ไม่ให้ thread crash, แค่ log error
-                            print(f"[ERROR][Cache Prewarm] Failed to prewarm '{tab}': {e}")
-
-                # ตบท้ายด้วยดึง Leaves ไว้ดูทันที
-                print("[DEBUG][Python API] Pre-warming Leaves data")
-                self.fetch_leaves_list()
-            except Exception as e:
-                print(f"[ERROR][Cache Prewarm] Unexpected error in prewarm: {e}")
-            finally:
-                print("[DEBUG][Python API] Pre-warm complete.")
+    def _pin_session_caches(self, project_name):
+        """ให้สรุปเดือนปัจจุบันและ tab โปรเจกต์ของผู้ใช้อยู่ใน RAM เสมอ (ไม่ถูกไล่ตามงบของกลุ่ม)"""
+        now = datetime.now()
+        keys = [f"summary_{now.year}_{now.month}"]
+        if project_name:
+            keys.append(_sheet_cache_name(project_name))
+        self._cache.pin(keys)
 
-        threading.Thread(target=_prewarm, daemon=True).start()
+    def _load_session(self, email):
+        try:
+            snapshot = self._cache.store.load(self._session_key(email), SESSION_MAX_AGE)
+        except Exception as e:
+            log.warning("Login: cannot read saved session of %s: %s", email, e)
+            return None
+        if not isinstance(snapshot, dict) or "user" not in snapshot:
+            return None
+        return snapshot
 
-        return {
-            "status":  "ok",
-            "payload": self.current_user
-        }
+    def _save_session(self, email, user, project_name):
+        try:
+            self._cache.store.save(self._session_key(email), {"user": user, "project": project_name})
+        except Exception as e:
+            log.warning("Login: cannot save session of %s: %s", email, e)
+
+    def _reconcile_session(self, email, user):
+        """
+        ตรวจ session ที่ login ไปจาก snapshot กับข้อมูล Staffs ที่อ่านใหม่จากชีต (ไม่ใช้ cache)
+        role / โปรเจกต์เปลี่ยน → อัปเดต current_user + snapshot แล้วแจ้ง JS ('session_updated')
+        ไม่พบผู้ใช้แล้ว → ออกจากระบบ ; ถ้าผู้ใช้ logout / สลับคนไปก่อนตรวจเสร็จ ก็ไม่ทำอะไร
+        """
+        try:
+            with span(log, "reconcile session of %s", email):
+                with sheets_scheduler.priority(sheets_scheduler.PRIORITY_BACKGROUND):
+                    # อ่าน Staffs จากชีตจริง: cache (TTL / stale) อาจเก่าเป็นชั่วโมง ทำให้ไม่เห็นสิทธิ์ที่ถูกเปลี่ยน / ยกเลิก
+                    staffs = self._refetch('staffs', "Staffs", self._load_staffs_sheet)
+                    session = self._resolve_session(email, staffs)
+        except Exception as e:
+            log.warning("Login: cannot reconcile session of %s: %s", email, e)
+            return
+        if self.current_user is not user:
+            return
+
+        if session is None:
+            log.warning("Login: %s no longer in Staffs, signing out", email)
+            self._cache.store.delete(self._session_key(email))
+            self.current_user = None
+            self._prewarm.cancel()
+            self._cache.pin(())
+            self.python_callback_to_js({"type": "session_updated", "status": "error", "message": "ไม่พบผู้ใช้งาน"})
+            return
+
+        fresh, project_name_raw = session
+        self._save_session(email, fresh, project_name_raw)
+        if fresh == user:
+            return
+        log.debug("Login: session of %s changed: %s → %s", email, user, fresh)
+        self.current_user = fresh
+        self._pin_session_caches(project_name_raw)
+        self._start_prewarm(project_name_raw, self._session_project_tabs(fresh))
+        self.python_callback_to_js({"type": "session_updated", "status": "ok", "payload": fresh})
 
     def logout(self):
         """
         ลบ current_user และลบ token จาก OS Keychain
         """
-        # เคลียร์ session ฝั่ง Python
+        # เคลียร์ session ฝั่ง Python และหยุด prewarm ที่ยังค้างอยู่
         self.current_user = None
+        self._prewarm.cancel()
+        self._cache.pin(())
 
         # ลบ token ใน Keychain
         try:
             keyring.delete_password('RCP_Center', 'user_token')
-            print("[DEBUG][Python API] Token removed from OS Keychain")
+            log.debug("Token removed from OS Keychain")
         except keyring.errors.PasswordDeleteError:
             # ไม่มี token หรือ ลบไม่สำเร็จก็ไม่ต้องแจ้ง error เพิ่ม
             pass
 
-        print("[DEBUG][Python API] User logged out.")
+        log.debug("User logged out.")
         return {"status": "ok"}
 
     def auto_login(self):
@@ -773,42 +964,42 @@ class Api:
         พยายามอ่าน token จาก OS Keychain แล้วเรียก self.login()
         ถ้าไม่มีหรืออ่านไม่ได้ คืน error เหมือนเดิม
         """
-        print("[DEBUG][Python API] auto_login: Checking OS Keychain for token")
+        log.debug("auto_login: Checking OS Keychain for token")
         # ดึงข้อมูลจาก Keychain
         data = keyring.get_password('RCP_Center', 'user_token')
         if data:
             try:
                 token_data = json.loads(data)
                 email = token_data.get('email')
-                print(f"[DEBUG][Python API] auto_login: Retrieved email={email} from Keychain")
+                log.debug("auto_login: Retrieved email=%s from Keychain", email)
                 if email:
                     # เรียก login เพื่อเซ็ต self.current_user และ pre-warm cache
                     login_result = self.login(email, remember=True)
-                    print(f"[DEBUG][Python API] auto_login: login_result={login_result}")
+                    log.debug("auto_login: login_result=%s", login_result)
                     return login_result
             except json.JSONDecodeError:
                 # ถ้าไฟล์เสียหาย ลบทิ้งใน Keychain
-                print("[ERROR][Python API] auto_login: Invalid token JSON, deleting from Keychain")
+                log.error("auto_login: Invalid token JSON, deleting from Keychain")
                 try:
                     keyring.delete_password('RCP_Center', 'user_token')
                 except keyring.errors.PasswordDeleteError:
                     pass
         else:
-            print("[DEBUG][Python API] auto_login: No token found in Keychain")
+            log.debug("auto_login: No token found in Keychain")
         
         return {"status": "error", "message": "No valid token found"}
 
-    def fetch_employee_data(self, project_id):
-        print(f"[DEBUG][Python API] fetch_employee_data called for project_id: {project_id}")
+    def fetch_employee_data(self, project_id, query=None, wire=None):
+        log.debug("fetch_employee_data called for project_id: %s", project_id)
         if not self.current_user:
-            print("[ERROR][Python API] fetch_employee_data: Not logged in.")
+            log.error("fetch_employee_data: Not logged in.")
             return {"status": "error", "message": "Not logged in"}
 
         allowed = self.current_user.get("AllowedProjects", [])
         project_map = self.current_user.get("ProjectMap", {})
 
-        print(f"[DEBUG][Python API] current_user.Role: {self.current_user['Role'].lower()}")
-        print(f"[DEBUG][Python API] project_id in allowed: {project_id in allowed}")
+        log.debug("current_user.Role: %s", self.current_user['Role'].lower())
+        log.debug("project_id in allowed: %s", project_id in allowed)
 
         # The project_id passed from JS is already canonical (e.g., 'project_q')
         # We need to get the original sheet name from project_map
@@ -821,7 +1012,7 @@ class Api:
             sheet_name = sheet_info
 
         if self.current_user["Role"].lower() != "admin" and project_id not in allowed:
-            print(f"[ERROR][Python API] fetch_employee_data: Permission denied for project_id '{project_id}'")
+            log.error("fetch_employee_data: Permission denied for project_id '%s'", project_id)
             return {"status": "error", "message": "Permission denied"}
 
         # Try to be robust: if not found, try to match by canonical name (case-insensitive)
@@ -836,67 +1027,306 @@ class Api:
                     break
 
         if not sheet_name:
-            print(f"[ERROR][Python API] fetch_employee_data: Sheet name not found for project_id '{project_id}' in map: {project_map}")
+            log.error("fetch_employee_data: Sheet name not found for project_id '%s' in map: %s", project_id, project_map)
             return {"status": "error", "message": f"ไม่พบชื่อชีตสำหรับโปรเจกต์ '{project_id}'"}
 
-        print(f"[DEBUG][Python API] fetch_employee_data: Fetching data for sheet_name: '{sheet_name}' (from project_id '{project_id}')")
+        log.debug("fetch_employee_data: Fetching data for sheet_name: '%s' (from project_id '%s')", sheet_name, project_id)
         try:
-            data = get_employee_sheet(self.sheet_url, sheet_name)
-            if "error_message" in data:
-                print(f"[ERROR][Python API] get_employee_sheet returned error: {data['error_message']}")
-                return {"status": "error", "message": data["error_message"]}
-            print(f"[DEBUG][Python API] fetch_employee_data: Successfully fetched data from sheet '{sheet_name}'. Reels count: {len(data.get('reels', []))}")
-            return {"status": "ok", "payload": data}
+            # tab โปรเจกต์ผ่าน cache กลาง ; ไม่มี query คืนทั้ง tab แบบเดิม
+            reels = self.get_employee_sheet_cached(sheet_name)
+            if query is None:
+                log.debug("fetch_employee_data: Returning all %s reels of sheet '%s'", len(reels), sheet_name)
+                reels = self._wire_rows(None, sheet_records.to_plain(reels), wire)
+                return {"status": "ok", "payload": {"reels": reels, "sheet_name": sheet_name}}
+            payload = self._query_reels(sheet_name, reels, query)
+            payload["reels"] = self._wire_rows(None, payload["reels"], wire)
+            return {"status": "ok", "payload": payload}
         except Exception as e:
-            print(f"[ERROR][Python API] fetch_employee_data: Error calling get_employee_sheet: {e}")
+            log.error("fetch_employee_data: Error loading sheet '%s': %s", sheet_name, e)
             return {"status": "error", "message": str(e)}
 
-    def fetch_staffs_data(self, sheet_url: str = None):
+    def _query_reels(self, sheet_name, reels, query):
+        """
+        reels ของ tab โปรเจกต์ตามเงื่อนไขจาก JS ค้นผ่าน index ของ mirror แล้วตัดเหลือหน้าเดียว
+          date_from / date_to: 'YYYY-MM-DD' (รวมปลาย) ; page: ชื่อเพจ ; platform: 'fb' / 'ig'
+          sort: 'date' / 'page' / 'no' / 'status' (นำหน้า '-' คือมากไปน้อย ; ไม่ระบุคือตามลำดับในชีต)
+          offset / limit: ช่วงของผลลัพธ์ที่ส่งกลับ (limit ไม่เกิน REELS_MAX_LIMIT)
+        total คือจำนวนแถวที่ตรงเงื่อนไขทั้งหมด สำหรับทำปุ่มเปลี่ยนหน้า
+        """
+        cache_name = _sheet_cache_name(sheet_name)
+        date_range = [datetime.strptime(query[name], "%Y-%m-%d").strftime("%Y-%m-%d") if query.get(name) else None
+                      for name in ("date_from", "date_to")]
+        where = {"page": query["page"]} if query.get("page") else {}
+        rows = self._mirrored(cache_name, reels).find_range(cache_name, "date", *date_range, **where)
+
+        platform = str(query.get("platform") or "").upper()
+        if platform:
+            if platform not in ("FB", "IG"):
+                raise ValueError(f"ไม่รู้จัก platform '{query['platform']}'")
+            rows = [row for row in rows if str(row.get(platform, "")).strip() == "1"]
+
+        sort = query.get("sort") or ""
+        if sort:
+            column = sort.lstrip("-")
+            if column not in REEL_SORT_KEYS:
+                raise ValueError(f"เรียงตาม '{column}' ไม่ได้")
+            rows = sorted(rows, key=REEL_SORT_KEYS[column], reverse=sort.startswith("-"))
+
+        offset = max(0, int(query.get("offset") or 0))
+        limit = min(max(1, int(query.get("limit") or REELS_PAGE_SIZE)), REELS_MAX_LIMIT)
+        log.debug("fetch_employee_data: '%s' query %s matched %s of %s reels", sheet_name, query, len(rows), len(reels))
+        return {
+            "reels": sheet_records.to_plain(rows[offset:offset + limit]),
+            "sheet_name": sheet_name,
+            "total": len(rows),
+            "offset": offset,
+            "limit": limit,
+        }
+
+    def _wire_rows(self, stream, rows, wire, key=None):
+        """
+        rows (list ของ dict) ในรูปที่ JS ขอ: wire เป็น None คือแบบเดิม
+        เป็น dict คือแบบย่อของ wire_format (ชื่อคอลัมน์ครั้งเดียว + string ซ้ำเป็น dictionary)
+        ถ้ามี key และ wire['since'] เป็นเวอร์ชันที่ JS ถืออยู่ ส่งเฉพาะแถวที่เปลี่ยนจากเวอร์ชันนั้น
+        """
+        if wire is None:
+            return rows
+        return self._wire.encode(stream, rows, key if stream else None, wire.get('since'))
+
+    def fetch_staffs_data(self, sheet_url: str = None, wire=None):
         """
         Fetch staffs ผ่าน cache layer โดย sheet_url จะเป็น optional:
           - ถ้า JS ไม่ส่ง URL มา จะใช้ self.sheet_url ที่เก็บตอนสร้าง Api
           - ถ้า JS ส่งมา ก็ log เอาไว้ แต่ cache ยังทำงานตาม TTL เดิม
+        wire: ดู _wire_rows
         """
         # เลือกใช้ URL ที่ถูกต้อง
         url = sheet_url or self.sheet_url
-        print(f"[DEBUG][Python API] fetch_staffs_data called for sheet_url: {url}")
+        log.debug("fetch_staffs_data called for sheet_url: %s", url)
 
         try:
             data = self.get_staffs_cached(max_age_sec=300)
-            print(f"[DEBUG][Python API] Returning {len(data)} cached staffs")
-            return {"status": "ok", "payload": data}
+            log.debug("Returning %s cached staffs", len(data))
+            return {"status": "ok", "payload": self._wire_rows('staffs', sheet_records.to_plain(data), wire, key='ID')}
         except Exception as e:
-            print(f"[ERROR][Python API] fetch_staffs_data: Error: {e}")
+            log.error("fetch_staffs_data: Error: %s", e)
             return {"status": "error", "payload": [], "message": str(e)}
 
-    def update_staff_info(self, sheet_url, staff_id, column_name, new_value):
-        print(f"[DEBUG][Python API] update_staff_info called for staff_id: {staff_id}, column: {column_name}, value: {new_value}")
+    def update_staff_info(self, sheet_url, staff_id, column_name, new_value, confirm=False):
+        """
+        ใส่การแก้ไขลงคิว write-behind แล้วตอบ JS ทันที (pending)
+        ผลการเขียนจริงจะแจ้งกลับทาง python_callback_to_js เป็น type 'staff_update_result'
+        confirm=True → เขียนสำเร็จแล้วอ่านแถวนั้นกลับมาแก้ cache ให้ตรงกับชีต (1 request)
+        """
+        log.debug("update_staff_info called for staff_id: %s, column: %s, value: %s", staff_id, column_name, new_value)
         try:
-            # ✅ ส่ง column_name ตรงๆ ไปให้ update_staff_data
-            result = update_staff_data(self.sheet_url, staff_id, column_name, new_value)
-            print(f"[DEBUG][Python API] update_staff_info result: {result}")
-            return result
+            edit_id = self._staff_write_queue.enqueue(self.sheet_url, staff_id, column_name, new_value)
+            if confirm:
+                self._confirm_edit_ids.add(edit_id)
+            self._apply_staff_edit_to_cache(staff_id, column_name, new_value)
+            return {"status": "ok", "pending": True, "edit_id": edit_id, "message": "กำลังบันทึกข้อมูล..."}
         except Exception as e:
-            print(f"[ERROR][Python API] update_staff_info: Error: {e}")
+            log.error("update_staff_info: Error: %s", e)
             return {"status": "error", "message": str(e)}
 
+    def _patch_staff_cache(self, changes, staff_id=None, email=None):
+        """
+        write-through: แก้ record ของ staff คนเดียว (ระบุด้วย ID หรือ email) ใน cache Staffs ทั้ง RAM และ disk
+        แล้ว sync mirror ; changes = {คอลัมน์: ค่าใหม่} ; คืน True ถ้ามีค่าเปลี่ยน
+        """
+        if staff_id is not None:
+            column, key = "ID", str(staff_id).strip()
+        else:
+            column, key = "E-Mail", str(email).strip().lower()
+
+        def update(staffs):
+            for record in staffs:
+                value = str(record.get(column, "")).strip()
+                if (value if column == "ID" else value.lower()) == key:
+                    # แก้เฉพาะคอลัมน์ที่มีในชีต (คอลัมน์ที่ไม่มี การเขียนจะล้มเหลวอยู่แล้ว)
+                    changed = {name: new for name, new in changes.items() if name in record and record[name] != new}
+                    for name, new in changed.items():
+                        record[name] = new
+                    return bool(changed)
+            return False
+
+        if not self._cache.patch('staffs', update):
+            return False
+        self._mirror_sync('staffs', self._cache.peek('staffs'))
+        return True
+
+    def _apply_staff_edit_to_cache(self, staff_id, column_name, new_value):
+        """ให้ cache (RAM + disk) และ mirror ของ Staffs เห็นค่าที่กำลังรอเขียนทันที"""
+        self._patch_staff_cache({column_name: new_value}, staff_id=staff_id)
+
+    def _overlay_pending_staff_edits(self, staffs, skip=None):
+        """
+        ข้อมูล Staffs ที่เพิ่งโหลดจากชีตยังไม่มีค่าที่รอเขียนในคิว: ใส่ทับให้ก่อนเก็บลง cache
+        ไม่งั้นการรีเฟรช (เช่นเบื้องหลัง) จะทำให้หน้าจอเห็นค่าเก่าจนกว่าจะเขียนเสร็จ ; คืน staffs
+        """
+        edits = [edit for edit in self._staff_write_queue.pending_edits() if edit is not skip]
+        if edits and staffs:
+            by_id = {str(record.get("ID", "")).strip(): record for record in staffs}
+            for edit in edits:
+                record = by_id.get(edit.staff_id)
+                if record is not None:
+                    record[edit.column_name] = edit.new_value
+        return staffs
+
+    def _confirm_staff_row(self, staff_id=None, email=None, skip=None):
+        """
+        อ่านแถวของ staff คนเดียวจากชีต (1 request) แล้วแก้ cache ให้ตรง (ค่าที่ยังรอเขียนอยู่ยังชนะ)
+        มีค่าเปลี่ยนจะแจ้งหน้าจอให้วาดใหม่ ; อ่านไม่ได้คืน False
+        """
+        try:
+            row = g_sheet_api.read_staff_row(self.sheet_url, staff_id=staff_id, user_email=email)
+        except Exception as e:
+            log.warning("Confirm read of staff %s failed: %s", staff_id or email, e)
+            return False
+        if row is None:
+            return False
+        if staff_id is None:
+            staff_id = str(row.get("ID", "")).strip()
+        for edit in self._staff_write_queue.pending_edits():
+            if edit is not skip and edit.staff_id == staff_id:
+                row[edit.column_name] = edit.new_value
+        if self._patch_staff_cache(row, staff_id=staff_id):
+            self._on_cache_updated('staffs', None)
+        return True
+
+    def _on_staff_write_result(self, edit, status, message=None):
+        log.debug("Staff edit %s (%s.%s) %s: %s", edit.edit_ids, edit.staff_id, edit.column_name, status, message or '')
+        confirm = any(edit_id in self._confirm_edit_ids for edit_id in edit.edit_ids)
+        self._confirm_edit_ids.difference_update(edit.edit_ids)
+        if status != "confirmed":
+            # ค่าใน cache ไม่ตรงกับชีตแล้ว: อ่านแถวนั้นกลับมาแก้ ถ้าอ่านไม่ได้ค่อยล้าง cache ของ Staffs ทั้ง tab
+            if not self._confirm_staff_row(staff_id=edit.staff_id, skip=edit):
+                self._invalidate_cache('staffs')
+        elif confirm:
+            self._confirm_staff_row(staff_id=edit.staff_id)
+        self.python_callback_to_js({
+            "type": "staff_update_result",
+            "status": status,
+            "payload": {
+                "edit_ids": edit.edit_ids,
+                "staff_id": edit.staff_id,
+                "column": edit.column_name,
+                "value": edit.new_value,
+                "message": message
+            }
+        })
+
     def fetch_all_tab_names(self):
-        print("[DEBUG][Python API] fetch_all_tab_names called.")
+        log.debug("fetch_all_tab_names called.")
         try:
             names = get_all_tab_names(self.sheet_url)
-            print(f"[DEBUG][Python API] Fetched tab names: {names}")
+            log.debug("Fetched tab names: %s", names)
             return {"status": "ok", "payload": names}
         except Exception as e:
-            print(f"[ERROR][Python API] fetch_all_tab_names: Error: {e}")
+            log.error("fetch_all_tab_names: Error: %s", e)
+            return {"status": "error", "message": str(e)}
+
+    def batch(self, calls):
+        """
+        API: เรียกหลาย method ในรอบเดียวของ bridge ; calls เป็น list ของ {"method": ..., "args": [...]} (หรือ [method, args])
+        - call ที่ไม่ขึ้นต่อกันรันพร้อมกันบน worker pool ; ข้อมูลจากชีตที่หลาย call ใช้ร่วมกันโหลดครั้งเดียว
+          (CacheManager ให้ call ที่ขอ key เดียวกันพร้อมกันรอผลจากการโหลดครั้งเดียว)
+        - arg เป็น {"ref": i, "path": [...]} ได้: ค่าจากผลของ call ที่ i (ต้องมาก่อน) เช่น
+          {"ref": 0, "path": ["payload", "latest_date"]} ; call นั้นรอ call i เสร็จก่อน
+        payload เป็นผลของแต่ละ call ตามลำดับ ; call ที่ผิดพลาด (รวมถึงไม่มี method นั้น) ได้ {"status": "error", ...} เฉพาะตัวมันเอง
+        """
+        if not isinstance(calls, list):
+            return {"status": "error", "message": "calls ต้องเป็น list"}
+
+        # call ที่ขึ้นต่อกันอ้างได้เฉพาะ call ก่อนหน้า และ pool หยิบงานตามลำดับที่ใส่
+        # worker ที่รอ call อื่นจึงรอเฉพาะงานที่กำลังรันหรือเสร็จแล้ว ไม่ค้างกันเอง
+        futures, methods = [], []
+        for i, call in enumerate(calls):
+            try:
+                method, args = self._plan_batch_call(i, call)
+            except ValueError as e:
+                log.error("batch: %s", e)
+                futures.append(Future())
+                futures[-1].set_result({"status": "error", "message": str(e)})
+                continue
+            methods.append(method)
+            futures.append(self._batch_pool.submit(self._run_batch_call, method, args, list(futures)))
+        with span(log, "batch of %d call(s): %s", len(futures), ", ".join(methods)):
+            return {"status": "ok", "payload": [future.result() for future in futures]}
+
+    def _shutdown(self):
+        # ปิดแอป: call ของ batch ที่ยังไม่เริ่มถูกทิ้ง ไม่รอ call ที่กำลังรันอยู่
+        self._batch_pool.shutdown(wait=False, cancel_futures=True)
+
+    def _plan_batch_call(self, index, call):
+        if isinstance(call, dict):
+            method, args = call.get("method"), call.get("args") or []
+        elif isinstance(call, (list, tuple)) and len(call) in (1, 2):
+            method, args = call[0], (call[1] if len(call) == 2 else None) or []
+        else:
+            raise ValueError(f"call #{index}: ต้องเป็น {{'method', 'args'}} หรือ [method, args]")
+        if method not in BATCH_METHODS:
+            raise ValueError(f"call #{index}: ไม่มี method '{method}'")
+        if not isinstance(args, list):
+            raise ValueError(f"call #{index}: args ต้องเป็น list")
+        for arg in args:
+            if _is_batch_ref(arg) and not (isinstance(arg["ref"], int) and 0 <= arg["ref"] < index):
+                raise ValueError(f"call #{index}: อ้างได้เฉพาะผลของ call ก่อนหน้า (ref {arg['ref']})")
+        return method, args
+
+    def _run_batch_call(self, method, args, earlier):
+        resolved = []
+        for arg in args:
+            if not _is_batch_ref(arg):
+                resolved.append(arg)
+                continue
+            value = earlier[arg["ref"]].result()
+            if not isinstance(value, dict) or value.get("status") != "ok":
+                return {"status": "error", "message": f"call #{arg['ref']} ที่ต้องใช้ผลไม่สำเร็จ"}
+            try:
+                for step in arg.get("path") or []:
+                    value = value[step]
+            except (KeyError, IndexError, TypeError):
+                return {"status": "error", "message": f"ไม่พบ {arg.get('path')} ในผลของ call #{arg['ref']}"}
+            resolved.append(value)
+        try:
+            return getattr(self, method)(*resolved)
+        except Exception as e:
+            log.exception("batch: %s failed: %s", method, e)
+            return {"status": "error", "message": str(e)}
+
+    def get_runtime_stats(self):
+        """
+        API: สถิติตั้งแต่เปิดแอปสำหรับหน้า diagnostics
+        cache แต่ละ key (hit / miss / stale / ขนาด), disk, mirror, prewarm,
+        เวลา fetch ของแต่ละ tab (histogram) และจำนวน Sheets request แยกตาม method ของ Api / งานเบื้องหลัง
+        """
+        try:
+            scheduler = sheets_scheduler.scheduler
+            return {"status": "ok", "payload": {
+                **runtime_stats.snapshot(),
+                "cache": self._cache.stats(),
+                "caches": self._cache.key_stats(),
+                "disk": self._cache.store.stats(),
+                "mirror": self._mirror.stats(),
+                "prewarm": self._prewarm.stats(),
+                "scheduler": {
+                    "retries": scheduler.retry_count,
+                    "errors": {str(status): count for status, count in scheduler.error_counts.items()},
+                    "tokens": {kind: round(bucket.tokens, 1) for kind, bucket in scheduler.buckets.items()},
+                },
+            }}
+        except Exception as e:
+            log.error("get_runtime_stats failed: %s", e)
             return {"status": "error", "message": str(e)}
 
     def python_callback_to_js(self, response_data):
         if self.window:
-            js = f"handle_python_callback({json.dumps(response_data, ensure_ascii=False)})"
+            js = f"handle_python_callback({json.dumps(response_data, ensure_ascii=False, default=sheet_records.json_default)})"
             self.window.evaluate_js(js)
 
     def get_profile_data(self):
-        print(f"[DEBUG][Python API] get_profile_data called for user: {self.current_user.get('E-Mail')}")
+        log.debug("get_profile_data called for user: %s", self.current_user.get('E-Mail'))
         if not self.current_user or 'E-Mail' not in self.current_user:
             return {"status": "error", "message": "Current user not found or not logged in."}
 
@@ -917,15 +1347,15 @@ class Api:
                 "role": user_data.get("Role", ""),
                 "avatar_url": user_data.get("AvatarUrl", "https://images.unsplash.com/photo-1507003211169-0a1dd7228f2d?q=80&w=200&auto=format&fit=crop") # Default avatar
             }
-            print(f"[DEBUG][Python API] Found profile data: {profile}")
+            log.debug("Found profile data: %s", profile)
             return {"status": "ok", "payload": profile}
 
         except Exception as e:
-            print(f"[ERROR][Python API] Failed to get profile data: {e}")
+            log.error("Failed to get profile data: %s", e)
             return {"status": "error", "message": str(e)}
 
-    def update_profile_name(self, new_name):
-        print(f"[DEBUG][Python API] update_profile_name called for user: {self.current_user.get('E-Mail')} with new_name: {new_name}")
+    def update_profile_name(self, new_name, confirm=False):
+        log.debug("update_profile_name called for user: %s with new_name: %s", self.current_user.get('E-Mail'), new_name)
         if not self.current_user or 'E-Mail' not in self.current_user:
             return {"status": "error", "message": "Current user not found or not logged in."}
         
@@ -939,17 +1369,18 @@ class Api:
             result = g_sheet_api.update_staff_by_email(self.sheet_url, user_email=user_email, column_name="Name", new_value=new_name.strip())
             
             if result.get("status") == "ok":
-                print(f"[DEBUG][Python API] Successfully updated name for {user_email}")
+                log.debug("Successfully updated name for %s", user_email)
+                self._after_profile_write(user_email, "Name", new_name.strip(), confirm)
             else:
-                print(f"[ERROR][Python API] Failed to update name for {user_email}: {result.get('message')}")
+                log.error("Failed to update name for %s: %s", user_email, result.get('message'))
 
             return result
         except Exception as e:
-            print(f"[ERROR][Python API] Exception during name update: {e}")
+            log.error("Exception during name update: %s", e)
             return {"status": "error", "message": str(e)}
 
-    def update_profile_avatar(self, new_avatar_url):
-        print(f"[DEBUG][Python API] update_profile_avatar called for user: {self.current_user.get('E-Mail')} with new_avatar_url: {new_avatar_url}")
+    def update_profile_avatar(self, new_avatar_url, confirm=False):
+        log.debug("update_profile_avatar called for user: %s with new_avatar_url: %s", self.current_user.get('E-Mail'), new_avatar_url)
         if not self.current_user or 'E-Mail' not in self.current_user:
             return {"status": "error", "message": "Current user not found or not logged in."}
         
@@ -962,20 +1393,28 @@ class Api:
             result = g_sheet_api.update_staff_by_email(self.sheet_url, user_email=user_email, column_name="AvatarUrl", new_value=new_avatar_url.strip())
             
             if result.get("status") == "ok":
-                print(f"[DEBUG][Python API] Successfully updated avatar for {user_email}")
+                log.debug("Successfully updated avatar for %s", user_email)
+                self._after_profile_write(user_email, "AvatarUrl", new_avatar_url.strip(), confirm)
             else:
-                print(f"[ERROR][Python API] Failed to update avatar for {user_email}: {result.get('message')}")
+                log.error("Failed to update avatar for %s: %s", user_email, result.get('message'))
 
             return result
         except Exception as e:
-            print(f"[ERROR][Python API] Exception during avatar update: {e}")
+            log.error("Exception during avatar update: %s", e)
             return {"status": "error", "message": str(e)}
 
+    def _after_profile_write(self, email, column_name, new_value, confirm):
+        """เขียนโปรไฟล์ลงชีตสำเร็จ: แก้ record นั้นใน cache Staffs แทนการโหลดใหม่ (confirm → อ่านแถวกลับมายืนยัน)"""
+        if confirm and self._confirm_staff_row(email=email):
+            return
+        if self._patch_staff_cache({column_name: new_value}, email=email):
+            self._on_cache_updated('staffs', None)
+
     def list_profile_pics(self):
-        print("[DEBUG][Python API] list_profile_pics called.")
+        log.debug("list_profile_pics called.")
         profile_pics_dir = get_path("img/profile_pics/")
         if not os.path.exists(profile_pics_dir):
-            print(f"[ERROR][Python API] Profile pictures directory not found: {profile_pics_dir}")
+            log.error("Profile pictures directory not found: %s", profile_pics_dir)
             return {"status": "error", "message": "Profile pictures directory not found."}
 
         image_files = []
@@ -983,7 +1422,7 @@ class Api:
             if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.bmp')):
                 image_files.append(f"img/profile_pics/{filename}")
         
-        print(f"[DEBUG][Python API] Found {len(image_files)} profile pictures.")
+        log.debug("Found %s profile pictures.", len(image_files))
         return {"status": "ok", "payload": image_files}
     
 
@@ -1002,9 +1441,8 @@ def resource_url(filename: str) -> str:
 if __name__ == '__main__':
     SHEET_URL = 'https://docs.google.com/spreadsheets/d/17lOtuHum9VHdukfHr7143uCGydVZSaJNi2RhzGfh81g/edit#gid=1356715801'
     api = Api(SHEET_URL)
-    # 1) พยายาม auto-login จาก Keychain
-    result = api.auto_login()
-    initial_user = result['payload'] if result.get('status')=='ok' else None
+    # 1) โหลด cache จาก disk เข้า RAM ใน background ระหว่างสร้างหน้าต่าง
+    api._hydrate_caches()
 
     # 2) เลือกโฟลเดอร์โปรเจกต์ แล้วสั่งให้ pywebview serve ไฟล์
     base = Path(__file__).parent.resolve()
@@ -1017,8 +1455,15 @@ if __name__ == '__main__':
         js_api=api,
         width=1730, height=950, min_size=(1350, 400)
     )
+
+    # พยายาม auto-login จาก Keychain (session ที่บันทึกไว้ ไม่ต้องรอชีต)
+    result = api.auto_login()
+    initial_user = result['payload'] if result.get('status')=='ok' else None
     window.expose(lambda: initial_user)
     api.window = window
 
     # 4) start พร้อม HTTP server ในตัว (serve static/js, css, รูป ฯลฯ)
-    webview.start(debug=True, http_server=True)
\ No newline at end of file
+    webview.start(debug=True, http_server=True)
+
+    # 5) หน้าต่างปิดแล้ว: ปิด worker pool ของ batch
+    api._shutdown()
\ No newline at end of file
@@ -0,0 +1,127 @@
+import re
+import time
+import sys
+import inspect
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+
+# ขอบบนของช่อง histogram เวลา fetch (ms) ; ช่องสุดท้ายคือเกินค่าสุดท้าย
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+STARTED_AT = time.time()
+
+_lock = threading.Lock()
+_latency = {}                       # { ชื่อ: Histogram }
+_requests = defaultdict(Counter)    # { ต้นทาง (method ของ Api / thread): { read / write / retry / 429 ...: จำนวน } }
+_local = threading.local()
+_THREAD_SUFFIX = re.compile(r"-\d+$")
+_api_codes = {}                     # { code object ของ method สาธารณะของ Api: ชื่อ method }
+
+
+class Histogram:
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        i = 0
+        while i < len(LATENCY_BUCKETS_MS) and ms > LATENCY_BUCKETS_MS[i]:
+            i += 1
+        self.buckets[i] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def to_dict(self):
+        labels = [f"≤{b}" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}"]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count, 1) if self.count else 0,
+            "max_ms": round(self.max, 1),
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+
+def record_latency(name, seconds):
+    with _lock:
+        histogram = _latency.get(name)
+        if histogram is None:
+            histogram = _latency[name] = Histogram()
+        histogram.add(seconds * 1000)
+
+
+@contextmanager
+def timed(name):
+    """จับเวลา with-block แล้วเก็บลง histogram ชื่อ name (เก็บเฉพาะครั้งที่สำเร็จ)"""
+    start = time.perf_counter()
+    yield
+    record_latency(name, time.perf_counter() - start)
+
+
+@contextmanager
+def origin(name):
+    """ระบุว่า Sheets request ที่เกิดใน thread นี้ภายใน with-block มาจากไหน (เช่น 'prewarm') ; ซ้อนกันใช้ชื่อนอกสุด"""
+    previous = getattr(_local, "origin", None)
+    if previous is not None:
+        yield
+        return
+    _local.origin = name
+    try:
+        yield
+    finally:
+        _local.origin = previous
+
+
+def current_origin():
+    """
+    ต้นทางของ request ปัจจุบัน: origin() ที่ตั้งไว้ → method ของ Api นอกสุดใน call stack (ที่ JS เรียก)
+    → ชื่อ thread แบบตัดเลขลำดับ เช่น 'prewarm-2' → '[prewarm]'
+    """
+    name = getattr(_local, "origin", None)
+    if name is not None:
+        return name
+    frame = sys._getframe(1)
+    while frame is not None:
+        name = _api_codes.get(frame.f_code, name)
+        frame = frame.f_back
+    if name is not None:
+        return name
+    return "[" + _THREAD_SUFFIX.sub("", threading.current_thread().name) + "]"
+
+
+def count_request(event):
+    name = current_origin()
+    with _lock:
+        _requests[name][event] += 1
+
+
+def track_api(cls):
+    """
+    class decorator: ลงทะเบียน method สาธารณะของ cls เป็นต้นทางของ Sheets request ตามชื่อ method
+    ไม่ห่อ method (pywebview อ่านชื่อ parameter จาก method ตรงๆ) แต่หาจาก call stack ตอนนับแทน
+    """
+    for name, func in vars(cls).items():
+        if not name.startswith("_") and inspect.isfunction(func):
+            _api_codes[func.__code__] = name
+    return cls
+
+
+def snapshot():
+    with _lock:
+        return {
+            "uptime_sec": round(time.time() - STARTED_AT, 1),
+            "latency": {name: histogram.to_dict() for name, histogram in sorted(_latency.items())},
+            "requests": {name: dict(counts) for name, counts in sorted(_requests.items())},
+        }
+
+
+def reset():
+    with _lock:
+        _latency.clear()
+        _requests.clear()
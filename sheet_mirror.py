@@ -0,0 +1,487 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import threading
+from functools import lru_cache
+
+import sheet_records
+import app_log
+from app_log import span
+
+log = app_log.get_logger("mirror")
+
+
+# ค่าในคอลัมน์ index ซ้ำกันมาก (email / วันที่ / ชื่อเพจ) จึงจำผล normalize ไว้
+@lru_cache(maxsize=8192)
+def _text_key(value):
+    return str(value).strip().lower() or None
+
+
+@lru_cache(maxsize=8192)
+def _date_key(value):
+    """'18/7/2025' / '18/07/25' → '2025-07-18' (เรียงและเทียบได้ตรงๆ) ; ไม่ใช่วันที่คืน None"""
+    parsed = sheet_records.parse_dmy(value) if value else None
+    return "%04d-%02d-%02d" % parsed if parsed else None
+
+
+@lru_cache(maxsize=8192)
+def _link_key(value):
+    return str(value).strip() or None
+
+
+# คอลัมน์ที่ทำ index ได้ และวิธี normalize ค่าก่อนเก็บ / ก่อนค้น
+KEY_COLUMNS = {
+    "email": _text_key,
+    "name": _text_key,
+    "date": _date_key,
+    "project": _text_key,
+    "page": _text_key,
+    "link": _link_key,
+}
+
+KEY_ORDER = ("email", "name", "date", "project", "page", "link")  # ลำดับคอลัมน์ในตาราง rows
+
+# แหล่งข้อมูล (ชื่อ cache ใน Api หรือ prefix ที่ลงท้าย _) → {คอลัมน์ index: ชื่อคอลัมน์ในแถว}
+SOURCE_COLUMNS = {
+    "staffs": {"email": "E-Mail", "name": "Name", "project": "Project Name"},
+    "transaction": {"email": "EmployeeEmail", "date": "SubmissionDate", "page": "NamePage", "link": "LinkPage"},
+    "summary_": {"name": "name", "project": "projectName"},
+    "sheet_": {"date": "Date", "page": "PageName", "link": "PageUrl"},
+}
+
+
+def _transaction_facts(date, email, project_page, link, clips, link1, link2):
+    """(วัน, ((ชนิด aggregate, key), ...), จำนวนคลิป) ของแถว Transaction ; ไม่มีวันที่คืน None"""
+    day = _date_key(date)
+    if day is None:
+        return None
+    # ProjectPage เป็น "{โปรเจกต์} - Page {n}" (daily_sync)
+    project, separator, rest = str(project_page).rpartition(" - Page ")
+    # คลิป: Clips_Sent ถ้ามี ไม่มีนับจาก Link1 / Link2 (เหมือนหน้า Stats)
+    if not isinstance(clips, int):
+        clips = str(clips).strip()
+        clips = int(clips) if clips.isdigit() else bool(str(link1).strip()) + bool(str(link2).strip())
+    keys = (
+        ("all", ""),
+        ("email", _text_key(email)),
+        ("project", _text_key(project if separator else rest)),
+        ("page", _link_key(link)),
+    )
+    return day, keys, clips
+
+
+# แหล่งข้อมูลที่ mirror เก็บยอดรวมรายวันไว้ให้ (ตาราง daily) → (คอลัมน์ที่ใช้, ฟังก์ชันสรุปแถวจากค่าของคอลัมน์เหล่านั้น)
+# ชนิด 'all' (key '') คือยอดรวมทั้ง source ; ยอดถูกปรับตามแถวที่เปลี่ยนใน sync() เท่านั้น
+SOURCE_AGGREGATES = {
+    "transaction": (
+        ("SubmissionDate", "EmployeeEmail", "ProjectPage", "LinkPage", "Clips_Sent", "Link1", "Link2"),
+        _transaction_facts,
+    ),
+}
+
+# เพิ่มเมื่อ schema ของไฟล์เปลี่ยน ; ไฟล์เก่าจะถูกล้าง source ที่ต้อง sync ใหม่ทั้งก้อน
+MIRROR_VERSION = 1
+
+
+def source_columns(source):
+    columns = SOURCE_COLUMNS.get(source)
+    if columns is None:
+        columns = next((c for prefix, c in SOURCE_COLUMNS.items()
+                        if prefix.endswith("_") and source.startswith(prefix)), {})
+    return columns
+
+
+class SheetMirror:
+    """
+    สำเนาข้อมูลจากชีต (Staffs, Transaction, สรุปรายเดือน, tab โปรเจกต์) ในไฟล์ SQLite พร้อม index
+    ของ email / ชื่อ / วันที่ / โปรเจกต์ / ชื่อเพจ / ลิงก์เพจ ; Api ใช้ค้นแทนการวน list ทั้งก้อน
+    sync() เขียนเฉพาะแถวที่เปลี่ยน (เทียบ digest ต่อแถว) จึงเรียกได้ทุกครั้งที่โหลดข้อมูลชุดใหม่มา
+    stamp ที่ส่งมากับ sync คือเวอร์ชันของข้อมูลฝั่ง cache ; ผู้เรียกเทียบด้วย stamp() ว่า mirror ตามทันหรือยัง
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._schemas = {}
+        self._pending = {}  # source → items ที่รอ sync ใน thread เบื้องหลัง
+        self._pending_cond = threading.Condition()
+        self._worker = None
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # index หลายตัวของ Transaction หลักแสนแถว: page cache ใหญ่ขึ้นให้ sync ครั้งแรกไม่ต้องอ่าน/เขียน page ซ้ำ
+        self._conn.execute("PRAGMA cache_size=-65536")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sources (
+                source    TEXT PRIMARY KEY,
+                header    TEXT,
+                rows      INTEGER,
+                synced_at REAL,
+                stamp     REAL
+            );
+            CREATE TABLE IF NOT EXISTS rows (
+                source  TEXT NOT NULL,
+                row     INTEGER NOT NULL,
+                email   TEXT,
+                name    TEXT,
+                date    TEXT,
+                project TEXT,
+                page    TEXT,
+                link    TEXT,
+                digest  INTEGER,
+                data    TEXT,
+                PRIMARY KEY (source, row)
+            );
+            CREATE INDEX IF NOT EXISTS rows_email   ON rows (source, email, date) WHERE email IS NOT NULL;
+            CREATE INDEX IF NOT EXISTS rows_date    ON rows (source, date, page) WHERE date IS NOT NULL;
+            CREATE INDEX IF NOT EXISTS rows_name    ON rows (source, name) WHERE name IS NOT NULL;
+            CREATE INDEX IF NOT EXISTS rows_project ON rows (source, project) WHERE project IS NOT NULL;
+            CREATE INDEX IF NOT EXISTS rows_link    ON rows (source, link) WHERE link IS NOT NULL;
+            CREATE TABLE IF NOT EXISTS daily (
+                source  TEXT NOT NULL,
+                kind    TEXT NOT NULL,
+                key     TEXT NOT NULL,
+                day     TEXT NOT NULL,
+                rows    INTEGER NOT NULL,
+                clips   INTEGER NOT NULL,
+                PRIMARY KEY (source, kind, key, day)
+            ) WITHOUT ROWID;
+        """)
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < MIRROR_VERSION:
+            # mirror จากเวอร์ชันก่อนไม่มียอดรวมรายวัน: ทิ้ง source ที่มี aggregate ให้ sync ครั้งถัดไปสร้างใหม่
+            for source in SOURCE_AGGREGATES:
+                self._conn.execute("DELETE FROM rows WHERE source = ?", (source,))
+                self._conn.execute("DELETE FROM sources WHERE source = ?", (source,))
+            self._conn.execute(f"PRAGMA user_version = {MIRROR_VERSION}")
+
+    # ── sync ──
+    def has(self, source):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM sources WHERE source = ?", (source,)).fetchone() is not None
+
+    def stamp(self, source):
+        """stamp ที่ส่งมากับ sync ครั้งล่าสุดของ source ; ยังไม่เคย sync หรือไม่ได้ส่งมาคืน None"""
+        with self._lock:
+            row = self._conn.execute("SELECT stamp FROM sources WHERE source = ?", (source,)).fetchone()
+            return row[0] if row else None
+
+    def sync(self, source, items, stamp=None):
+        """
+        ทำให้ source ใน mirror ตรงกับ items (list ของ SheetRecord / dict ตามลำดับในชีต)
+        คืนจำนวนแถวที่ถูกเขียนใหม่
+        """
+        header = self._shared_header(items)
+        header_text = json.dumps(header, ensure_ascii=False) if header is not None else None
+        # (ตำแหน่งใน tuple ของคอลัมน์ index, ฟังก์ชัน normalize, ชื่อคอลัมน์ หรือ ตำแหน่งใน row_values)
+        plan = [
+            (KEY_ORDER.index(name), KEY_COLUMNS[name],
+             column if header is None else (header.index(column) if column in header else None))
+            for name, column in source_columns(source).items()
+        ]
+        encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+        facts_of = self._facts_reader(source, header)
+        delta = {}  # (ชนิด, key, วัน) → [แถว, คลิป] ที่ต้องบวกเข้าตาราง daily
+        with self._sync_lock, span(log, "sync mirror '%s' (%d rows)", source, len(items)):
+            with self._lock:
+                row = self._conn.execute("SELECT header FROM sources WHERE source = ?", (source,)).fetchone()
+                same_header = row is not None and row[0] == header_text
+                with sheet_records.gc_paused():
+                    digests = dict(self._conn.execute(
+                        "SELECT row, digest FROM rows WHERE source = ?", (source,))) if same_header else {}
+
+            changed = []
+            with sheet_records.gc_paused():
+                for i, item in enumerate(items):
+                    values = item.row_values() if header is not None else sheet_records.to_plain(item)
+                    # digest จาก repr (เร็วกว่า encode JSON) ; encode เฉพาะแถวที่เปลี่ยน
+                    digest = zlib.crc32(repr(values).encode('utf-8'))
+                    if digests.get(i) == digest:
+                        continue
+                    keys = [None] * len(KEY_ORDER)
+                    for slot, normalize, column in plan:
+                        if header is None:
+                            value = values.get(column, "") if isinstance(values, dict) else ""
+                        else:
+                            value = values[column] if column is not None else ""
+                        keys[slot] = normalize(value) if value != "" else None
+                    changed.append((source, i, *keys, digest, encode(values)))
+                    if facts_of is not None:
+                        self._add_facts(delta, facts_of(values), 1)
+
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    if facts_of is not None:
+                        self._retract_old_rows(source, changed, len(items), same_header, facts_of, delta)
+                    if not same_header:
+                        self._conn.execute("DELETE FROM rows WHERE source = ?", (source,))
+                    self._conn.execute("DELETE FROM rows WHERE source = ? AND row >= ?", (source, len(items)))
+                    if delta:
+                        self._apply_delta(source, delta)
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO rows (source, row, email, name, date, project, page, link, digest, data) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", changed
+                    )
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO sources (source, header, rows, synced_at, stamp) VALUES (?, ?, ?, ?, ?)",
+                        (source, header_text, len(items), time.time(), stamp)
+                    )
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+                self._schemas.pop(source, None)
+        log.debug("Mirror: '%s' synced, %d of %d rows written", source, len(changed), len(items))
+        return len(changed)
+
+    @staticmethod
+    def _facts_reader(source, header):
+        """ฟังก์ชัน values ของแถว → (วัน, ((ชนิด, key), ...), คลิป) ของ source ที่มี aggregate ; ไม่มีคืน None"""
+        spec = SOURCE_AGGREGATES.get(source)
+        if spec is None:
+            return None
+        columns, summarize = spec
+        if header is None:
+            return lambda values: summarize(*[values.get(column, "") for column in columns]) \
+                if isinstance(values, dict) else None
+        positions = [header.index(column) if column in header else None for column in columns]
+        if None not in positions:
+            return lambda values: summarize(*[values[i] for i in positions])
+        return lambda values: summarize(*["" if i is None else values[i] for i in positions])
+
+    @staticmethod
+    def _add_facts(delta, facts, sign):
+        if facts is None:
+            return
+        day, keys, clips = facts
+        for kind, key in keys:
+            if key is not None:
+                totals = delta.get((kind, key, day))
+                if totals is None:
+                    delta[(kind, key, day)] = [sign, sign * clips]
+                else:
+                    totals[0] += sign
+                    totals[1] += sign * clips
+
+    def _retract_old_rows(self, source, changed, count, same_header, facts_of, delta):
+        """
+        หักยอดของแถวเดิมที่กำลังถูกเขียนทับ / ตัดท้ายออกจาก delta (เรียกใน transaction ของ sync)
+        อ่านเฉพาะแถวที่เปลี่ยน ; header เปลี่ยนคือสร้างยอดของ source ใหม่ทั้งหมด
+        """
+        if not same_header:
+            self._conn.execute("DELETE FROM daily WHERE source = ?", (source,))
+            return
+        old = [row for item in changed
+               for row in self._conn.execute("SELECT data FROM rows WHERE source = ? AND row = ?", (source, item[1]))]
+        old += self._conn.execute("SELECT data FROM rows WHERE source = ? AND row >= ?", (source, count)).fetchall()
+        for (data,) in old:
+            self._add_facts(delta, facts_of(json.loads(data)), -1)
+
+    def _apply_delta(self, source, delta):
+        self._conn.executemany(
+            "INSERT INTO daily (source, kind, key, day, rows, clips) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (source, kind, key, day) DO UPDATE SET rows = rows + excluded.rows, clips = clips + excluded.clips",
+            [(source, kind, key, day, rows, clips) for (kind, key, day), (rows, clips) in delta.items() if rows or clips]
+        )
+        self._conn.executemany(
+            "DELETE FROM daily WHERE source = ? AND kind = ? AND key = ? AND day = ? AND rows <= 0",
+            [(source, kind, key, day) for (kind, key, day), (rows, _) in delta.items() if rows < 0]
+        )
+
+    def sync_later(self, source, items, stamp=None):
+        """
+        sync ใน thread เบื้องหลัง (การโหลดจากชีตไม่ต้องรอเขียน mirror)
+        ถ้า source เดิมยังรออยู่ ใช้ข้อมูลชุดล่าสุดแทน ; ผู้ค้นเรียก wait(source) ก่อนเพื่อให้เห็นข้อมูลชุดนี้
+        """
+        with self._pending_cond:
+            self._pending[source] = (items, stamp)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._drain, name="mirror-sync", daemon=True)
+                self._worker.start()
+
+    def _drain(self):
+        while True:
+            with self._pending_cond:
+                if not self._pending:
+                    self._worker = None
+                    return
+                source, job = next(iter(self._pending.items()))
+            try:
+                self.sync(source, *job)
+            except Exception as e:
+                # mirror ที่ไม่ครบถูกลบทิ้ง ผู้ใช้ครั้งถัดไปจะ sync ใหม่ทั้งก้อน
+                log.warning("Mirror: sync of '%s' failed: %s", source, e)
+                self.drop(source)
+            with self._pending_cond:
+                if self._pending.get(source) is job:
+                    del self._pending[source]
+                self._pending_cond.notify_all()
+
+    def wait(self, source):
+        """รอให้ sync_later ของ source ที่ค้างอยู่เสร็จ"""
+        with self._pending_cond:
+            while source in self._pending:
+                self._pending_cond.wait()
+
+    @staticmethod
+    def _shared_header(items):
+        """ชื่อคอลัมน์ ถ้าทุกแถวเป็น SheetRecord schema เดียวกันและไม่มีค่าเพิ่ม (เก็บแค่ค่าในแถว) ; ไม่ใช่คืน None"""
+        if not items or not isinstance(items[0], sheet_records.SheetRecord):
+            return None
+        schema = items[0].schema
+        if all(isinstance(r, sheet_records.SheetRecord) and r.schema is schema and not r.has_extra for r in items):
+            return list(schema.names)
+        return None
+
+    def drop(self, source):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("DELETE FROM rows WHERE source = ?", (source,))
+            self._conn.execute("DELETE FROM daily WHERE source = ?", (source,))
+            self._conn.execute("DELETE FROM sources WHERE source = ?", (source,))
+            self._conn.execute("COMMIT")
+            self._schemas.pop(source, None)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("DELETE FROM rows")
+            self._conn.execute("DELETE FROM daily")
+            self._conn.execute("DELETE FROM sources")
+            self._conn.execute("COMMIT")
+            self._schemas.clear()
+
+    # ── query ──
+    def _decoder(self, source):
+        """ฟังก์ชันแปลง data ในตาราง rows กลับเป็น SheetRecord / dict (เรียกขณะถือ _lock)"""
+        decoder = self._schemas.get(source)
+        if decoder is None:
+            row = self._conn.execute("SELECT header FROM sources WHERE source = ?", (source,)).fetchone()
+            if row is not None and row[0]:
+                schema = sheet_records.RecordSchema(json.loads(row[0]))
+                decoder = lambda data: sheet_records.SheetRecord(schema, json.loads(data))
+            else:
+                decoder = json.loads
+            self._schemas[source] = decoder
+        return decoder
+
+    @staticmethod
+    def _where(source, where):
+        clauses, params = ["source = ?"], [source]
+        for name, value in where.items():
+            if name not in KEY_COLUMNS:
+                raise ValueError(f"'{name}' is not an indexed mirror column")
+            clauses.append(f"{name} = ?")
+            params.append(KEY_COLUMNS[name](value))
+        return " AND ".join(clauses), params
+
+    def find(self, source, limit=None, **where):
+        """
+        แถวของ source ที่ตรงทุกเงื่อนไข เรียงตามลำดับในชีต
+        เงื่อนไขเป็นคอลัมน์ index เท่านั้น (email=..., date='18/7/2025', ...) ค่าถูก normalize แบบเดียวกับตอนเก็บ
+        """
+        clause, params = self._where(source, where)
+        # +row: ไม่ให้ SQLite เลือก primary key เพื่อเลี่ยงการ sort แล้วไล่ทั้ง source แทน index ของเงื่อนไข
+        sql = f"SELECT data FROM rows WHERE {clause} ORDER BY {'+row' if where else 'row'}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            decode = self._decoder(source)
+            return [decode(data) for (data,) in self._conn.execute(sql, params)]
+
+    def find_range(self, source, column, start=None, stop=None, **where):
+        """
+        เหมือน find() แต่คอลัมน์ index column อยู่ในช่วง [start, stop] (ไม่ระบุคือไม่จำกัดด้านนั้น)
+        start / stop เป็นค่าที่ normalize แล้ว เช่นวันที่แบบ 'YYYY-MM-DD'
+        """
+        if column not in KEY_COLUMNS:
+            raise ValueError(f"'{column}' is not an indexed mirror column")
+        clause, params = self._where(source, where)
+        if start is not None:
+            clause += f" AND {column} >= ?"
+            params.append(start)
+        if stop is not None:
+            clause += f" AND {column} <= ?"
+            params.append(stop)
+        with self._lock:
+            decode = self._decoder(source)
+            return [decode(data) for (data,) in self._conn.execute(
+                f"SELECT data FROM rows WHERE {clause} ORDER BY +row", params)]
+
+    def first(self, source, **where):
+        found = self.find(source, limit=1, **where)
+        return found[0] if found else None
+
+    def latest(self, source, column):
+        """ค่ามากสุดของคอลัมน์ index (เช่น date → วันที่ล่าสุดแบบ 'YYYY-MM-DD') ; ไม่มีคืน None"""
+        if column not in KEY_COLUMNS:
+            raise ValueError(f"'{column}' is not an indexed mirror column")
+        with self._lock:
+            row = self._conn.execute(f"SELECT MAX({column}) FROM rows WHERE source = ? AND {column} IS NOT NULL", (source,)).fetchone()
+        return row[0] if row else None
+
+    # ── aggregate รายวัน (SOURCE_AGGREGATES) ──
+    @staticmethod
+    def _aggregate_where(source, kind, start, stop):
+        clauses, params = ["source = ?", "kind = ?"], [source, kind]
+        if start is not None:
+            clauses.append("day >= ?")
+            params.append(start)
+        if stop is not None:
+            clauses.append("day <= ?")
+            params.append(stop)
+        return " AND ".join(clauses), params
+
+    def daily_totals(self, source, kind, key="", start=None, stop=None):
+        """
+        ยอดรายวันของ key หนึ่ง: {'YYYY-MM-DD': {'rows': n, 'clips': n}} เรียงตามวัน
+        kind เป็น 'all' / 'email' / 'project' / 'page' ; key ถูก normalize แบบเดียวกับคอลัมน์ index
+        start / stop เป็นวันแบบ 'YYYY-MM-DD' (รวมปลายทั้งสองข้าง)
+        """
+        clause, params = self._aggregate_where(source, kind, start, stop)
+        if kind != "all":
+            key = KEY_COLUMNS["link" if kind == "page" else kind](key) if key else None
+        with self._lock:
+            return {day: {"rows": rows, "clips": clips} for day, rows, clips in self._conn.execute(
+                f"SELECT day, rows, clips FROM daily WHERE {clause} AND key = ? ORDER BY day", params + [key])}
+
+    def totals(self, source, kind, start=None, stop=None):
+        """ยอดรวมในช่วงวันของทุก key ของชนิด kind: {key: {'rows': n, 'clips': n, 'days': n}}"""
+        clause, params = self._aggregate_where(source, kind, start, stop)
+        with self._lock:
+            return {key: {"rows": rows, "clips": clips, "days": days} for key, rows, clips, days in self._conn.execute(
+                f"SELECT key, SUM(rows), SUM(clips), COUNT(*) FROM daily WHERE {clause} GROUP BY key", params)}
+
+    def latest_day(self, source):
+        """วันล่าสุดที่มีข้อมูลของ source ที่มี aggregate ('YYYY-MM-DD') ; ไม่มีคืน None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(day) FROM daily WHERE source = ? AND kind = 'all' AND key = ''", (source,)).fetchone()
+        return row[0] if row else None
+
+    def join(self, source, other, column):
+        """
+        ทุกแถวของ source คู่กับแถวของ other ที่คอลัมน์ index ตรงกัน (แถวท้ายสุดถ้ามีหลายแถว ; ไม่มีได้ None)
+        เช่น join('staffs', 'summary_2025_7', 'name')
+        """
+        if column not in KEY_COLUMNS:
+            raise ValueError(f"'{column}' is not an indexed mirror column")
+        sql = (
+            f"SELECT l.data, r.data FROM rows l "
+            f"LEFT JOIN rows r ON r.source = ? AND r.row = "
+            f"(SELECT row FROM rows WHERE source = ? AND {column} = l.{column} ORDER BY +row DESC LIMIT 1) "
+            f"WHERE l.source = ? ORDER BY l.row"
+        )
+        with self._lock:
+            decode_left, decode_right = self._decoder(source), self._decoder(other)
+            return [(decode_left(left), decode_right(right) if right is not None else None)
+                    for left, right in self._conn.execute(sql, (other, other, source))]
+
+    def stats(self):
+        with self._lock:
+            return {source: rows for source, rows in self._conn.execute("SELECT source, rows FROM sources")}
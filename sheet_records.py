@@ -0,0 +1,232 @@
+import gc
+import sys
+from collections.abc import Mapping
+from contextlib import contextmanager
+
+
+# คอลัมน์ตัวเลขที่เก็บเป็น int แทนข้อความ (ชื่อหลัง rename แล้ว)
+NUMERIC_COLUMNS = ("Clips_Sent", "TotalSent", "View1", "View2")
+
+
+def parse_number(value):
+    """'1,234' → 1234 ; ค่าที่ไม่ใช่จำนวนเต็ม (รวมถึงช่องว่าง) คืนค่าเดิม"""
+    if value.__class__ is not str:
+        return value
+    text = value.strip().replace(",", "")
+    digits = text[1:] if text[:1] == "-" else text
+    if digits.isdigit() and digits.isascii():
+        return int(text)
+    return value
+
+
+def parse_dmy(date_str):
+    """แปลง 'd/m/yyyy' หรือ 'd/m/yy' เป็น (year, month, day) แบบเร็ว ; แปลงไม่ได้คืน None"""
+    parts = str(date_str).strip().split('/')
+    if len(parts) != 3:
+        return None
+    try:
+        day, month, year = int(parts[0]), int(parts[1]), int(parts[2])
+    except ValueError:
+        return None
+    if year < 100:
+        year += 2000
+    if not (1 <= month <= 12 and 1 <= day <= 31):
+        return None
+    return year, month, day
+
+
+@contextmanager
+def gc_paused():
+    """
+    ปิด GC ชั่วคราวตอนสร้าง object จำนวนมากที่จะอยู่ยาว (แถวของ cache / mirror)
+    ไม่งั้น GC รุ่น 0/1 จะวิ่งสแกนซ้ำทุกไม่กี่ร้อย object ทำให้โหลดช้าลงเกือบเท่าตัว
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class RecordSchema:
+    """
+    หัวคอลัมน์ของ tab หนึ่ง ใช้ร่วมกันทุกแถว: ชื่อคอลัมน์ (intern แล้ว) → ตำแหน่งใน row
+    unique=True  → หัวซ้ำได้ชื่อ _2, _3 ... (แบบ get_staffs_data)
+    unique=False → หัวซ้ำใช้คอลัมน์ขวาสุด (แบบ dict(zip(header, row)) เดิม)
+    """
+
+    __slots__ = ("names", "positions", "numeric", "in_order")
+
+    def __init__(self, raw_header, rename=None, numeric=(), unique=True):
+        names = []
+        counts = {}
+        for h in raw_header:
+            h = str(h).strip()
+            if rename:
+                h = rename.get(h, h)
+            if unique and h in counts:
+                counts[h] += 1
+                h = f"{h}_{counts[h]}"
+            else:
+                counts[h] = 1
+            names.append(sys.intern(h))
+        positions = {name: i for i, name in enumerate(names)}
+        self.names = tuple(name for i, name in enumerate(names) if positions[name] == i)
+        self.positions = positions
+        self.numeric = tuple(positions[name] for name in numeric if name in positions)
+        # ชื่อคอลัมน์เรียงตรงกับตำแหน่งใน row (ไม่มีหัวซ้ำที่ถูกตัดทิ้ง) → row_values ตัด/เติมท้าย row ได้เลย
+        self.in_order = all(positions[name] == i for i, name in enumerate(self.names))
+
+
+class SheetRecord(Mapping):
+    """
+    แถวหนึ่งของชีตแบบประหยัดหน่วยความจำ: เก็บแค่ schema ที่ใช้ร่วมกัน + list ของค่าในแถว
+    ใช้แทน dict ได้ (get / [] / in / keys / items / dict(record)) และแก้ค่าได้ด้วย record[key] = value
+    ก่อนส่งออกไป JS หรือเขียน JSON ให้แปลงด้วย to_plain()
+    """
+
+    __slots__ = ("_schema", "_values", "_extra")
+
+    def __init__(self, schema, values):
+        self._schema = schema
+        self._values = values
+        self._extra = None
+
+    def __getitem__(self, key):
+        i = self._schema.positions.get(key)
+        if i is None:
+            if self._extra is not None and key in self._extra:
+                return self._extra[key]
+            raise KeyError(key)
+        values = self._values
+        return values[i] if i < len(values) else ""
+
+    def get(self, key, default=None):
+        i = self._schema.positions.get(key)
+        if i is None:
+            if self._extra is not None:
+                return self._extra.get(key, default)
+            return default
+        values = self._values
+        return values[i] if i < len(values) else ""
+
+    def __contains__(self, key):
+        return key in self._schema.positions or (self._extra is not None and key in self._extra)
+
+    def __setitem__(self, key, value):
+        i = self._schema.positions.get(key)
+        if i is None:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+            return
+        values = self._values
+        if i >= len(values):
+            values.extend([""] * (i + 1 - len(values)))
+        values[i] = value
+
+    def __iter__(self):
+        yield from self._schema.names
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return len(self._schema.names) + (len(self._extra) if self._extra else 0)
+
+    @property
+    def schema(self):
+        return self._schema
+
+    @property
+    def has_extra(self):
+        """มีค่าที่ตั้งเพิ่มนอกเหนือคอลัมน์ของ schema หรือไม่"""
+        return bool(self._extra)
+
+    def row_values(self):
+        """ค่าของแถวเรียงตาม schema.names (เติม "" ให้เซลล์ท้ายที่ขาด) ใช้เขียน cache แบบ header + แถว"""
+        values = self._values
+        n = len(values)
+        schema = self._schema
+        if schema.in_order:
+            width = len(schema.names)
+            return values[:width] if n >= width else values + [""] * (width - n)
+        positions = schema.positions
+        return [values[positions[name]] if positions[name] < n else "" for name in schema.names]
+
+    def __eq__(self, other):
+        # เทียบ list ค่าในแถวตรงๆ แทน Mapping.__eq__ (ที่สร้าง dict ทั้งสองฝั่งทุกครั้ง)
+        if not isinstance(other, SheetRecord):
+            return Mapping.__eq__(self, other)
+        schema, other_schema = self._schema, other._schema
+        if schema is not other_schema and schema.names != other_schema.names:
+            return Mapping.__eq__(self, other)
+        if (self._extra or None) != (other._extra or None):
+            return False
+        a, b = self._values, other._values
+        if not (len(a) == len(b) == len(schema.names) and schema.in_order and other_schema.in_order):
+            a, b = self.row_values(), other.row_values()
+        return a == b
+
+    __hash__ = None
+
+    def __sizeof__(self):
+        # ไม่นับ schema เพราะใช้ร่วมกันทุกแถว
+        size = object.__sizeof__(self) + sys.getsizeof(self._values)
+        size += sum(sys.getsizeof(value) for value in self._values)
+        if self._extra is not None:
+            size += sys.getsizeof(self._extra)
+        return size
+
+    def to_dict(self):
+        values = self._values
+        n = len(values)
+        positions = self._schema.positions
+        d = {name: (values[positions[name]] if positions[name] < n else "") for name in self._schema.names}
+        if self._extra:
+            d.update(self._extra)
+        return d
+
+    def __repr__(self):
+        return f"SheetRecord({self.to_dict()!r})"
+
+
+def decode_rows(all_values, header_row=1, rename=None, numeric=(), strip=False, unique=True):
+    """
+    แปลง grid จาก get_all_values() / values.batchGet เป็น list ของ SheetRecord
+    ใช้ list ของแถวจาก grid ตรงๆ (คอลัมน์ตัวเลขถูกแปลงในที่) ไม่เติม "" ให้แถวที่สั้นกว่า header
+    """
+    if not all_values or len(all_values) < header_row:
+        return []
+    schema = RecordSchema(all_values[header_row - 1], rename, numeric, unique)
+    numeric_positions = schema.numeric
+    records = []
+    for row in all_values[header_row:]:
+        if strip:
+            row = [cell.strip() if cell.__class__ is str else cell for cell in row]
+        for i in numeric_positions:
+            if i < len(row):
+                row[i] = parse_number(row[i])
+        records.append(SheetRecord(schema, row))
+    return records
+
+
+def to_plain(data):
+    """แปลง SheetRecord (ซ้อนอยู่ใน list / dict ได้) เป็น dict ธรรมดา สำหรับส่งให้ JS / json.dump"""
+    if isinstance(data, SheetRecord):
+        return data.to_dict()
+    if isinstance(data, list):
+        if data and not isinstance(data[0], (SheetRecord, list, dict)):
+            return data
+        return [to_plain(item) for item in data]
+    if isinstance(data, dict):
+        return {key: to_plain(value) for key, value in data.items()}
+    return data
+
+
+def json_default(obj):
+    """ใช้เป็น default= ของ json.dump / json.dumps"""
+    if isinstance(obj, SheetRecord):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
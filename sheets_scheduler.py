@@ -0,0 +1,178 @@
+import threading
+import time
+import heapq
+import itertools
+from collections import Counter
+from contextlib import contextmanager
+
+import gspread
+import requests
+
+import app_log
+import runtime_stats
+
+log = app_log.get_logger("scheduler")
+
+
+# ─── Quota settings ─────────────────────────────────────
+# Google Sheets API: 60 read / 60 write requests ต่อนาทีต่อ user (service account นับเป็น user เดียว)
+READ_QUOTA_PER_MINUTE = 60
+WRITE_QUOTA_PER_MINUTE = 60
+# burst สูงสุดที่ยอมให้ยิงติดกันได้ (ต่ำกว่าโควต้าต่อนาที เพื่อไม่ให้ burst + refill เกินโควต้าในนาทีเดียว)
+BURST_FRACTION = 0.5
+# สัดส่วนของ bucket ที่กันไว้ให้งานหน้าจอเสมอ งาน background จะใช้ได้เฉพาะส่วนที่เกินจากนี้
+BACKGROUND_RESERVE = 0.3
+
+MAX_RETRIES = 5
+INITIAL_RETRY_DELAY = 1
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+READ = "read"
+WRITE = "write"
+
+# ลำดับความสำคัญ (เลขน้อยได้ก่อน)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_WRITE = 1
+PRIORITY_BACKGROUND = 2
+
+# method ของ gspread ที่เป็นการอ่าน ใช้เดาประเภทของ call ที่ส่งมาแบบ function เปล่าๆ
+READ_METHODS = {
+    "get", "get_all_values", "get_all_records", "get_values", "batch_get", "row_values", "col_values",
+    "acell", "cell", "worksheet", "worksheets", "open_by_key", "open_by_url", "open",
+    "values_get", "values_batch_get", "fetch_sheet_metadata",
+}
+
+_local = threading.local()
+
+
+@contextmanager
+def priority(level):
+    """กำหนด priority ให้ทุก Sheets call ที่เกิดใน thread นี้ภายใน with-block"""
+    previous = getattr(_local, "priority", None)
+    _local.priority = level
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+
+def current_priority(kind):
+    level = getattr(_local, "priority", None)
+    if level is not None:
+        return level
+    return PRIORITY_WRITE if kind == WRITE else PRIORITY_INTERACTIVE
+
+
+def kind_for(func):
+    name = getattr(func, "__name__", "")
+    return READ if name in READ_METHODS else WRITE
+
+
+class TokenBucket:
+    def __init__(self, per_minute, burst_fraction=BURST_FRACTION):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, per_minute * burst_fraction)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def drain(self):
+        """โดน 429 แปลว่าโควต้าฝั่ง Google หมดแล้ว ไม่ว่า bucket ฝั่งเราจะเหลือเท่าไร"""
+        self.tokens = 0.0
+
+
+class QuotaScheduler:
+    """
+    ตัวจัดคิว Sheets API ตัวเดียวของทั้ง process
+    - token bucket แยก read / write ตามโควต้าต่อนาที
+    - คิวเรียงตาม priority: หน้าจอ (interactive) → write → background prewarm
+    - งาน background ใช้ token ได้เฉพาะส่วนที่เกิน BACKGROUND_RESERVE ของ bucket
+    - มี token เหลือพอก็ยิงทันที ไม่มีการ sleep
+    - 429 / 5xx / network error จะ backoff แล้วลองใหม่ในตัว
+    """
+
+    def __init__(self, read_per_minute=READ_QUOTA_PER_MINUTE, write_per_minute=WRITE_QUOTA_PER_MINUTE,
+                 background_reserve=BACKGROUND_RESERVE, max_retries=MAX_RETRIES, base_delay=INITIAL_RETRY_DELAY):
+        self.buckets = {READ: TokenBucket(read_per_minute), WRITE: TokenBucket(write_per_minute)}
+        self.background_reserve = background_reserve
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self._cond = threading.Condition()
+        self._waiters = {READ: [], WRITE: []}
+        self._seq = itertools.count()
+        self.retry_count = 0
+        self.error_counts = Counter()  # { status ของ call ที่ต้องลองใหม่ (429, 503, 'connection' ...): จำนวน }
+
+    def _needed(self, bucket, level):
+        if level >= PRIORITY_BACKGROUND:
+            return 1.0 + bucket.capacity * self.background_reserve
+        return 1.0
+
+    def acquire(self, kind, level):
+        bucket = self.buckets[kind]
+        waiters = self._waiters[kind]
+        entry = (level, next(self._seq))
+        with self._cond:
+            heapq.heappush(waiters, entry)
+            try:
+                while True:
+                    bucket.refill(time.monotonic())
+                    needed = self._needed(bucket, level)
+                    if waiters[0] == entry and bucket.tokens >= needed:
+                        bucket.tokens -= 1.0
+                        return
+                    wait = max(0.01, (needed - bucket.tokens) / bucket.rate) if waiters[0] == entry else None
+                    self._cond.wait(wait)
+            finally:
+                waiters.remove(entry)
+                heapq.heapify(waiters)
+                self._cond.notify_all()
+
+    def call(self, kind, func, *args, **kwargs):
+        """เรียก func ผ่านโควต้าของ kind ('read' / 'write') ตาม priority ของ thread ปัจจุบัน"""
+        level = current_priority(kind)
+        for attempt in range(1, self.max_retries + 1):
+            self.acquire(kind, level)
+            runtime_stats.count_request(kind)
+            try:
+                return func(*args, **kwargs)
+            except gspread.exceptions.APIError as e:
+                status = getattr(e.response, "status_code", None)
+                if status not in RETRYABLE_STATUS or attempt == self.max_retries:
+                    raise
+                error = e
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                error = e
+                status = None
+
+            delay = self.base_delay * (2 ** (attempt - 1))
+            self.retry_count += 1
+            self.error_counts[status or "connection"] += 1
+            runtime_stats.count_request("retry")
+            if status == 429:
+                runtime_stats.count_request("429")
+                with self._cond:
+                    self.buckets[kind].drain()
+            log.warning("%s call failed (%s), retry %d/%d in %ss", kind, status or error, attempt, self.max_retries, delay)
+            time.sleep(delay)
+
+
+scheduler = QuotaScheduler()
+
+
+def read(func, *args, **kwargs):
+    return scheduler.call(READ, func, *args, **kwargs)
+
+
+def write(func, *args, **kwargs):
+    return scheduler.call(WRITE, func, *args, **kwargs)
+
+
+def call(func, *args, **kwargs):
+    """เดาประเภท read/write จากชื่อ method แล้วส่งเข้า scheduler (ใช้กับ call แบบทั่วไปของสคริปต์ sync)"""
+    return scheduler.call(kind_for(func), func, *args, **kwargs)
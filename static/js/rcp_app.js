@@ -45,10 +45,6 @@ const getVal = (obj, field) => {
 };
 
 
-// ➤ เพิ่มตัวแปรเก็บ cache ของแต่ละโปรเจกต์ (วางเหนือทุกโค้ดในไฟล์)
-const projectDataCache = {};
-
-
 // === Display Name Helper (unified for all UI points) ===
 function getDisplayName(user) {
   if (!user) return '-';
@@ -218,24 +214,20 @@ async function handleLoginClick(e) {
 
 // ====== AUTO LOGIN (Remember Me) ======
 window.addEventListener('pywebviewready', async () => {
-  // --- Step 1: Pre-load essential data (Staffs) ---
-  try {
-    console.log('[JS DEBUG] Pre-loading staffs data...');
-    // เรียกโดยไม่ต้องส่งพารามิเตอร์ใดๆ
-    const staffsRes = await window.pywebview.api.fetch_staffs_data();
-    window.allStaffsData = staffsRes.status === 'ok' ? staffsRes.payload : [];
-  } catch (err) {
-    console.error('[JS ERROR] Pre-load staffs failed:', err);
-    window.allStaffsData = [];
-  }
-
-  // --- Step 2: Call auto_login() to decide view ---
+  // --- Step 1+2: Pre-load Staffs และ auto_login() ในรอบเดียวของ bridge (Python รันพร้อมกัน) ---
   let res;
   try {
-    console.log('[JS DEBUG] Calling auto_login()...');
-    res = await window.pywebview.api.auto_login();
+    console.log('[JS DEBUG] Pre-loading staffs data + calling auto_login()...');
+    const [staffsRaw, loginRes] = await window.batchCalls([
+      { method: 'fetch_staffs_data', args: [null, window.wireOption('staffs')] },
+      { method: 'auto_login' },
+    ]);
+    const staffsRes = window.wireResponse('staffs', staffsRaw) || await window.fetchWire('fetch_staffs_data', [null], 'staffs', true);
+    window.allStaffsData = staffsRes.status === 'ok' ? staffsRes.payload : [];
+    res = loginRes;
   } catch (e) {
-    console.error('[JS ERROR] auto_login threw:', e);
+    console.error('[JS ERROR] Pre-load staffs / auto_login failed:', e);
+    window.allStaffsData = window.allStaffsData || [];
     res = { status: 'error' };
   }
 
@@ -372,7 +364,7 @@ function initApp(user) {
 
     // ————— Preload ข้อมูล Staffs ล่วงหน้า (cache) —————
     const staffSheetUrl = 'https://docs.google.com/spreadsheets/d/17lOtuHum9VHdukfHr7143uCGydVZSaJNi2RhzGfh81g/edit?gid=1356715801#gid=1356715801';
-    window.pywebview.api.fetch_staffs_data(staffSheetUrl)
+    window.fetchWire('fetch_staffs_data', [staffSheetUrl], 'staffs')
         .then(res => {
         window.allStaffsData = Array.isArray(res.payload) ? res.payload : [];
         console.log('[JS DEBUG] Preloaded staffs data:', window.allStaffsData.length);
@@ -394,7 +386,7 @@ function initApp(user) {
             // Pre-load Staffs data
             if (typeof populateStaffsTable === 'function') {
                 console.log("[JS DEBUG] Admin Pre-load: Fetching Staffs data...");
-                adminPreloadTasks.push(window.pywebview.api.fetch_staffs_data('https://docs.google.com/sheets/d/17lOtuHum9VHdukfHr7143uCGydVZSaJNi2RhzGfh81g/edit?gid=1356715801#gid=1356715801')
+                adminPreloadTasks.push(window.fetchWire('fetch_staffs_data', ['https://docs.google.com/sheets/d/17lOtuHum9VHdukfHr7143uCGydVZSaJNi2RhzGfh81g/edit?gid=1356715801#gid=1356715801'], 'staffs')
                     .then(res => {
                         if (res.status === 'ok') {
                             window.allStaffsData = Array.isArray(res.payload) ? res.payload : [];
@@ -458,19 +450,9 @@ function initApp(user) {
 
 function loadProject(projectId) {
   console.log('[JS DEBUG] loadProject called with projectId:', projectId);
-  console.log('[JS DEBUG] loadProject: Starting data fetch...');
   console.log('[JS DEBUG] currentUser.AllowedProjects:', currentUser?.AllowedProjects);
   console.log('[JS DEBUG] projectMap:', projectMap);
 
-  // ————— ถ้ามี cache ของโปรเจกต์นี้อยู่ ให้ใช้ทันที —————
-  if (projectDataCache[projectId]) {
-    console.log('[JS DEBUG] Using cached data for project:', projectId);
-    const cached = projectDataCache[projectId];
-    window.allReelsData = cached.reels || [];
-    _renderWorkTableFromCache();  // ดูฟังก์ชันย่อยข้างล่าง
-    return Promise.resolve();
-  }
-
   // ————— เช็คสิทธิ์ก่อน —————
   if (!currentUser?.AllowedProjects?.includes(projectId)) {
     Swal.fire('Access Denied', 'คุณไม่มีสิทธิ์เข้าถึงโปรเจกต์นี้', 'error');
@@ -480,39 +462,17 @@ function loadProject(projectId) {
   // Set globals
   window.currentProjectId = projectId;
   window.currentProjectSheetName = projectMap[projectId] || '';
+  window.workTableOffset = 0;
   console.log('[JS DEBUG] currentProjectSheetName:', window.currentProjectSheetName);
 
   // === อัพเดตชื่อโปรเจกต์บน UI ===
   _updateProjectHeaderUI();
 
-  // === แสดงสถานะกำลังโหลดในตารางงานทันที ===
-  const tbody = document.getElementById('work-rows');
-  if (tbody) {
-      tbody.innerHTML = `<tr><td colspan="8" class="text-center text-gray-500 py-4">กำลังโหลดข้อมูล...</td></tr>`;
-  }
-
-  // === เรียก Python API ===
-  return window.pywebview.api.fetch_employee_data(projectId)
-    .then(res => {
-      if (res.status !== 'ok') {
-        Swal.fire('Error', res.message, 'error');
-        console.error('[JS ERROR] fetch_employee_data failed:', res.message);
-        // Revert loading state or show error in table
-        if (tbody) {
-            tbody.innerHTML = `<tr><td colspan="8" class="text-center text-red-500 py-4">เกิดข้อผิดพลาดในการโหลดข้อมูล: ${res.message}</td></tr>`;
-        }
-        return Promise.reject(new Error(res.message));
-      }
-
-      // เก็บ cache
-      projectDataCache[projectId] = res.payload;
-
-      window.allReelsData = res.payload.reels || [];
-      console.log('[JS DEBUG] allReelsData count:', window.allReelsData.length);
-
-      // แสดงตารางงาน
-      _renderWorkTable();
-      return Promise.resolve();
+  // === Python กรองตามวันที่และแบ่งหน้าให้ (ไม่ต้องส่ง reels ทั้ง tab ข้าม bridge) ===
+  return _renderWorkTable()
+    .then(() => {
+      // tab โปรเจกต์ถูกรีเฟรชเบื้องหลัง → โหลดหน้าปัจจุบันใหม่
+      window.registerLiveView('work', ['sheet_*'], () => _renderWorkTable(window.workTableOffset));
     })
     .catch(err => {
       console.error('[JS ERROR] fetch_employee_data error:', err);
@@ -522,28 +482,14 @@ function loadProject(projectId) {
 }
 
 // ————— ฟังก์ชันช่วยเหลือสำหรับ render ตาราง —————
-function _renderWorkTable() {
+function _renderWorkTable(offset = 0) {
   // ตั้ง Flatpickr ให้เลือกวันนี้ถ้ายังไม่มี
   if (flatpickrInstance && (!flatpickrInstance.selectedDates || !flatpickrInstance.selectedDates.length)) {
     flatpickrInstance.setDate(new Date(), true);
   }
   const dateToUse = flatpickrInstance?.selectedDates?.[0] || new Date();
   console.log('[JS DEBUG] Populating work table with:', dateToUse, window.currentProjectSheetName);
-  if (typeof populateWorkTable === 'function') {
-    populateWorkTable(dateToUse, window.currentProjectSheetName);
-  }
-}
-
-function _renderWorkTableFromCache() {
-  // เหมือน _renderWorkTable แต่ใช้ projectId แทน sheetName
-  if (flatpickrInstance && (!flatpickrInstance.selectedDates || !flatpickrInstance.selectedDates.length)) {
-    flatpickrInstance.setDate(new Date(), true);
-  }
-  const dateToUse = flatpickrInstance?.selectedDates?.[0] || new Date();
-  console.log('[JS DEBUG] Populating work table from cache with:', dateToUse, window.currentProjectId);
-  if (typeof populateWorkTable === 'function') {
-    populateWorkTable(dateToUse, window.currentProjectId);
-  }
+  return populateWorkTable(dateToUse, window.currentProjectSheetName, offset);
 }
 
 function _updateProjectHeaderUI() {
@@ -599,66 +545,61 @@ function populateProfileView(user) {
 }
 
 // ===== ฟังก์ชันแสดงข้อมูลตาราง "ลงงาน" (Work Table) =====
-function populateWorkTable(dateObject, sheetNameForTable) {
-    console.log("[JS DEBUG] populateWorkTable: Starting population of work table.");
-    console.log("[JS DEBUG] populateWorkTable called with date:", dateObject, "and received sheetNameForTable:", sheetNameForTable); // ✅ NEW LOG
+const WORK_PAGE_SIZE = 50;
+
+// ขอ reels ของวันที่เลือกจาก Python ทีละหน้า (offset) แล้ววาดตาราง + ปุ่มเปลี่ยนหน้า ; คืน Promise
+function populateWorkTable(dateObject, sheetNameForTable, offset = 0) {
+    console.log("[JS DEBUG] populateWorkTable called with date:", dateObject, "sheet:", sheetNameForTable, "offset:", offset);
     if (!(dateObject instanceof Date) || isNaN(dateObject.getTime())) { // Check for valid Date object
         console.warn("[JS WARNING] populateWorkTable received invalid dateObject. Using current date.");
         dateObject = new Date();
     }
 
-    // Format date to match Google Sheet's "D/M/YYYY", "DD/M/YYYY", "D/MM/YYYY", "DD/MM/YYYY"
-    // and also "D/M/YY", "DD/M/YY", "D/MM/YY", "DD/MM/YY"
     const day = dateObject.getDate();
     const month = dateObject.getMonth() + 1;
     const yearFull = dateObject.getFullYear();
-    const yearShort = (dateObject.getFullYear() % 100); // Get last two digits of year
-
-    // Generate possible formats for filtering
-    const dateFormatsToMatch = [
-        `${day}/${month}/${yearFull}`, // e.g., "1/7/2025"
-        `${day.toString().padStart(2, '0')}/${month}/${yearFull}`, // e.g., "01/7/2025"
-        `${day}/${month.toString().padStart(2, '0')}/${yearFull}`, // e.g., "1/07/2025"
-        `${day.toString().padStart(2, '0')}/${month.toString().padStart(2, '0')}/${yearFull}`, // e.g., "01/07/2025"
-        `${day}/${month}/${yearShort}`, // e.g., "1/7/25"
-        `${day.toString().padStart(2, '0')}/${month}/${yearShort}`, // e.g., "01/7/25"
-        `${day}/${month.toString().padStart(2, '0')}/${yearShort}`, // e.g., "1/07/25"
-        `${day.toString().padStart(2, '0')}/${month.toString().padStart(2, '0')}/${yearShort}` // e.g., "01/07/25"
-    ];
-
-    // ✅ เลือกรูปแบบการแสดงผลที่ชัดเจนที่สุด
-    const dateToDisplay = `${day.toString().padStart(2, '0')}/${month.toString().padStart(2, '0')}/${yearFull}`;
-
-    console.log("[JS DEBUG] Filtering reels for date (possible formats):", dateFormatsToMatch.join(', '));
-    console.log("[JS DEBUG] All Reels Data (before filter):", window.allReelsData);
-
-    const reels = window.allReelsData || [];
-    // Debug: log all dates in data to see what's actually there
-    const allDatesInRawData = reels.map(r => r["Date"]).filter(Boolean);
-    console.log("[JS DEBUG] All 'Date' values in raw allReelsData:", allDatesInRawData);
-
-    const reelRows = reels.filter(r => {
-        const d = (r["Date"] || '').trim();
-        // Check if the date in the row matches any of the generated formats
-        return dateFormatsToMatch.includes(d);
-    });
-
-    console.log("[JS DEBUG] Filtered Reel Rows for current date:", reelRows);
+    const pad = n => n.toString().padStart(2, '0');
+    // Python เทียบวันที่แบบ normalize แล้ว จึงเจอทุกรูปแบบในชีต (1/7/25, 01/07/2025, ...)
+    const isoDate = `${yearFull}-${pad(month)}-${pad(day)}`;
+    const dateToDisplay = `${pad(day)}/${pad(month)}/${yearFull}`;
 
     const tbody = document.getElementById('work-rows');
     const dateHeader = document.getElementById('current-date');
     if (!tbody || !dateHeader) {
         console.error("[JS ERROR] populateWorkTable: tbody or dateHeader not found.");
-        return;
+        return Promise.resolve();
     }
     dateHeader.textContent = dateToDisplay;
-
-    if (!reelRows.length) {
-        tbody.innerHTML = `<tr><td colspan="8" class="text-center text-gray-500 py-4">ไม่พบข้อมูลคลิปในวันที่ ${dateToDisplay}</td></tr>`;
-        console.log("[JS DEBUG] No reel rows found for this date.");
-        return;
+    if (!window.currentProjectId) {
+        return Promise.resolve();
     }
+    tbody.innerHTML = `<tr><td colspan="8" class="text-center text-gray-500 py-4">กำลังโหลดข้อมูล...</td></tr>`;
+
+    const query = { date_from: isoDate, date_to: isoDate, offset, limit: WORK_PAGE_SIZE };
+    return window.pywebview.api.fetch_employee_data(window.currentProjectId, query, {})
+        .then(res => {
+            if (res.status !== 'ok') {
+                console.error('[JS ERROR] fetch_employee_data failed:', res.message);
+                tbody.innerHTML = `<tr><td colspan="8" class="text-center text-red-500 py-4">เกิดข้อผิดพลาดในการโหลดข้อมูล: ${res.message}</td></tr>`;
+                _renderWorkPager(null);
+                throw new Error(res.message);
+            }
+            const page = res.payload;
+            window.allReelsData = window.decodeWireRows(page.reels);
+            window.workTableOffset = page.offset;
+            console.log(`[JS DEBUG] work table: ${window.allReelsData.length} of ${page.total} reels from offset ${page.offset}`);
+
+            if (!page.total) {
+                tbody.innerHTML = `<tr><td colspan="8" class="text-center text-gray-500 py-4">ไม่พบข้อมูลคลิปในวันที่ ${dateToDisplay}</td></tr>`;
+                _renderWorkPager(null);
+                return;
+            }
+            _renderWorkRows(tbody, window.allReelsData, page.offset);
+            _renderWorkPager(page);
+        });
+}
 
+function _renderWorkRows(tbody, reelRows, offset) {
     // Helper function to get platform HTML based on FB/IG values from the row
     const getPlatformHtmlFromRow = (row) => {
         const hasFB = String(getVal(row, 'FB') ?? '0').trim() === '1';
@@ -676,7 +617,7 @@ function populateWorkTable(dateObject, sheetNameForTable) {
 
     tbody.innerHTML = reelRows.map((row, idx) => `
         <tr>
-            <td class="text-center">${row["No"] || idx + 1}</td>
+            <td class="text-center">${row["No"] || offset + idx + 1}</td>
             <td>${row["PageName"] || '-'}</td>
             <td>${getPlatformHtmlFromRow(row)}</td>
             <td>${linkCell(row["Clip1"])}</td>
@@ -689,8 +630,32 @@ function populateWorkTable(dateObject, sheetNameForTable) {
     console.log("[JS DEBUG] Work table populated successfully.");
 }
 
+// ปุ่มเปลี่ยนหน้าใต้ตารางงาน (ซ่อนเมื่อผลลัพธ์มีหน้าเดียว)
+function _renderWorkPager(page) {
+    const pager = document.getElementById('work-pager');
+    if (!pager) return;
+    if (!page || page.total <= page.limit) {
+        pager.innerHTML = '';
+        return;
+    }
+    const last = Math.min(page.offset + page.limit, page.total);
+    pager.innerHTML = `
+        <button class="calendar-btn" data-offset="${Math.max(0, page.offset - page.limit)}" ${page.offset === 0 ? 'disabled' : ''}>‹ ก่อนหน้า</button>
+        <span class="text-sm text-gray-500">แสดง ${page.offset + 1}–${last} จาก ${page.total}</span>
+        <button class="calendar-btn" data-offset="${last}" ${last >= page.total ? 'disabled' : ''}>ถัดไป ›</button>`;
+    pager.querySelectorAll('button[data-offset]').forEach(btn => {
+        btn.addEventListener('click', () => {
+            _renderWorkTable(Number(btn.dataset.offset)).catch(err => console.error('[JS ERROR] work table page failed:', err));
+        });
+    });
+}
+
 // --- ฟังก์ชันย่อยสร้างลิงก์
 function linkCell(url) {
+    // View1/View2 ส่งมาจาก Python เป็นตัวเลขแล้ว
+    if (typeof url === "number") {
+        return url.toLocaleString();
+    }
     if (!url || url === "-" || url.trim() === "") {
         return `<span class="text-gray-400">-</span>`;
     }
@@ -775,6 +740,161 @@ function handle_python_callback_old(response) {
     }
 }
 
+// ─── Live refresh ───────────────────────────────────────────
+// Python ส่ง "cache_updated" มาเมื่อรีเฟรช cache เบื้องหลังแล้วได้ข้อมูลใหม่ (stale-while-revalidate)
+// view ที่แสดงข้อมูลจาก cache ลงทะเบียนไว้ว่าใช้ cache ไหน (ลงท้าย * = prefix) และโหลดใหม่อย่างไร
+const liveViews = {};
+
+window.registerLiveView = function(name, cacheKeys, reload) {
+    liveViews[name] = { cacheKeys, reload };
+};
+
+function refreshLiveViews(cacheKey) {
+    Object.entries(liveViews).forEach(([name, view]) => {
+        const uses = view.cacheKeys.some(k => k.endsWith('*') ? cacheKey.startsWith(k.slice(0, -1)) : k === cacheKey);
+        if (!uses) return;
+        console.log(`[JS DEBUG] cache '${cacheKey}' updated, reloading view '${name}'`);
+        Promise.resolve(view.reload()).catch(err => console.error(`[JS ERROR] reload '${name}' failed:`, err));
+    });
+}
+
+// ─── Compact wire format ───────────────────────────────────
+// method ที่รับ parameter wire (fetch_staffs_data / fetch_monthly_summary / fetch_employee_data) ส่งข้อมูลแบบย่อ
+// (wire_format.py): ชื่อคอลัมน์ครั้งเดียว แถวเป็น array string ที่ซ้ำกันมากเป็น index ของ dictionary
+// ถ้ามี key + version ส่งเวอร์ชันที่ถืออยู่กลับไป (since) แล้ว Python ส่งเฉพาะแถวที่เพิ่ม/เปลี่ยน + key ที่ถูกลบ
+const WIRE_VERSION = 1;
+const wireHeld = {};  // stream → { version, rows: Map(key → row) } ตามลำดับที่แสดง
+
+function _decodeWireValue(column, value) {
+    if (value === null || value === undefined) return undefined;
+    if (column.dict) return column.dict[value];
+    if (column.map) {
+        const out = {};
+        Object.entries(value).forEach(([k, sub]) => { out[k] = _decodeWireRow(column.map, sub); });
+        return out;
+    }
+    return value;
+}
+
+function _decodeWireRow(columns, values) {
+    const row = {};
+    columns.forEach((column, i) => {
+        const value = _decodeWireValue(column, values[i]);
+        if (value !== undefined) row[column.name] = value;
+    });
+    return row;
+}
+
+window.decodeWireRows = function(table) {
+    return table.rows.map(values => _decodeWireRow(table.columns, values));
+};
+
+// รวม payload (ทั้งชุดหรือ delta) เข้ากับข้อมูลที่ถือไว้ของ stream แล้วคืน list ของ object แบบเดิม
+// delta จากเวอร์ชันที่ไม่ได้ถืออยู่แล้ว (เรียก stream เดียวกันซ้อนกัน) คืน null
+function applyWire(stream, payload) {
+    const rows = window.decodeWireRows(payload);
+    if (!payload.key || !payload.version) {
+        delete wireHeld[stream];
+        return rows;
+    }
+    const keyOf = row => String(row[payload.key] ?? '');
+    const held = wireHeld[stream];
+    let merged;
+    if (payload.base && !(held && held.version === payload.base)) {
+        return held && held.version === payload.version ? Array.from(held.rows.values()) : null;
+    }
+    if (payload.base) {
+        // Map คงลำดับเดิม: แถวที่เปลี่ยนอยู่ที่เดิม แถวใหม่ต่อท้าย (Python ส่ง order มาเมื่อไม่ใช่แบบนี้)
+        merged = new Map(held.rows);
+        (payload.removed || []).forEach(k => merged.delete(k));
+        rows.forEach(row => merged.set(keyOf(row), row));
+        if (payload.order) merged = new Map(payload.order.map(k => [k, merged.get(k)]));
+    } else {
+        merged = new Map(rows.map(row => [keyOf(row), row]));
+    }
+    wireHeld[stream] = { version: payload.version, rows: merged };
+    return Array.from(merged.values());
+}
+
+// parameter wire ของ stream (ส่งเวอร์ชันที่ถืออยู่ไปด้วย ; full = ขอทั้งชุด)
+window.wireOption = function(stream, full = false) {
+    const held = full ? null : wireHeld[stream];
+    return { since: held ? held.version : null };
+};
+
+// response ของ method ที่เรียกด้วย wireOption → รูปเดิม (payload เป็น list ของ object) ; delta ที่รวมไม่ได้คืน null
+window.wireResponse = function(stream, res) {
+    if (!res || res.status !== 'ok' || !res.payload || res.payload.wire !== WIRE_VERSION) return res;
+    const rows = applyWire(stream, res.payload);
+    return rows === null ? null : { ...res, payload: rows };
+};
+
+// เรียก method ของ Api แบบขอข้อมูลย่อ + delta ; args ต้องครบทุกตำแหน่งก่อน wire (ไม่ใช้ส่ง null)
+window.fetchWire = async function(method, args, stream, full = false) {
+    const res = window.wireResponse(stream, await window.pywebview.api[method](...args, window.wireOption(stream, full)));
+    return res === null ? window.fetchWire(method, args, stream, true) : res;
+};
+
+// ─── Batch ──────────────────────────────────────────────────
+// หลาย method ในรอบเดียวของ bridge (Api.batch) ; calls เป็น [{ method, args }] คืน array ของผลตามลำดับ
+// arg { ref: i, path: [...] } ใช้ค่าจากผลของ call ที่ i (Python รอ call นั้นก่อน)
+window.batchCalls = async function(calls) {
+    const res = await window.pywebview.api.batch(calls);
+    if (!res || res.status !== 'ok') throw new Error(res?.message || 'batch failed');
+    return res.payload;
+};
+
+// ✅ ตัวรับ event ที่ Python ส่งมาเองผ่าน Api.python_callback_to_js
+window.handle_python_callback = function(response) {
+    if (!response || !response.type) return;
+
+    if (response.type === "cache_updated") {
+        refreshLiveViews(response.key);
+        return;
+    }
+
+    if (response.type === "session_updated") {
+        // login ใช้ session ที่บันทึกไว้ก่อน แล้ว Python ตรวจกับชีตจริงทีหลัง: สิทธิ์เปลี่ยน → วาดเมนู/โปรเจกต์ใหม่
+        if (response.status === "ok") {
+            console.log('[JS DEBUG] session updated from sheet:', response.payload);
+            initApp(response.payload);
+        } else {
+            console.error('[JS ERROR] session no longer valid:', response.message);
+            currentUser = null;
+            projectMap = {};
+            document.getElementById('app-container').style.display = 'none';
+            showLoginModal();
+            requestAnimationFrame(setupLoginButton);
+        }
+        return;
+    }
+
+    if (response.type === "prewarm_progress") {
+        // ความคืบหน้าของการโหลดข้อมูลล่วงหน้าหลัง login (ไม่ต้องวาดอะไรใหม่ แค่บอกว่า cache ไหนพร้อมแล้ว)
+        const info = response.payload || {};
+        window.prewarmProgress = info;
+        console.log(`[JS DEBUG] prewarm ${info.done}/${info.total}: ${info.task}${info.ok ? '' : ' (failed)'}`);
+        return;
+    }
+
+    if (response.type === "staff_update_result") {
+        const info = response.payload || {};
+        if (response.status === "confirmed") {
+            console.log(`[JS DEBUG] บันทึก ${info.column} ของ ${info.staff_id} ลงชีตแล้ว`);
+        } else {
+            console.error(`[JS ERROR] บันทึก ${info.column} ของ ${info.staff_id} ไม่สำเร็จ: ${info.message}`);
+            // ให้เปิดหน้า Staffs ครั้งหน้าโหลดข้อมูลจริงจากชีตใหม่
+            window.allStaffsData = [];
+            if (window.Swal) {
+                Swal.fire('Error', `ไม่สามารถบันทึก ${info.column} ได้: ${info.message}`, 'error');
+            }
+        }
+        return;
+    }
+
+    handle_python_callback_old(response);
+};
+
 // ====================================================================================
 // MAIN DOMContentLoaded (รวมทุกอย่างไว้ที่นี่)
 // ====================================================================================
@@ -918,6 +1038,7 @@ window.fetchAndPopulateLeaves = async (dateObject) => {
 
         const res = await window.pywebview.api.fetch_leaves_list(year, month, day);
         console.log("[JS DEBUG] Response from fetch_leaves_list:", res);
+        window.registerLiveView('leaves', ['staffs', `summary_${year}_${month}`], () => window.fetchAndPopulateLeaves(dateObject));
 
         if (res.status === 'ok' && Array.isArray(res.payload)) {
             const data = res.payload;
@@ -987,7 +1108,8 @@ window.fetchAndPopulateLeaves = async (dateObject) => {
 
           // ✅ ปรับเงื่อนไขให้กระชับขึ้น
           if (window.currentProjectSheetName) {
-              populateWorkTable(dateToUse, window.currentProjectSheetName);
+              populateWorkTable(dateToUse, window.currentProjectSheetName)
+                  .catch(err => console.error("[JS ERROR] Flatpickr onChange: work table failed:", err));
           } else {
               console.error("[JS ERROR] Flatpickr onChange: currentProjectSheetName is missing. Cannot update table.");
           }
@@ -1011,7 +1133,7 @@ window.fetchAndPopulateLeaves = async (dateObject) => {
       if (!Array.isArray(window.allStaffsData) || window.allStaffsData.length === 0) {
         tableBody.innerHTML = `<div class="loading-state">กำลังโหลดข้อมูล...</div>`;
         try {
-          const res = await window.pywebview.api.fetch_staffs_data(staffSheetUrl);
+          const res = await window.fetchWire('fetch_staffs_data', [staffSheetUrl], 'staffs');
           console.log("[JS DEBUG] fetch_staffs_data result:", res);
           // Flexible payload extraction
           let staffsArr = Array.isArray(res.payload)
@@ -1020,6 +1142,12 @@ window.fetchAndPopulateLeaves = async (dateObject) => {
                             ? res
                             : [];
           window.allStaffsData = staffsArr;
+          window.registerLiveView('staffs', ['staffs'], async () => {
+            const fresh = await window.fetchWire('fetch_staffs_data', [staffSheetUrl], 'staffs');
+            if (fresh.status !== 'ok' || !Array.isArray(fresh.payload)) return;
+            window.allStaffsData = fresh.payload;
+            populateStaffsTable(window.allStaffsData);
+          });
         } catch (e) {
           console.error("[JS ERROR] fetch_staffs_data failed:", e);
           tableBody.innerHTML = `<div class="loading-state error">โหลดข้อมูลล้มเหลว</div>`;
@@ -23,8 +23,14 @@ window.addEventListener('pywebviewready', function() {
     async function initializeView() {
         showLoadingState('พนักงาน');
         try {
-            // 1. ดึงรายชื่อพนักงานและ "วันที่ล่าสุดที่มีข้อมูล" จาก Backend
-            const res = await window.pywebview.api.get_all_staff_for_dashboard();
+            // 1. ดึงรายชื่อพนักงาน "วันที่ล่าสุดที่มีข้อมูล" และแดชบอร์ดของคนแรกในวันนั้น ในรอบเดียวของ bridge
+            const [res, firstRes] = await window.batchCalls([
+                { method: 'get_all_staff_for_dashboard' },
+                { method: 'get_employee_dashboard_data', args: [
+                    { ref: 0, path: ['payload', 'staffs', 0, 'email'] },
+                    { ref: 0, path: ['payload', 'latest_date'] },
+                ] },
+            ]);
             
             if (res.status === 'ok' && res.payload.staffs && res.payload.staffs.length > 0) {
                 allStaffs = res.payload.staffs;
@@ -38,6 +44,9 @@ window.addEventListener('pywebviewready', function() {
                 const firstEmployee = allStaffs[0];
                 if(firstEmployee) {
                     currentSelectedEmail = firstEmployee.email;
+                    if (firstRes.status === 'ok') {
+                        dashboardCache[`${firstEmployee.email}_${latestDate}`] = firstRes.payload;
+                    }
                     if (mainHeaderName) mainHeaderName.textContent = `ภาพรวมของ: ${firstEmployee.name}`;
                     
                     const firstCard = employeeListContainer.querySelector('.epd-employee-card');
@@ -111,6 +120,12 @@ window.addEventListener('pywebviewready', function() {
      */
     async function fetchAndRenderDashboard(email, dateStr) {
         const key = `${email}_${dateStr}`;
+        // Python รีเฟรชข้อมูลเบื้องหลังแล้วได้ของใหม่ → ทิ้ง cache ฝั่ง JS แล้วโหลดหน้าที่เปิดอยู่ใหม่
+        const [year, month] = dateStr.split('-').map(Number);
+        window.registerLiveView('stats', ['staffs', 'transaction', `summary_${year}_${month}`], () => {
+            Object.keys(dashboardCache).forEach(k => delete dashboardCache[k]);
+            return fetchAndRenderDashboard(email, dateStr);
+        });
         if (dashboardCache[key]) {
             const cachedData = dashboardCache[key];
             renderKpiCards(cachedData.kpi_cards);
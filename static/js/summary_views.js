@@ -49,11 +49,12 @@ async function monthly_fetchAndDisplayAllSummaryData(year, month) {
     if (allSummaryTbody) allSummaryTbody.innerHTML = '<tr><td colspan="33" style="text-align:center; padding: 20px;">กำลังดึงข้อมูล...</td></tr>';
 
     try {
-        const res = await window.pywebview.api.fetch_monthly_summary(year, month);
+        const res = await window.fetchWire('fetch_monthly_summary', [year, month], `summary_${year}_${month}`);
 
         if (res.status === 'ok' && res.payload && res.payload.length > 0) {
             window.monthlySummaryCache = res.payload;
             monthly_renderMonthlyAllSummaryTable(res.payload);
+            window.registerLiveView('monthly_summary', [`summary_${year}_${month}`], () => monthly_fetchAndDisplayAllSummaryData(year, month));
         } else {
             if (allSummaryTbody) allSummaryTbody.innerHTML = '<tr><td colspan="33" style="text-align:center; padding: 20px;">ไม่พบข้อมูลสำหรับเดือนนี้</td></tr>';
             if (res.message) console.error("Error fetching summary:", res.message);
@@ -228,7 +229,7 @@ async function detail_fetchAndDisplaySummaryData(userName) {
         const year = now.getFullYear();
         const month = now.getMonth() + 1;
         try {
-            const res = await window.pywebview.api.fetch_monthly_summary(year, month);
+            const res = await window.fetchWire('fetch_monthly_summary', [year, month], `summary_${year}_${month}`);
             if (res.status === 'ok' && res.payload) {
                 window.monthlySummaryCache = res.payload; // Update cache
                 data = (res.payload || []).find(p => p.name === userName); // Find user again
@@ -434,15 +435,18 @@ async function fetchAndPopulateLeaves(date) {
   const year  = date.getFullYear();
   const month = date.getMonth() + 1;
   const day   = date.getDate();
-  const dailyRes = await window.pywebview.api.fetch_leaves_list(year, month, day);
+  // รายวัน + ภาพรวมเดือนในรอบเดียวของ bridge
+  const [dailyRes, monthlyRes] = await window.batchCalls([
+    { method: 'fetch_leaves_list', args: [year, month, day] },
+    { method: 'get_monthly_summary_rows', args: [year, month] },
+  ]);
   if (dailyRes.status !== 'ok') {
     tbody.innerHTML = `<tr><td colspan="12" class="text-center p-4">ไม่พบข้อมูล: ${dailyRes.message}</td></tr>`;
     return;
   }
   const daily = dailyRes.payload; // [{ name, projectName, …, statusToday }, …]
 
-  // 2) ดึงข้อมูลภาพรวมเดือน (TotalSent, สถานะ) จาก Monthly_Summary
-  const monthlyRes = await window.pywebview.api.get_monthly_summary_rows(year, month);
+  // 2) ข้อมูลภาพรวมเดือน (TotalSent, สถานะ) จาก Monthly_Summary
   const monthly = monthlyRes.status === 'ok'
     ? monthlyRes.payload
     : [];
@@ -0,0 +1,29 @@
+import time
+
+
+def _expire(api, cache_name):
+    """ทำให้ข้อมูลเก่าเกินกว่าจะเสิร์ฟแบบ stale และไม่มี fingerprint ให้ต่ออายุ → get ครั้งถัดไปต้อง fetch"""
+    api._cache.put(cache_name, api._cache.peek(cache_name), fetched_at=time.time() - 10**7)
+    api._fingerprints.pop(cache_name, None)
+    api._cache.store.set_fingerprint(cache_name, None)
+
+
+def test_failed_refetch_keeps_last_known_data(api, demo_backend):
+    staffs = api.get_staffs_cached()
+    transaction = api.get_transaction_cached()
+    _expire(api, "staffs")
+    _expire(api, "transaction")
+    demo_backend.fail_next(10**6)
+
+    assert api.get_staffs_cached() == staffs
+    assert api.get_transaction_cached() == transaction
+    assert api._cache.store.load("staffs") == staffs
+
+
+def test_failed_refetch_falls_back_to_disk(api, demo_backend):
+    staffs = api.get_staffs_cached()
+    _expire(api, "staffs")
+    api._cache.invalidate("staffs")
+    demo_backend.fail_next(10**6)
+
+    assert api.get_staffs_cached() == staffs
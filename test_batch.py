@@ -0,0 +1,12 @@
+def test_batch_only_runs_allowed_methods(api):
+    api.get_staffs_cached()
+    result = api.batch([
+        {"method": "invalidate_tab", "args": ["Staffs"]},
+        {"method": "_hydrate_caches"},
+        ["clear_caches"],
+        ["get_runtime_stats"],
+    ])
+
+    statuses = [item["status"] for item in result["payload"]]
+    assert statuses == ["error", "error", "error", "ok"]
+    assert api._cache.peek("staffs")
@@ -0,0 +1,34 @@
+from datetime import datetime
+
+import fake_sheets
+import g_sheet_api
+
+URL = fake_sheets.DEMO_MASTER_URL
+
+
+def _full_scan_summary(backend, year, month):
+    grid = backend.workbooks[fake_sheets.DEMO_MASTER_ID].worksheet("Monthly_Summary").grid
+    return g_sheet_api.summarize_monthly_records(g_sheet_api._values_to_records(grid), year, month)
+
+
+def test_cold_index_is_built_from_date_column(demo_backend):
+    today = datetime.now()
+
+    summary = g_sheet_api.get_monthly_summary_data(URL, today.year, today.month)
+
+    assert "get_all_values" not in demo_backend.stats()["calls"]
+    assert summary == _full_scan_summary(demo_backend, today.year, today.month)
+
+
+def test_stale_index_rebuilds_without_full_scan(demo_backend):
+    today = datetime.now()
+    g_sheet_api.get_monthly_summary_data(URL, today.year, today.month)
+    # มีคนแทรกคอลัมน์หน้า Date: header ที่จำไว้ไม่ตรงกับชีตแล้ว
+    backend_ws = demo_backend.workbooks[fake_sheets.DEMO_MASTER_ID].worksheet("Monthly_Summary")
+    backend_ws.insert_cols([["Note"]], col=1)
+    demo_backend.reset_counters()
+
+    summary = g_sheet_api.get_monthly_summary_data(URL, today.year, today.month)
+
+    assert "get_all_values" not in demo_backend.stats()["calls"]
+    assert summary == _full_scan_summary(demo_backend, today.year, today.month)
@@ -0,0 +1,19 @@
+from datetime import datetime
+
+import g_sheet_api
+
+
+def test_login_prewarm_reads_only_current_month_of_summary(api, demo_backend, monkeypatch):
+    now = datetime.now()
+    fetch_tabs = g_sheet_api.fetch_tabs
+    batched = []
+    monkeypatch.setattr(g_sheet_api, "fetch_tabs",
+                        lambda sheet_url, tabs, **kwargs: batched.extend(tabs) or fetch_tabs(sheet_url, tabs, **kwargs))
+
+    api._start_prewarm("Project A", [])
+    api._prewarm.wait(10)
+
+    assert "Monthly_Summary" not in batched
+    assert "get_all_values" not in demo_backend.stats()["calls"]
+    assert api._cache.is_fresh(f"summary_{now.year}_{now.month}")
+    assert api._cache.is_fresh("staffs") and api._cache.is_fresh("transaction")
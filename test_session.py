@@ -0,0 +1,55 @@
+import threading
+
+import fake_sheets
+
+EMAIL = "staff0003@example.com"
+
+
+def _staffs(backend):
+    return backend.workbooks[fake_sheets.DEMO_MASTER_ID].worksheet("Staffs")
+
+
+def _login_from_snapshot(api, events):
+    api.python_callback_to_js = events.append
+    result = api.login(EMAIL)
+    for thread in threading.enumerate():
+        if thread.name == "session-reconcile":
+            thread.join(10)
+    return result
+
+
+def test_reconcile_sees_role_change_behind_fresh_cache(api, demo_backend):
+    assert api.login(EMAIL)["payload"]["Role"] == "User"
+    ws = _staffs(demo_backend)
+    ws.grid[4][ws.grid[0].index("Role")] = "Admin"
+    events = []
+
+    result = _login_from_snapshot(api, events)
+
+    assert result["payload"]["Role"] == "User"
+    assert api.current_user["Role"] == "Admin"
+    updates = [e for e in events if e.get("type") == "session_updated"]
+    assert updates and updates[-1]["payload"]["Role"] == "Admin"
+    assert api.get_staffs_cached()[3]["Role"] == "Admin"
+
+
+def test_reconcile_signs_out_removed_user(api, demo_backend):
+    api.login(EMAIL)
+    _staffs(demo_backend).delete_rows(5)
+    events = []
+
+    _login_from_snapshot(api, events)
+
+    assert api.current_user is None
+    assert [e["status"] for e in events if e.get("type") == "session_updated"] == ["error"]
+
+
+def test_reconcile_keeps_session_when_sheet_unreachable(api, demo_backend):
+    api.login(EMAIL)
+    demo_backend.fail_next(10**6)
+    events = []
+
+    _login_from_snapshot(api, events)
+
+    assert api.current_user["E-Mail"] == EMAIL
+    assert not [e for e in events if e.get("type") == "session_updated"]
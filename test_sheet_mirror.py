@@ -0,0 +1,129 @@
+import time
+from collections import defaultdict
+
+import fake_sheets
+import g_sheet_api
+from sheet_mirror import SOURCE_AGGREGATES, SheetMirror
+
+URL = fake_sheets.DEMO_MASTER_URL
+KINDS = ("all", "email", "project", "page")
+
+
+def _staffs(backend):
+    return backend.workbooks[fake_sheets.DEMO_MASTER_ID].worksheet("Staffs")
+
+
+def _transaction(backend):
+    return backend.workbooks[fake_sheets.DEMO_MASTER_ID].worksheet("Transaction")
+
+
+def _load():
+    return g_sheet_api.get_staffs_data(URL, sheet_name="Transaction")
+
+
+def _recompute(records):
+    """ยอดรายวันคำนวณใหม่จากทุกแถว: {(ชนิด, key, วัน): (แถว, คลิป)}"""
+    columns, summarize = SOURCE_AGGREGATES["transaction"]
+    totals = defaultdict(lambda: [0, 0])
+    for record in records:
+        facts = summarize(*[record.get(column, "") for column in columns])
+        if facts is None:
+            continue
+        day, keys, clips = facts
+        for kind, key in keys:
+            if key is not None:
+                total = totals[(kind, key, day)]
+                total[0] += 1
+                total[1] += clips
+    return {k: tuple(v) for k, v in totals.items()}
+
+
+def _daily(mirror):
+    daily = {}
+    for kind in KINDS:
+        for key in mirror.totals("transaction", kind):
+            for day, total in mirror.daily_totals("transaction", kind, key).items():
+                daily[(kind, key, day)] = (total["rows"], total["clips"])
+    return daily
+
+
+def _sync_and_check(mirror):
+    records = _load()
+    mirror.sync("transaction", records)
+    assert _daily(mirror) == _recompute(records)
+    return records
+
+
+def test_daily_follows_edits_appends_and_truncation(demo_backend, tmp_path):
+    mirror = SheetMirror(str(tmp_path / "mirror.db"))
+    ws = _transaction(demo_backend)
+    header = ws.grid[0]
+    records = _sync_and_check(mirror)
+    assert mirror.latest_day("transaction")
+
+    # แก้ค่า: ย้ายแถวไปอีกคน / อีกวัน / เปลี่ยนจำนวนคลิป / ล้างคลิปจนนับจากลิงก์
+    ws.grid[3][header.index("EmployeeEmail")] = "other@example.com"
+    ws.grid[4][header.index("SubmissionDate")] = "1/1/2020"
+    ws.grid[5][header.index("Clips_Sent")] = "7"
+    ws.grid[6][header.index("Clips_Sent")] = ""
+    ws.grid[7][header.index("SubmissionDate")] = "ไม่ใช่วันที่"
+    _sync_and_check(mirror)
+
+    # ต่อท้าย (รวมวันใหม่ที่กลายเป็นวันล่าสุด)
+    extra = [list(row) for row in ws.grid[1:21]]
+    for row in extra:
+        row[header.index("SubmissionDate")] = "31/12/2099"
+    ws.append_rows(extra)
+    _sync_and_check(mirror)
+    assert mirror.latest_day("transaction") == "2099-12-31"
+
+    # ตัดท้าย + ลบแถวกลาง tab (แถวหลังจากนั้นเลื่อนขึ้นทั้งหมด)
+    ws.delete_rows(len(ws.grid) - 30, len(ws.grid))
+    ws.delete_rows(10, 12)
+    _sync_and_check(mirror)
+    assert mirror.latest_day("transaction") != "2099-12-31"
+
+    # กลับเป็นข้อมูลชุดแรก
+    mirror.sync("transaction", records)
+    assert _daily(mirror) == _recompute(records)
+
+
+def test_daily_rebuilt_when_header_changes(demo_backend, tmp_path):
+    mirror = SheetMirror(str(tmp_path / "mirror.db"))
+    _sync_and_check(mirror)
+
+    _transaction(demo_backend).insert_cols([["Note"]], col=1)
+    _sync_and_check(mirror)
+
+
+def test_incremental_daily_equals_fresh_mirror(demo_backend, tmp_path):
+    incremental = SheetMirror(str(tmp_path / "incremental.db"))
+    ws = _transaction(demo_backend)
+    _sync_and_check(incremental)
+    ws.grid[2][ws.grid[0].index("LinkPage")] = "https://facebook.com/moved"
+    ws.delete_rows(20, 25)
+    ws.append_rows([list(row) for row in ws.grid[30:40]])
+    records = _sync_and_check(incremental)
+
+    fresh = SheetMirror(str(tmp_path / "fresh.db"))
+    fresh.sync("transaction", records)
+
+    assert _daily(incremental) == _daily(fresh)
+
+
+def test_mirror_resyncs_when_it_lags_behind_the_cache(api, demo_backend):
+    staffs = api.get_staffs_cached()
+    email = staffs[0]["E-Mail"]
+    assert api._mirrored('staffs', staffs).first('staffs', email=email)["Name"] == staffs[0]["Name"]
+
+    # ปิดแอประหว่าง sync_later: cache ได้ข้อมูลชุดใหม่ แต่ mirror ยังเป็นชุดเดิม
+    ws = _staffs(demo_backend)
+    ws.grid[1][ws.grid[0].index("Name")] = "Renamed"
+    api._mirror.sync_later = lambda *args: None
+    api._cache.put('staffs', staffs, fetched_at=time.time() - 10**7)
+    api._fingerprints.pop('staffs', None)
+    api._cache.store.set_fingerprint('staffs', None)
+    staffs = api.get_staffs_cached()
+    assert staffs[0]["Name"] == "Renamed"
+
+    assert api._mirrored('staffs', staffs).first('staffs', email=email)["Name"] == "Renamed"
@@ -0,0 +1,29 @@
+from sheet_records import SheetRecord, decode_rows
+
+
+GRID = [["Name", "Clips_Sent", "Note"], ["A", "1,200", "x"], ["B", "3"]]
+
+
+def test_records_from_separate_fetches_compare_equal():
+    old = decode_rows([list(row) for row in GRID], numeric=("Clips_Sent",))
+    new = decode_rows([list(row) for row in GRID], numeric=("Clips_Sent",))
+    assert old == new
+    new[1]["Note"] = "y"
+    assert old != new
+
+
+def test_short_rows_and_extra_keys_compare_like_dicts():
+    short, padded = decode_rows(GRID)[1], decode_rows([GRID[0], ["B", "3", ""]])[0]
+    assert short == padded == {"Name": "B", "Clips_Sent": "3", "Note": ""}
+    padded["Role"] = "Editor"
+    assert short != padded
+    short["Role"] = "Editor"
+    assert short == padded
+
+
+def test_duplicate_headers_ignore_shadowed_columns():
+    # unique=False: หัวซ้ำใช้คอลัมน์ขวาสุด ค่าในคอลัมน์ที่ถูกบังไม่นับ
+    a, = decode_rows([["Name", "Name", "Note"], ["old", "A", "x"]], unique=False)
+    b, = decode_rows([["Name", "Name", "Note"], ["other", "A", "x"]], unique=False)
+    assert a == b == {"Name": "A", "Note": "x"}
+    assert isinstance(a, SheetRecord)
@@ -0,0 +1,70 @@
+import fake_sheets
+import g_sheet_api
+
+URL = fake_sheets.DEMO_MASTER_URL
+
+
+def _staffs(backend):
+    return backend.workbooks[fake_sheets.DEMO_MASTER_ID].worksheet("Staffs")
+
+
+def _cell(backend, staff_id, column):
+    grid = _staffs(backend).grid
+    row = next(r for r in grid[1:] if r[grid[0].index("ID")] == staff_id)
+    return row[grid[0].index(column)]
+
+
+def test_update_after_column_inserted(demo_backend):
+    g_sheet_api.get_staffs_data(URL)
+    _staffs(demo_backend).insert_cols([["Nickname"] + ["nick"] * 10], col=2)
+
+    result = g_sheet_api.update_staff_data(URL, "1001", "Name", "Second")
+
+    assert result["status"] == "ok"
+    assert _cell(demo_backend, "1001", "Name") == "Second"
+    assert _cell(demo_backend, "1001", "Nickname") == "nick"
+
+
+def test_batch_update_after_column_inserted(demo_backend):
+    g_sheet_api.get_staffs_data(URL)
+    _staffs(demo_backend).insert_cols([["Nickname"]], col=2)
+
+    results = g_sheet_api.batch_update_staff_cells(URL, [("1002", "Role", "Admin"), ("1003", "Status", "Inactive")])
+
+    assert [r["status"] for r in results] == ["ok", "ok"]
+    assert _cell(demo_backend, "1002", "Role") == "Admin"
+    assert _cell(demo_backend, "1003", "Status") == "Inactive"
+    assert _cell(demo_backend, "1003", "Project Name") != "Inactive"
+
+
+def test_update_after_key_column_moved(demo_backend):
+    g_sheet_api.get_staffs_data(URL)
+    _staffs(demo_backend).insert_cols([["Nickname"]], col=1)
+    # ID ย้ายไปคอลัมน์ B แต่ index ยังไม่มี ID นี้ → refresh ต้องอ่านคอลัมน์ key จาก header ใหม่
+    _staffs(demo_backend).append_row(["", "2000", "New", "new@example.com"])
+
+    result = g_sheet_api.update_staff_data(URL, "2000", "Role", "User")
+
+    assert result["status"] == "ok"
+    assert _cell(demo_backend, "2000", "Role") == "User"
+
+
+def test_unchanged_header_costs_one_read(demo_backend):
+    g_sheet_api.get_staffs_data(URL)
+    demo_backend.reset_counters()
+
+    g_sheet_api.update_staff_data(URL, "1004", "Role", "Admin")
+
+    assert demo_backend.stats()["calls"].get("values_batch_get") == 1
+    assert _cell(demo_backend, "1004", "Role") == "Admin"
+
+
+def test_read_row_uses_current_header(demo_backend):
+    g_sheet_api.get_staffs_data(URL)
+    _staffs(demo_backend).insert_cols([["Nickname"] + ["nick"] * 10], col=2)
+
+    record = g_sheet_api.read_staff_row(URL, staff_id="1005")
+
+    assert record["Name"] == "Staff 0005"
+    assert record["Nickname"] == "nick"
+    assert record["E-Mail"] == "staff0005@example.com"
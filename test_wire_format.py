@@ -0,0 +1,163 @@
+import copy
+import json
+import os
+import shutil
+import subprocess
+from datetime import datetime
+
+import pytest
+
+import fake_sheets
+import g_sheet_api
+import sheet_records
+from wire_format import WireStreams
+
+URL = fake_sheets.DEMO_MASTER_URL
+RCP_APP_JS = os.path.join(os.path.dirname(__file__), "static", "js", "rcp_app.js")
+
+
+# ─── ตัวถอดแบบเดียวกับ applyWire ใน static/js/rcp_app.js ───
+def _decode_value(column, value):
+    if value is None:
+        return None
+    if "dict" in column:
+        return column["dict"][value]
+    if "map" in column:
+        return {k: _decode_row(column["map"], sub) for k, sub in value.items()}
+    return value
+
+
+def _decode_row(columns, values):
+    row = {}
+    for column, value in zip(columns, values):
+        value = _decode_value(column, value)
+        if value is not None:
+            row[column["name"]] = value
+    return row
+
+
+def _apply(held, payload):
+    """held = {stream: (version, {key: row})} ; คืนแถวทั้งหมดหลังรวม payload (None = delta จากฐานที่ไม่ได้ถือ)"""
+    payload = json.loads(json.dumps(payload, ensure_ascii=False))  # ผ่าน bridge เป็น JSON
+    rows = [_decode_row(payload["columns"], values) for values in payload["rows"]]
+    if not payload["key"] or not payload["version"]:
+        return rows
+    key_of = lambda row: str(row.get(payload["key"], ""))
+    version, current = held.get("stream", (None, {}))
+    if payload["base"]:
+        if version != payload["base"]:
+            return None
+        merged = dict(current)
+        for key in payload.get("removed", []):
+            merged.pop(key, None)
+        for row in rows:
+            merged[key_of(row)] = row
+        if "order" in payload:
+            merged = {key: merged[key] for key in payload["order"]}
+    else:
+        merged = {key_of(row): row for row in rows}
+    held["stream"] = (payload["version"], merged)
+    return list(merged.values())
+
+
+def _plain(rows):
+    """ค่าที่ JS เห็นหลังถอด: ผ่าน JSON และไม่มี key ที่เป็น null"""
+    def strip(value):
+        if isinstance(value, dict):
+            return {str(k): strip(v) for k, v in value.items() if v is not None}
+        if isinstance(value, list):
+            return [strip(v) for v in value]
+        return value
+    return strip(json.loads(json.dumps(sheet_records.to_plain(rows), ensure_ascii=False)))
+
+
+def _staff_versions(backend):
+    rows = sheet_records.to_plain(g_sheet_api.get_staffs_data(URL))
+    changed = copy.deepcopy(rows)
+    changed[3]["Status"] = "Inactive"
+    del changed[5]
+    changed.append({**rows[0], "ID": "9999", "Name": "New", "E-Mail": "new@example.com"})
+    reordered = list(reversed(changed))
+    reordered[0] = {**reordered[0], "Role": "Admin"}
+    return rows, changed, reordered
+
+
+def test_delta_round_trip_equals_full_rows(demo_backend):
+    versions = _staff_versions(demo_backend)
+    streams, held, since = WireStreams(), {}, None
+
+    for rows in versions + (versions[0],):
+        payload = streams.encode("staffs", rows, "ID", since)
+        assert _apply(held, payload) == _plain(rows)
+        since = payload["version"]
+
+    assert payload["base"] is not None
+
+
+def test_delta_sends_only_changed_rows(demo_backend):
+    rows, changed, _ = _staff_versions(demo_backend)
+    streams = WireStreams()
+    first = streams.encode("staffs", rows, "ID")
+
+    delta = streams.encode("staffs", changed, "ID", first["version"])
+    same = streams.encode("staffs", changed, "ID", delta["version"])
+
+    assert len(delta["rows"]) == 2
+    assert delta["removed"] == [rows[5]["ID"]]
+    assert "order" not in delta
+    assert same["rows"] == [] and same["version"] == delta["version"]
+
+
+def test_unknown_base_gets_full_payload(demo_backend):
+    rows, changed, _ = _staff_versions(demo_backend)
+    streams, held = WireStreams(), {}
+    _apply(held, streams.encode("staffs", rows, "ID"))
+
+    payload = streams.encode("staffs", changed, "ID", "deadbeef")
+
+    assert payload["base"] is None
+    assert _apply(held, payload) == _plain(changed)
+
+
+def test_monthly_summary_map_columns_round_trip(demo_backend):
+    today = datetime.now()
+    summary = g_sheet_api.get_monthly_summary_data(URL, today.year, today.month)
+    changed = copy.deepcopy(summary)
+    next(iter(changed[1]["dailyData"].values()))["clips"] = 99
+    changed[2]["totalClips"] = None
+    streams, held = WireStreams(), {}
+
+    first = streams.encode("summary", summary, "name")
+    assert _apply(held, first) == _plain(summary)
+    delta = streams.encode("summary", changed, "name", first["version"])
+
+    assert len(delta["rows"]) == 2
+    assert _apply(held, delta) == _plain(changed)
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="ต้องมี node สำหรับรันโค้ดฝั่ง JS")
+def test_js_apply_wire_matches(demo_backend, tmp_path):
+    versions = _staff_versions(demo_backend)
+    streams, since, sequence = WireStreams(), None, []
+    for rows in versions:
+        payload = streams.encode("staffs", rows, "ID", since)
+        sequence.append(payload)
+        since = payload["version"]
+    sequence.append(streams.encode("staffs", versions[0], "ID", "deadbeef"))
+
+    with open(RCP_APP_JS, encoding="utf-8") as f:
+        source = f.read()
+    block = source[source.index("// ─── Compact wire format"):source.index("window.wireOption = function")]
+    script = tmp_path / "wire.js"
+    script.write_text(
+        "const window = {};\n" + block
+        + "const seq = JSON.parse(require('fs').readFileSync(process.argv[2], 'utf8'));\n"
+        + "console.log(JSON.stringify(seq.map(p => applyWire('staffs', p))));\n",
+        encoding="utf-8",
+    )
+    data = tmp_path / "seq.json"
+    data.write_text(json.dumps(sequence, ensure_ascii=False), encoding="utf-8")
+
+    results = json.loads(subprocess.check_output(["node", str(script), str(data)]))
+
+    assert results == [_plain(rows) for rows in versions + (versions[0],)]
@@ -0,0 +1,76 @@
+import threading
+import time
+
+import fake_sheets
+import g_sheet_api
+from write_queue import StaffWriteQueue
+
+URL = fake_sheets.DEMO_MASTER_URL
+
+
+def _role(backend, staff_id):
+    grid = backend.workbooks[fake_sheets.DEMO_MASTER_ID].worksheet("Staffs").grid
+    row = next(r for r in grid[1:] if r[0] == staff_id)
+    return row[grid[0].index("Role")]
+
+
+def _wait(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_edit_during_inflight_flush_waits_for_it(demo_backend, monkeypatch):
+    write = g_sheet_api.batch_update_staff_cells
+    started, release = threading.Event(), threading.Event()
+    calls, active = [], []
+
+    def slow_write(sheet_url, edits, sheet_name="Staffs"):
+        active.append(1)
+        assert len(active) == 1, "flush ซ้อนกัน"
+        calls.append([value for _, _, value in edits])
+        if len(calls) == 1:
+            started.set()
+            release.wait(5)
+        try:
+            return write(sheet_url, edits, sheet_name=sheet_name)
+        finally:
+            active.pop()
+
+    monkeypatch.setattr(g_sheet_api, "batch_update_staff_cells", slow_write)
+    results = []
+    queue = StaffWriteQueue(on_result=lambda edit, status, message: results.append((edit.new_value, status)),
+                            flush_delay=0.01)
+
+    queue.enqueue(URL, "1002", "Role", "Old")
+    assert started.wait(5)
+    queue.enqueue(URL, "1002", "Role", "New")
+    time.sleep(0.2)
+    assert calls == [["Old"]]
+
+    release.set()
+    assert _wait(lambda: len(results) == 2)
+    assert calls == [["Old"], ["New"]]
+    assert results == [("Old", "confirmed"), ("New", "confirmed")]
+    assert _role(demo_backend, "1002") == "New"
+    assert queue.pending_edits() == []
+
+
+def test_failed_write_is_reported_without_queue_retries(demo_backend, monkeypatch):
+    g_sheet_api.get_staffs_data(URL)
+    write = g_sheet_api.batch_update_staff_cells
+    calls = []
+    monkeypatch.setattr(g_sheet_api, "batch_update_staff_cells",
+                        lambda *args, **kwargs: calls.append(1) or write(*args, **kwargs))
+    results = []
+    queue = StaffWriteQueue(on_result=lambda edit, status, message: results.append(status), flush_delay=0.01)
+    demo_backend.fail_next(10**6)
+
+    queue.enqueue(URL, "1002", "Role", "Admin")
+
+    assert _wait(lambda: results)
+    time.sleep(0.1)
+    assert results == ["failed"]
+    assert len(calls) == 1
+    assert queue.pending_edits() == []
@@ -0,0 +1,115 @@
+import zlib
+import threading
+from collections import OrderedDict
+
+
+# รูปแบบข้อมูลแบบย่อที่ส่งข้าม pywebview bridge (JS: decodeWire ใน static/js/rcp_app.js)
+WIRE_VERSION = 1
+
+# คอลัมน์ string ที่ค่าไม่ซ้ำกันไม่เกินสัดส่วนนี้ของจำนวนแถวถูกส่งเป็นเลข index ของ dictionary
+DICT_MAX_DISTINCT = 0.5
+# จำนวนเวอร์ชันที่จำไว้ต่อ stream (ใช้เป็นฐานของ delta) และจำนวน stream สูงสุด
+KEEP_VERSIONS = 4
+MAX_STREAMS = 64
+
+
+def _encode_column(name, values):
+    """
+    header ของคอลัมน์หนึ่ง + ค่าที่แปลงแล้ว
+    - string ซ้ำกันมาก → {"name", "dict": [...]} และค่าเป็น index
+    - dict ของ dict (เช่น dailyData ของสรุปรายเดือน) → {"name", "map": [header ย่อย]} และค่าเป็น {key: [ค่าย่อย]}
+    None คือไม่มีค่า (JS ไม่ใส่ key นั้นในแถว)
+    """
+    present = [v for v in values if v is not None]
+    if present and all(isinstance(v, str) for v in present):
+        distinct = list(dict.fromkeys(present))
+        if len(distinct) <= len(present) * DICT_MAX_DISTINCT:
+            index = {v: i for i, v in enumerate(distinct)}
+            return {"name": name, "dict": distinct}, [None if v is None else index[v] for v in values]
+    if present and all(isinstance(v, dict) and all(isinstance(inner, dict) for inner in v.values()) for v in present):
+        headers, columns = _encode_columns([inner for v in present for inner in v.values()])
+        encoded, cursor = [], iter(zip(*columns)) if columns else None
+        for v in values:
+            if v is None:
+                encoded.append(None)
+            else:
+                encoded.append({k: list(next(cursor)) if cursor else [] for k in v})
+        return {"name": name, "map": headers}, encoded
+    return {"name": name}, list(values)
+
+
+def _encode_columns(rows):
+    names = list(dict.fromkeys(name for row in rows for name in row))
+    headers, columns = [], []
+    for name in names:
+        header, values = _encode_column(name, [row.get(name) for row in rows])
+        headers.append(header)
+        columns.append(values)
+    return headers, columns
+
+
+def encode_rows(rows):
+    """list ของ dict → {"columns": [header], "rows": [[ค่า]]} (ชื่อคอลัมน์ส่งครั้งเดียว)"""
+    headers, columns = _encode_columns(rows)
+    return {"columns": headers, "rows": [list(values) for values in zip(*columns)] if columns else [[] for _ in rows]}
+
+
+def _digest(row):
+    return zlib.crc32(repr(row).encode("utf-8"))
+
+
+class WireStreams:
+    """
+    ข้อมูลแบบย่อพร้อม delta ต่อ stream (เช่น 'fetch_staffs_data')
+    - จำ key และ digest ของแถวที่ส่งไปแล้วไม่กี่เวอร์ชันล่าสุด
+    - JS ส่งเวอร์ชันที่ถืออยู่มา (since) → ส่งเฉพาะแถวที่เพิ่ม / เปลี่ยน + key ที่ถูกลบ
+    - ไม่รู้จัก since (เก่าเกินไป / แอปเพิ่งเปิด) หรือ key ซ้ำกัน → ส่งทั้งชุด
+    เวอร์ชันคำนวณจากเนื้อหา: ข้อมูลเท่าเดิมได้เวอร์ชันเดิม (delta ว่าง)
+    """
+
+    def __init__(self, keep=KEEP_VERSIONS, max_streams=MAX_STREAMS):
+        self.keep = keep
+        self.max_streams = max_streams
+        self._lock = threading.Lock()
+        self._streams = OrderedDict()  # stream → OrderedDict(version → (keys, {key: digest}))
+
+    def encode(self, stream, rows, key=None, since=None):
+        payload = {"wire": WIRE_VERSION, "version": None, "base": None, "key": None}
+        keys = [str(row.get(key, "")) for row in rows] if key else None
+        if keys is None or len(set(keys)) != len(keys):
+            payload.update(encode_rows(rows))
+            return payload
+
+        digests = [_digest(row) for row in rows]
+        version = "%08x" % zlib.crc32(repr((keys, digests)).encode("utf-8"))
+        with self._lock:
+            versions = self._streams.pop(stream, None) or OrderedDict()
+            base = versions.get(since) if since else None
+            versions.pop(version, None)
+            versions[version] = (keys, dict(zip(keys, digests)))
+            while len(versions) > self.keep:
+                versions.popitem(last=False)
+            self._streams[stream] = versions
+            while len(self._streams) > self.max_streams:
+                self._streams.popitem(last=False)
+
+        payload.update(version=version, key=key)
+        if base is None:
+            payload.update(encode_rows(rows))
+            return payload
+
+        base_keys, base_digests = base
+        changed = [row for k, d, row in zip(keys, digests, rows) if base_digests.get(k) != d]
+        current = set(keys)
+        payload.update(encode_rows(changed))
+        payload["base"] = since
+        payload["removed"] = [k for k in base_keys if k not in current]
+        # ลำดับใหม่ = ลำดับเดิม (ตัดที่ถูกลบ) + แถวใหม่ต่อท้าย → JS เรียงเองได้ ; ไม่ใช่ก็ส่งลำดับไปด้วย
+        added = [k for k in keys if k not in base_digests]
+        if [k for k in base_keys if k in current] + added != keys:
+            payload["order"] = keys
+        return payload
+
+    def clear(self):
+        with self._lock:
+            self._streams.clear()
@@ -0,0 +1,126 @@
+import threading
+import itertools
+
+import gspread
+
+import g_sheet_api
+import app_log
+
+log = app_log.get_logger("write_queue")
+
+
+class PendingEdit:
+    """การแก้ไข 1 เซลล์ที่รอเขียนลงชีต (แก้ซ้ำเซลล์เดิมจะรวมเป็นก้อนเดียว เก็บ edit_id ทุกตัวไว้แจ้งผล)"""
+
+    def __init__(self, sheet_url, sheet_name, staff_id, column_name, new_value, edit_id):
+        self.sheet_url = sheet_url
+        self.sheet_name = sheet_name
+        self.staff_id = str(staff_id).strip()
+        self.column_name = column_name
+        self.new_value = new_value
+        self.edit_ids = [edit_id]
+
+    @property
+    def key(self):
+        return (g_sheet_api._sheet_key(self.sheet_url), self.sheet_name, self.staff_id, self.column_name)
+
+
+class StaffWriteQueue:
+    """
+    คิวเขียนแบบ write-behind สำหรับการแก้ข้อมูล Staffs
+    - รวบรวมการแก้ไขในช่วงเวลาสั้นๆ (flush_delay) แก้เซลล์เดียวกันซ้ำจะเหลือค่าล่าสุด
+    - flush เป็น batch_update เดียวต่อ spreadsheet บน thread แยก (ไม่บล็อก UI) และทำทีละรอบเท่านั้น:
+      การแก้ไขที่เข้ามาระหว่างเขียนจะรอ flush รอบถัดไป ค่าของเซลล์เดียวกันจึงลงชีตตามลำดับเสมอ
+    - 429 / 5xx ถูก retry ใน sheets_scheduler แล้ว ที่นี่ไม่ลองซ้ำอีกชั้น
+      ผลลัพธ์แจ้งกลับผ่าน on_result(edit, status, message) โดย status เป็น "confirmed" หรือ "failed"
+    """
+
+    def __init__(self, on_result=None, flush_delay=0.8):
+        self.on_result = on_result
+        self.flush_delay = flush_delay
+        self._pending = {}
+        self._inflight = {}  # edit ที่กำลังเขียนอยู่ (ออกจาก _pending แล้วแต่ยังไม่รู้ผล)
+        self._lock = threading.Lock()
+        self._timer = None
+        self._flush_lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def enqueue(self, sheet_url, staff_id, column_name, new_value, sheet_name="Staffs"):
+        """ใส่การแก้ไขลงคิวแล้วคืน edit_id ทันที"""
+        edit_id = next(self._ids)
+        edit = PendingEdit(sheet_url, sheet_name, staff_id, column_name, new_value, edit_id)
+        with self._lock:
+            existing = self._pending.get(edit.key)
+            if existing is not None:
+                existing.new_value = new_value
+                existing.edit_ids.append(edit_id)
+            else:
+                self._pending[edit.key] = edit
+            self._schedule(self.flush_delay)
+        return edit_id
+
+    def pending_edits(self):
+        """การแก้ไขที่ยังไม่ได้ยืนยันผล (รอเขียน + กำลังเขียนอยู่) ; ค่าที่รอเขียนชนะค่าที่กำลังเขียน"""
+        with self._lock:
+            return list({**self._inflight, **self._pending}.values())
+
+    def _schedule(self, delay):
+        # เรียกภายใต้ self._lock ; ระหว่างที่มี edit กำลังเขียน flush ที่จบจะตั้ง timer รอบถัดไปเอง
+        if self._timer is None and not self._inflight:
+            self._timer = threading.Timer(delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        with self._flush_lock:
+            self._flush()
+        with self._lock:
+            if self._pending:
+                self._schedule(self.flush_delay)
+
+    def _flush(self):
+        with self._lock:
+            self._timer = None
+            edits = list(self._pending.values())
+            self._pending.clear()
+            self._inflight.update((edit.key, edit) for edit in edits)
+        if not edits:
+            return
+
+        groups = {}
+        for edit in edits:
+            groups.setdefault((edit.key[0], edit.sheet_name), []).append(edit)
+
+        try:
+            for (sheet_id, sheet_name), group in groups.items():
+                try:
+                    results = g_sheet_api.batch_update_staff_cells(
+                        sheet_id,
+                        [(e.staff_id, e.column_name, e.new_value) for e in group],
+                        sheet_name=sheet_name
+                    )
+                except Exception as e:
+                    quota = isinstance(e, gspread.exceptions.APIError) and e.response.status_code == 429
+                    if quota:
+                        log.warning("StaffWriteQueue: flush of %d edits still over quota after retries", len(group))
+                    else:
+                        log.exception("StaffWriteQueue: flush of %d edits failed (%s)", len(group), e)
+                    results = [{"status": "error", "message": str(e)}] * len(group)
+                for edit, result in zip(group, results):
+                    if result.get("status") == "ok":
+                        self._notify(edit, "confirmed")
+                    else:
+                        self._notify(edit, "failed", result.get("message"))
+        finally:
+            with self._lock:
+                for edit in edits:
+                    if self._inflight.get(edit.key) is edit:
+                        del self._inflight[edit.key]
+
+    def _notify(self, edit, status, message=None):
+        if self.on_result is None:
+            return
+        try:
+            self.on_result(edit, status, message)
+        except Exception as e:
+            log.error("StaffWriteQueue: on_result callback failed: %s", e)